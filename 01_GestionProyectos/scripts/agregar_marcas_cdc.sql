@@ -0,0 +1,23 @@
+-- ============================================================
+-- COLUMNAS DE MARCA PARA EL ETL INCREMENTAL
+-- Base de datos: gestionproyectos_hist
+-- Para bases creadas antes de que crear_bd_origen.sql incluyera
+-- fecha_actualizacion en Cliente y Empleado. Ejecutar una sola vez.
+-- ============================================================
+
+USE gestionproyectos_hist;
+
+-- Cliente y Empleado no registraban modificaciones
+ALTER TABLE Cliente
+  ADD COLUMN fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  ADD INDEX idx_cliente_actualizacion (fecha_actualizacion);
+
+ALTER TABLE Empleado
+  ADD COLUMN fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  ADD INDEX idx_empleado_actualizacion (fecha_actualizacion);
+
+-- Índices para las ventanas de extracción (fecha_actualizacion > marca)
+ALTER TABLE Proyecto ADD INDEX idx_proyecto_actualizacion (fecha_actualizacion);
+ALTER TABLE Tarea    ADD INDEX idx_tarea_actualizacion (fecha_actualizacion);
+
+SELECT 'Columnas de marca para ETL incremental agregadas' AS resultado;
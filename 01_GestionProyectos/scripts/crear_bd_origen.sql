@@ -36,8 +36,10 @@ CREATE TABLE Cliente (
   email           VARCHAR(100),
   direccion       VARCHAR(200),
   fecha_registro  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   activo          TINYINT(1) DEFAULT 1,
   UNIQUE KEY uq_cliente_nombre (nombre),
+  INDEX idx_cliente_actualizacion (fecha_actualizacion),
   INDEX idx_cliente_sector (sector),
   INDEX idx_cliente_activo (activo)
 ) ENGINE=InnoDB COMMENT='Información de clientes';
@@ -50,7 +52,9 @@ CREATE TABLE Empleado (
   salario_base    DECIMAL(10,2),
   fecha_ingreso   DATE,
   activo          TINYINT(1) DEFAULT 1,
+  fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   INDEX idx_empleado_puesto (puesto),
+  INDEX idx_empleado_actualizacion (fecha_actualizacion),
   INDEX idx_empleado_depto (departamento),
   INDEX idx_empleado_activo (activo)
 ) ENGINE=InnoDB COMMENT='Información de empleados';
@@ -90,7 +94,8 @@ CREATE TABLE Proyecto (
   INDEX idx_proyecto_estado (id_estado),
   INDEX idx_proyecto_gerente (id_empleado_gerente),
   INDEX idx_proyecto_fechas (fecha_inicio, fecha_fin_plan),
-  INDEX idx_proyecto_prioridad (prioridad)
+  INDEX idx_proyecto_prioridad (prioridad),
+  INDEX idx_proyecto_actualizacion (fecha_actualizacion)
 ) ENGINE=InnoDB COMMENT='Proyectos principales';
 
 CREATE TABLE Tarea (
@@ -116,7 +121,8 @@ CREATE TABLE Tarea (
   INDEX idx_tarea_proyecto (id_proyecto),
   INDEX idx_tarea_empleado (id_empleado),
   INDEX idx_tarea_estado (id_estado),
-  INDEX idx_tarea_fechas (fecha_inicio_plan, fecha_fin_plan)
+  INDEX idx_tarea_fechas (fecha_inicio_plan, fecha_fin_plan),
+  INDEX idx_tarea_actualizacion (fecha_actualizacion)
 ) ENGINE=InnoDB COMMENT='Tareas de proyectos';
 
 -- =========================================================
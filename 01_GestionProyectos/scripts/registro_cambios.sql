@@ -0,0 +1,225 @@
+-- =========================================================
+-- REGISTRO DE CAMBIOS PARA ETL CASI EN TIEMPO REAL
+-- Sistema de Gestión de Proyectos
+-- Triggers AFTER INSERT/UPDATE/DELETE que anotan (tabla, pk, op, ts)
+-- en RegistroCambios; el ETL lo consume en micro-lotes con
+--   python src/etl/etl_incremental.py --cambios [--continuo]
+-- =========================================================
+
+USE gestionproyectos_hist;
+
+-- Eliminar triggers existentes
+DROP TRIGGER IF EXISTS trg_proyecto_cambio_ins;
+DROP TRIGGER IF EXISTS trg_proyecto_cambio_upd;
+DROP TRIGGER IF EXISTS trg_proyecto_cambio_del;
+DROP TRIGGER IF EXISTS trg_tarea_cambio_ins;
+DROP TRIGGER IF EXISTS trg_tarea_cambio_upd;
+DROP TRIGGER IF EXISTS trg_tarea_cambio_del;
+DROP TRIGGER IF EXISTS trg_cliente_cambio_ins;
+DROP TRIGGER IF EXISTS trg_cliente_cambio_upd;
+DROP TRIGGER IF EXISTS trg_cliente_cambio_del;
+DROP TRIGGER IF EXISTS trg_empleado_cambio_ins;
+DROP TRIGGER IF EXISTS trg_empleado_cambio_upd;
+DROP TRIGGER IF EXISTS trg_empleado_cambio_del;
+DROP TRIGGER IF EXISTS trg_equipo_cambio_ins;
+DROP TRIGGER IF EXISTS trg_equipo_cambio_upd;
+DROP TRIGGER IF EXISTS trg_equipo_cambio_del;
+DROP TRIGGER IF EXISTS trg_tarea_equipo_cambio_ins;
+DROP TRIGGER IF EXISTS trg_tarea_equipo_cambio_upd;
+DROP TRIGGER IF EXISTS trg_tarea_equipo_cambio_del;
+
+-- =========================================================
+-- TABLA DE REGISTRO DE CAMBIOS
+-- =========================================================
+
+-- Una fila por operación; id_padre permite resolver dependencias aunque la
+-- fila ya no exista (Tarea -> id_proyecto, TareaEquipoHist -> id_tarea)
+CREATE TABLE IF NOT EXISTS RegistroCambios (
+    id_cambio BIGINT AUTO_INCREMENT PRIMARY KEY,
+    tabla VARCHAR(32) NOT NULL,
+    id_registro INT NOT NULL,
+    id_padre INT NULL,
+    operacion CHAR(1) NOT NULL,  -- I, U, D
+    fecha_hora TIMESTAMP(3) DEFAULT CURRENT_TIMESTAMP(3),
+    INDEX idx_rc_fecha (fecha_hora)
+) ENGINE=InnoDB;
+
+-- =========================================================
+-- TRIGGERS DE REGISTRO
+-- =========================================================
+
+DELIMITER //
+
+-- Trigger: Registrar INSERT en Proyecto
+CREATE TRIGGER trg_proyecto_cambio_ins
+AFTER INSERT ON Proyecto
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('Proyecto', NEW.id_proyecto, NULL, 'I');
+END//
+
+-- Trigger: Registrar UPDATE en Proyecto
+CREATE TRIGGER trg_proyecto_cambio_upd
+AFTER UPDATE ON Proyecto
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('Proyecto', NEW.id_proyecto, NULL, 'U');
+END//
+
+-- Trigger: Registrar DELETE en Proyecto
+CREATE TRIGGER trg_proyecto_cambio_del
+AFTER DELETE ON Proyecto
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('Proyecto', OLD.id_proyecto, NULL, 'D');
+END//
+
+-- Trigger: Registrar INSERT en Tarea
+CREATE TRIGGER trg_tarea_cambio_ins
+AFTER INSERT ON Tarea
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('Tarea', NEW.id_tarea, NEW.id_proyecto, 'I');
+END//
+
+-- Trigger: Registrar UPDATE en Tarea
+CREATE TRIGGER trg_tarea_cambio_upd
+AFTER UPDATE ON Tarea
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('Tarea', NEW.id_tarea, NEW.id_proyecto, 'U');
+    IF NOT (OLD.id_proyecto <=> NEW.id_proyecto) THEN
+        INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+        VALUES ('Tarea', OLD.id_tarea, OLD.id_proyecto, 'U');
+    END IF;
+END//
+
+-- Trigger: Registrar DELETE en Tarea
+CREATE TRIGGER trg_tarea_cambio_del
+AFTER DELETE ON Tarea
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('Tarea', OLD.id_tarea, OLD.id_proyecto, 'D');
+END//
+
+-- Trigger: Registrar INSERT en Cliente
+CREATE TRIGGER trg_cliente_cambio_ins
+AFTER INSERT ON Cliente
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('Cliente', NEW.id_cliente, NULL, 'I');
+END//
+
+-- Trigger: Registrar UPDATE en Cliente
+CREATE TRIGGER trg_cliente_cambio_upd
+AFTER UPDATE ON Cliente
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('Cliente', NEW.id_cliente, NULL, 'U');
+END//
+
+-- Trigger: Registrar DELETE en Cliente
+CREATE TRIGGER trg_cliente_cambio_del
+AFTER DELETE ON Cliente
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('Cliente', OLD.id_cliente, NULL, 'D');
+END//
+
+-- Trigger: Registrar INSERT en Empleado
+CREATE TRIGGER trg_empleado_cambio_ins
+AFTER INSERT ON Empleado
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('Empleado', NEW.id_empleado, NULL, 'I');
+END//
+
+-- Trigger: Registrar UPDATE en Empleado
+CREATE TRIGGER trg_empleado_cambio_upd
+AFTER UPDATE ON Empleado
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('Empleado', NEW.id_empleado, NULL, 'U');
+END//
+
+-- Trigger: Registrar DELETE en Empleado
+CREATE TRIGGER trg_empleado_cambio_del
+AFTER DELETE ON Empleado
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('Empleado', OLD.id_empleado, NULL, 'D');
+END//
+
+-- Trigger: Registrar INSERT en Equipo
+CREATE TRIGGER trg_equipo_cambio_ins
+AFTER INSERT ON Equipo
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('Equipo', NEW.id_equipo, NULL, 'I');
+END//
+
+-- Trigger: Registrar UPDATE en Equipo
+CREATE TRIGGER trg_equipo_cambio_upd
+AFTER UPDATE ON Equipo
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('Equipo', NEW.id_equipo, NULL, 'U');
+END//
+
+-- Trigger: Registrar DELETE en Equipo
+CREATE TRIGGER trg_equipo_cambio_del
+AFTER DELETE ON Equipo
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('Equipo', OLD.id_equipo, NULL, 'D');
+END//
+
+-- Trigger: Registrar INSERT en TareaEquipoHist
+CREATE TRIGGER trg_tarea_equipo_cambio_ins
+AFTER INSERT ON TareaEquipoHist
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('TareaEquipoHist', NEW.id_tarea_equipo, NEW.id_tarea, 'I');
+END//
+
+-- Trigger: Registrar UPDATE en TareaEquipoHist
+CREATE TRIGGER trg_tarea_equipo_cambio_upd
+AFTER UPDATE ON TareaEquipoHist
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('TareaEquipoHist', NEW.id_tarea_equipo, NEW.id_tarea, 'U');
+    IF NOT (OLD.id_tarea <=> NEW.id_tarea) THEN
+        INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+        VALUES ('TareaEquipoHist', OLD.id_tarea_equipo, OLD.id_tarea, 'U');
+    END IF;
+END//
+
+-- Trigger: Registrar DELETE en TareaEquipoHist
+CREATE TRIGGER trg_tarea_equipo_cambio_del
+AFTER DELETE ON TareaEquipoHist
+FOR EACH ROW
+BEGIN
+    INSERT INTO RegistroCambios (tabla, id_registro, id_padre, operacion)
+    VALUES ('TareaEquipoHist', OLD.id_tarea_equipo, OLD.id_tarea, 'D');
+END//
+
+DELIMITER ;
+
+SELECT 'Registro de cambios instalado' AS resultado;
@@ -2,6 +2,13 @@
 -- PROCEDIMIENTOS ALMACENADOS ETL COMPLETA SEGURIDAD
 -- Python solo ejecuta: CALL sp_ejecutar_etl_completo()
 -- CERO nombres de tablas/columnas en código Python
+-- Recarga blue/green: se carga en tablas *_next y se publica con un único
+-- RENAME TABLE atómico; las tablas reemplazadas quedan en *_prev y
+-- CALL sp_revertir_etl_completo() las restablece al instante.
+-- DimTiempo no se intercambia: solo acumula fechas y se carga en la viva
+-- (HechoOKR la referencia). CREATE TABLE ... LIKE no copia claves foráneas,
+-- así que tras la primera recarga por este procedimiento el DW queda sin
+-- ellas; la recarga del dashboard (src/etl/recarga_completa.py) sí las replica.
 
 USE dw_proyectos_hist;
 
@@ -29,24 +36,21 @@ BEGIN
             NOW() AS fecha_hora;
     END;
     
-    START TRANSACTION;
-    
-    -- PASO 1: LIMPIAR DATAWAREHOUSE
+    -- PASO 1: PREPARAR TABLAS SOMBRA (las vivas siguen sirviendo consultas)
     
-    SET FOREIGN_KEY_CHECKS = 0;
+    SET @fk_previo = @@FOREIGN_KEY_CHECKS, FOREIGN_KEY_CHECKS = 0;
+    DROP TABLE IF EXISTS HechoTarea_next, HechoProyecto_next,
+        DimProyecto_next, DimEquipo_next, DimEmpleado_next, DimCliente_next;
+    SET FOREIGN_KEY_CHECKS = @fk_previo;
     
-    DELETE FROM HechoTarea;
-    DELETE FROM HechoProyecto;
-    DELETE FROM DimTiempo;
-    DELETE FROM DimProyecto;
-    DELETE FROM DimEquipo;
-    DELETE FROM DimEmpleado;
-    DELETE FROM DimCliente;
+    CREATE TABLE DimCliente_next LIKE DimCliente;
+    CREATE TABLE DimEmpleado_next LIKE DimEmpleado;
+    CREATE TABLE DimEquipo_next LIKE DimEquipo;
+    CREATE TABLE DimProyecto_next LIKE DimProyecto;
+    CREATE TABLE HechoProyecto_next LIKE HechoProyecto;
+    CREATE TABLE HechoTarea_next LIKE HechoTarea;
     
-    ALTER TABLE HechoTarea AUTO_INCREMENT = 1;
-    ALTER TABLE HechoProyecto AUTO_INCREMENT = 1;
-    
-    SET FOREIGN_KEY_CHECKS = 1;
+    START TRANSACTION;
     
     -- PASO 2: GENERAR DIMENSIÓN TIEMPO 
     
@@ -81,7 +85,7 @@ BEGIN
     -- PASO 3: CARGAR DIMENSIONES DESDE BD ORIGEN
     
     -- DimCliente
-    INSERT INTO DimCliente (
+    INSERT INTO DimCliente_next (
         id_cliente, nombre, sector, contacto,
         telefono, email, direccion, fecha_registro, activo
     )
@@ -94,7 +98,7 @@ BEGIN
     SET v_clientes = ROW_COUNT();
     
     -- DimEmpleado
-    INSERT INTO DimEmpleado (
+    INSERT INTO DimEmpleado_next (
         id_empleado, nombre, puesto, departamento,
         salario_base, fecha_ingreso, activo
     )
@@ -107,7 +111,7 @@ BEGIN
     SET v_empleados = ROW_COUNT();
     
     -- DimEquipo
-    INSERT INTO DimEquipo (
+    INSERT INTO DimEquipo_next (
         id_equipo, nombre_equipo, descripcion,
         fecha_creacion, activo
     )
@@ -120,13 +124,13 @@ BEGIN
     SET v_equipos = ROW_COUNT();
     
     -- DimProyecto (solo completados y cancelados)
-    INSERT INTO DimProyecto (
+    INSERT INTO DimProyecto_next (
         id_proyecto, nombre_proyecto, descripcion,
-        fecha_inicio_plan, fecha_fin_plan, presupuesto_plan, prioridad
+        fecha_inicio_plan, fecha_fin_plan, presupuesto_plan, prioridad, id_estado
     )
     SELECT 
         id_proyecto, nombre, descripcion,
-        fecha_inicio, fecha_fin_plan, presupuesto, prioridad
+        fecha_inicio, fecha_fin_plan, presupuesto, prioridad, id_estado
     FROM gestionproyectos_hist.Proyecto
     WHERE id_estado IN (3, 4);
     
@@ -135,7 +139,7 @@ BEGIN
     -- PASO 4: CARGAR HECHOS CON MÉTRICAS CALCULADAS
     
     -- HechoProyecto con todas las métricas
-    INSERT INTO HechoProyecto (
+    INSERT INTO HechoProyecto_next (
         id_proyecto, id_cliente, id_empleado_gerente, id_equipo,
         id_tiempo_inicio, id_tiempo_fin_plan, id_tiempo_fin_real,
         duracion_planificada, duracion_real, variacion_cronograma,
@@ -206,7 +210,7 @@ BEGIN
     WHERE p.id_estado IN (3, 4);
     
     -- HechoTarea con métricas
-    INSERT INTO HechoTarea (
+    INSERT INTO HechoTarea_next (
         id_tarea, id_proyecto, id_empleado,
         id_tiempo_inicio_plan, id_tiempo_fin_plan,
         id_tiempo_inicio_real, id_tiempo_fin_real,
@@ -255,6 +259,27 @@ BEGIN
     
     COMMIT;
     
+    -- PASO 5: PUBLICAR (intercambio atómico; las vivas pasan a *_prev)
+    
+    -- Las *_prev pueden referenciarse entre sí (RENAME se lleva las claves foráneas)
+    SET @fk_previo = @@FOREIGN_KEY_CHECKS, FOREIGN_KEY_CHECKS = 0;
+    DROP TABLE IF EXISTS HechoTarea_prev, HechoProyecto_prev,
+        DimProyecto_prev, DimEquipo_prev, DimEmpleado_prev, DimCliente_prev;
+    SET FOREIGN_KEY_CHECKS = @fk_previo;
+    
+    RENAME TABLE
+        DimCliente TO DimCliente_prev, DimCliente_next TO DimCliente,
+        DimEmpleado TO DimEmpleado_prev, DimEmpleado_next TO DimEmpleado,
+        DimEquipo TO DimEquipo_prev, DimEquipo_next TO DimEquipo,
+        DimProyecto TO DimProyecto_prev, DimProyecto_next TO DimProyecto,
+        HechoProyecto TO HechoProyecto_prev, HechoProyecto_next TO HechoProyecto,
+        HechoTarea TO HechoTarea_prev, HechoTarea_next TO HechoTarea;
+    
+    -- Nueva versión de datos: invalida la caché de respuestas del dashboard
+    INSERT INTO VersionDatosDW (id, version) VALUES (1, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1;
+    COMMIT;
+    
     -- RETORNAR RESULTADO EXITOSO
     
     SELECT 
@@ -270,6 +295,38 @@ BEGIN
         
 END//
 
+-- REVERTIR A LA RECARGA ANTERIOR (intercambia vivas y *_prev; llamarlo de
+-- nuevo restablece la última recarga)
+
+DROP PROCEDURE IF EXISTS sp_revertir_etl_completo//
+
+CREATE PROCEDURE sp_revertir_etl_completo()
+BEGIN
+    DECLARE v_prev INT DEFAULT 0;
+    
+    SELECT COUNT(*) INTO v_prev
+    FROM information_schema.tables
+    WHERE table_schema = DATABASE()
+      AND table_name IN ('DimCliente_prev', 'DimEmpleado_prev', 'DimEquipo_prev', 'DimProyecto_prev',
+                         'HechoProyecto_prev', 'HechoTarea_prev');
+    
+    IF v_prev < 6 THEN
+        SELECT 'ERROR' AS estado, 'No hay recarga anterior para revertir' AS mensaje, NOW() AS fecha_hora;
+    ELSE
+        RENAME TABLE
+            DimCliente TO DimCliente_swap, DimCliente_prev TO DimCliente, DimCliente_swap TO DimCliente_prev,
+            DimEmpleado TO DimEmpleado_swap, DimEmpleado_prev TO DimEmpleado, DimEmpleado_swap TO DimEmpleado_prev,
+            DimEquipo TO DimEquipo_swap, DimEquipo_prev TO DimEquipo, DimEquipo_swap TO DimEquipo_prev,
+            DimProyecto TO DimProyecto_swap, DimProyecto_prev TO DimProyecto, DimProyecto_swap TO DimProyecto_prev,
+            HechoProyecto TO HechoProyecto_swap, HechoProyecto_prev TO HechoProyecto, HechoProyecto_swap TO HechoProyecto_prev,
+            HechoTarea TO HechoTarea_swap, HechoTarea_prev TO HechoTarea, HechoTarea_swap TO HechoTarea_prev;
+        INSERT INTO VersionDatosDW (id, version) VALUES (1, 1)
+            ON DUPLICATE KEY UPDATE version = version + 1;
+        COMMIT;
+        SELECT 'EXITOSO' AS estado, 'DataWarehouse revertido a la recarga anterior' AS mensaje, NOW() AS fecha_hora;
+    END IF;
+END//
+
 DELIMITER ;
 
 -- VERIFICACIÓN
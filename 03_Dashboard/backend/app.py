@@ -1,14 +1,16 @@
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-import mysql.connector
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 import sys
 import os
+import time
 import subprocess
 import traceback
 from datetime import datetime, date
-from decimal import Decimal
+from functools import wraps
+import hashlib
 import json
 
 app = Flask(__name__)
@@ -28,6 +30,45 @@ for p in (SRC_ROOT, CONFIG_ROOT, ETL_ROOT):
     if p not in sys.path:
         sys.path.append(p)
 
+from src.config.config_conexion import (
+    configure_pool, get_pooled_connection, get_pool_stats, get_engine_stats, get_engine as get_shared_engine
+)
+from src.etl.carga_lotes import asegurar_columna
+from src.etl.extraccion import sql_extraccion_proyectos
+from src.etl.recarga_completa import (
+    preparar_tablas_nuevas, publicar_tablas_nuevas, puede_revertir, revertir_publicacion
+)
+from src.etl.version_datos import asegurar_tabla_version, incrementar_version, leer_version
+from cache_respuestas import CacheRespuestas
+from compresion import comprimir_respuesta, filas_en_columnas
+from paneles import (
+    panel_bsc_okr, panel_filtros_disponibles, panel_kpis_ejecutivos, panel_kpis_v2, panel_vision_estrategica
+)
+from paralelo import CONSULTAS_HILOS, consultas_en_paralelo, en_paralelo, ejecutar_en_paralelo
+from trabajos_etl import GestorTrabajos, asegurar_tabla_trabajos, guardar_trabajo, leer_trabajo, leer_ultimo_trabajo
+from eventos import CanalEventos
+import json_rapido
+
+
+class ProveedorJSON(DefaultJSONProvider):
+    """jsonify con json_rapido: Decimal/fechas/bytes de las filas del cursor sin convertir a mano"""
+
+    def dumps(self, obj, **kwargs):
+        return json_rapido.dumps(obj, ordenar=kwargs.get('sort_keys', self.sort_keys),
+                                 indentar=bool(kwargs.get('indent')))
+
+    def loads(self, s, **kwargs):
+        return json_rapido.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = (self.compact is None and self._app.debug) or self.compact is False
+        cuerpo = json_rapido.dumps_bytes(obj, ordenar=self.sort_keys, indentar=indentar) + b'\n'
+        return self._app.response_class(cuerpo, mimetype=self.mimetype)
+
+
+app.json = ProveedorJSON(app)
+
 # Configuración de base de datos desde variables de entorno
 # Prioridad: Variables de entorno > Fallback local
 
@@ -61,40 +102,149 @@ print(f"🌐 Ambiente: {os.getenv('FLASK_ENV', 'development')}")
 # Variable global para ambiente ETL
 AMBIENTE = os.getenv('ETL_AMBIENTE', 'local')
 
-def get_connection(db_type='origen'):
-    """Obtener conexión a la base de datos"""
-    if db_type == 'origen':
-        connection_params = {
-            'user': DB_CONFIG['user_origen'],
-            'password': DB_CONFIG['password_origen'],
-            'database': DB_CONFIG['db_origen']
-        }
-        # Si hay unix_socket, usarlo en lugar de host/port
-        if 'unix_socket' in DB_CONFIG and DB_CONFIG['unix_socket']:
-            connection_params['unix_socket'] = DB_CONFIG['unix_socket']
-        else:
-            connection_params['host'] = DB_CONFIG['host_origen']
-            connection_params['port'] = DB_CONFIG['port_origen']
-        
-        return mysql.connector.connect(**connection_params)
+def _parametros_conexion(db_type='origen'):
+    """Parámetros de mysql.connector para origen o destino según DB_CONFIG"""
+    sufijo = 'origen' if db_type == 'origen' else 'destino'
+    connection_params = {
+        'user': DB_CONFIG[f'user_{sufijo}'],
+        'password': DB_CONFIG[f'password_{sufijo}'],
+        'database': DB_CONFIG[f'db_{sufijo}']
+    }
+    # Si hay unix_socket, usarlo en lugar de host/port
+    if DB_CONFIG.get('unix_socket'):
+        connection_params['unix_socket'] = DB_CONFIG['unix_socket']
     else:
-        # Conexión a destino (datawarehouse)
-        connection_params = {
-            'user': DB_CONFIG['user_destino'],
-            'password': DB_CONFIG['password_destino'],
-            'database': DB_CONFIG['db_destino']
-        }
-        # Si hay unix_socket, usarlo en lugar de host/port
-        if 'unix_socket' in DB_CONFIG and DB_CONFIG['unix_socket']:
-            connection_params['unix_socket'] = DB_CONFIG['unix_socket']
+        connection_params['host'] = DB_CONFIG[f'host_{sufijo}']
+        connection_params['port'] = DB_CONFIG[f'port_{sufijo}']
+    return connection_params
+
+# Pools compartidos (se abren en el primer uso de cada worker); tamaño y
+# verificación por DB_POOL_* (ver src/config/config_conexion.py)
+configure_pool('origen', _parametros_conexion('origen'))
+configure_pool('destino', _parametros_conexion('destino'))
+# Conexiones de los hilos de consultas concurrentes: una por hilo, aparte de las
+# de los requests, que las retienen mientras esperan a esos hilos (ver paralelo.py)
+configure_pool('destino_consultas', _parametros_conexion('destino'), tamano=CONSULTAS_HILOS)
+
+def get_connection(db_type='origen'):
+    """Obtener conexión a la base de datos desde el pool (close() la devuelve al pool)"""
+    return get_pooled_connection('origen' if db_type == 'origen' else 'destino')
+
+def get_dw_connection():
+    """Conexión al DW del request actual: se toma del pool una sola vez por request
+    y se devuelve en el teardown (los endpoints no deben cerrarla)"""
+    if 'dw_conn' not in g:
+        g.dw_conn = get_connection('destino')
+    return g.dw_conn
+
+def nueva_conexion_dw():
+    """Conexión DW del pool de los hilos de consultas (paralelo.py); quien la pide la cierra"""
+    return get_pooled_connection('destino_consultas')
+
+@app.teardown_appcontext
+def liberar_dw_connection(exc):
+    """Devolver al pool la conexión DW del request, si se usó"""
+    conn = g.pop('dw_conn', None)
+    if conn is not None:
+        try:
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ Error devolviendo conexión DW al pool: {e}")
+
+# ========================================
+# CACHÉ DE RESPUESTAS OLAP/BSC
+# ========================================
+# Las entradas y los ETag se derivan de la versión de datos del DW (VersionDatosDW),
+# que cada carga incrementa al confirmar; la versión se relee como mucho cada
+# CACHE_VERSION_SEG segundos por worker, así que un 304 normalmente no toca MySQL.
+CACHE_VERSION_SEG = float(os.getenv('CACHE_VERSION_SEG', '1'))
+cache_respuestas = CacheRespuestas()
+_version_dw = {'valor': None, 'leida': 0.0}
+
+def version_datos_dw(forzar=False):
+    """Versión actual de los datos del DW (memorizada CACHE_VERSION_SEG segundos)"""
+    ahora = time.monotonic()
+    if forzar or _version_dw['valor'] is None or ahora - _version_dw['leida'] >= CACHE_VERSION_SEG:
+        cursor = get_dw_connection().cursor()
+        try:
+            valor = leer_version(cursor)
+        finally:
+            cursor.close()
+        _version_dw.update(valor=valor, leida=ahora)
+    return _version_dw['valor']
+
+def registrar_carga_dw(conn):
+    """Incrementar (y confirmar) la versión de datos tras una carga en el DW y vaciar la caché local"""
+    cursor = conn.cursor()
+    try:
+        asegurar_tabla_version(cursor)
+        incrementar_version(cursor)
+    finally:
+        cursor.close()
+    conn.commit()
+    cache_respuestas.invalidar()
+    _version_dw['valor'] = None
+
+def cache_dw(vista):
+    """Respuestas condicionadas a la versión de datos del DW:
+    - ETag fuerte = hash(versión + ruta + query args normalizados); si coincide con
+      If-None-Match se responde 304 sin ejecutar el endpoint
+    - las respuestas 200 se guardan en la caché de respuestas con la misma clave
+    - los requests con la misma clave que llegan mientras otro calcula esperan y
+      reciben ese resultado (``coalesced`` en /cache/estadisticas)"""
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        try:
+            version = version_datos_dw()
+        except Exception as e:
+            print(f"⚠️ Caché omitida, no se pudo leer la versión del DW: {e}")
+            return vista(*args, **kwargs)
+        clave = (request.path, tuple(sorted(request.args.items(multi=True))))
+        etag = hashlib.blake2b(repr((version,) + clave).encode('utf-8'), digest_size=16).hexdigest()
+        # El cliente puede revalidar con el ETag de la versión comprimida (ver compresion.py)
+        if any(request.if_none_match.contains(e) for e in (etag, f"{etag}-gzip", f"{etag}-deflate")):
+            cache_respuestas.registrar_no_modificado()
+            respuesta = app.response_class(status=304)
         else:
-            connection_params['host'] = DB_CONFIG['host_destino']
-            connection_params['port'] = DB_CONFIG['port_destino']
-        
-        return mysql.connector.connect(**connection_params)
+            entrada = cache_respuestas.obtener(clave, version) if cache_respuestas.activa else None
+            if entrada is not None:
+                datos, mimetype = entrada
+                respuesta = app.response_class(datos, status=200, mimetype=mimetype)
+            else:
+                # Requests idénticos simultáneos comparten un solo cálculo (single-flight)
+                def calcular():
+                    calculada = app.make_response(vista(*args, **kwargs))
+                    if calculada.status_code == 200 and cache_respuestas.activa:
+                        cache_respuestas.guardar(clave, version, (calculada.get_data(), calculada.mimetype))
+                    return calculada
+                calculada = cache_respuestas.una_vez(clave, version, calcular)
+                # Copia por request (con sus cabeceras): la respuesta calculada se comparte entre hilos
+                respuesta = app.response_class(calculada.get_data(), status=calculada.status_code,
+                                               headers=list(calculada.headers.items()))
+                if respuesta.status_code != 200:
+                    return respuesta
+        respuesta.set_etag(etag)
+        # El navegador guarda la respuesta pero revalida siempre (If-None-Match)
+        respuesta.headers['Cache-Control'] = 'no-cache'
+        return respuesta
+    return envoltura
+
+@app.after_request
+def comprimir(respuesta):
+    """Compresión gzip/deflate negociada de respuestas grandes (COMPRESION_*)"""
+    return comprimir_respuesta(respuesta, request.accept_encodings)
+
+def formato_columnar():
+    """True si el cliente pidió ?format=columns"""
+    return request.args.get('format') == 'columns'
+
+@app.route('/cache/estadisticas', methods=['GET'])
+def estadisticas_cache():
+    """Hits, misses y evictions de la caché de respuestas"""
+    return jsonify({'success': True, 'cache': cache_respuestas.estadisticas(), 'version_datos': _version_dw['valor']})
 
 def get_engine(db_type='origen'):
-    """Obtener engine SQLAlchemy"""
+    """Obtener engine SQLAlchemy (uno por proceso y db_type, ver config_conexion.get_engine)"""
     if db_type == 'origen':
         # Si hay unix_socket, usar ese en lugar de host/port
         if 'unix_socket' in DB_CONFIG and DB_CONFIG['unix_socket']:
@@ -102,9 +252,10 @@ def get_engine(db_type='origen'):
         else:
             url = f"mysql+mysqlconnector://{DB_CONFIG['user_origen']}:{DB_CONFIG['password_origen']}@{DB_CONFIG['host_origen']}:{DB_CONFIG['port_origen']}/{DB_CONFIG['db_origen']}"
     else:
+        db_type = 'destino'
         url = f"mysql+mysqlconnector://{DB_CONFIG['user_destino']}:{DB_CONFIG['password_destino']}@{DB_CONFIG['host_destino']}:{DB_CONFIG['port_destino']}/{DB_CONFIG['db_destino']}"
     
-    return create_engine(url, pool_pre_ping=True)
+    return get_shared_engine(db_type, url)
 
 @app.route('/')
 def home():
@@ -116,32 +267,38 @@ def home():
             'GET /': 'Información de la API',
             'GET /status': 'Estado de conexiones',
             'GET /datos-origen': 'Datos de la BD origen',
-            'GET /datos-datawarehouse': 'Datos del datawarehouse',
+            'GET /datos-datawarehouse': 'Datos del datawarehouse (?limite=50&offset=0)',
             'POST /insertar-datos': 'Insertar datos de prueba',
-            'POST /ejecutar-etl': 'Ejecutar proceso ETL',
+            'POST /ejecutar-etl': 'Encolar proceso ETL (202 + job_id)',
+            'GET /etl/jobs/<id>': 'Avance y resultado de un trabajo ETL',
+            'GET /eventos': 'Eventos SSE: avance ETL y cambios de versión de datos',
+            'GET /dashboard/snapshot': 'Paneles OLAP/BSC en una sola respuesta',
             'DELETE /limpiar-datos': 'Limpiar todas las tablas'
         }
     })
 
 @app.route('/status')
 def status():
-    """Verificar estado de las conexiones"""
+    """Verificar estado de las conexiones (origen y destino se prueban a la vez)"""
+    def contar(db_type, tabla):
+        conn = get_connection('origen') if db_type == 'origen' else nueva_conexion_dw()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM {tabla}")
+            total = cursor.fetchone()[0]
+            cursor.close()
+            return total
+        finally:
+            conn.close()
+    
     try:
-        # Probar conexión origen
-        conn_origen = get_connection('origen')
-        cursor_origen = conn_origen.cursor()
-        cursor_origen.execute("SELECT COUNT(*) FROM Proyecto")
-        proyectos = cursor_origen.fetchone()[0]
-        cursor_origen.close()
-        conn_origen.close()
-        
-        # Probar conexión destino
-        conn_destino = get_connection('destino')
-        cursor_destino = conn_destino.cursor()
-        cursor_destino.execute("SELECT COUNT(*) FROM HechoProyecto")
-        hechos = cursor_destino.fetchone()[0]
-        cursor_destino.close()
-        conn_destino.close()
+        conteos, errores, _ = en_paralelo({
+            'origen': lambda: contar('origen', 'Proyecto'),
+            'destino': lambda: contar('destino', 'HechoProyecto')
+        })
+        if errores:
+            raise Exception('; '.join(f"{bd}: {error}" for bd, error in errores.items()))
+        proyectos, hechos = conteos['origen'], conteos['destino']
         
         return jsonify({
             'status': 'success',
@@ -154,7 +311,10 @@ def status():
                 'conectado': True,
                 'hechos_proyecto': hechos,
                 'host': DB_CONFIG['host_destino']
-            }
+            },
+            'pools': get_pool_stats(),
+            'engines': get_engine_stats(),
+            'eventos': canal_eventos.estadisticas()
         })
         
     except Exception as e:
@@ -217,9 +377,14 @@ def datos_origen():
 
 @app.route('/datos-datawarehouse')
 def datos_datawarehouse():
-    """Obtener datos del datawarehouse"""
+    """Obtener datos del datawarehouse
+
+    Query params: limite (proyectos por página, 50 por defecto, máx. 500) y offset.
+    """
     try:
-        conn = get_connection('destino')
+        limite = max(1, min(request.args.get('limite', 50, type=int), 500))
+        offset = max(0, request.args.get('offset', 0, type=int))
+        conn = get_dw_connection()
         cursor = conn.cursor(buffered=True)  # buffered=True para evitar "Unread result found"
         
         # Obtener estadísticas del DW
@@ -264,8 +429,8 @@ def datos_datawarehouse():
                 'proyectos_completados': 0
             }
         
-        # Obtener detalle de proyectos en el DW con nombres desde DimProyecto
-        cursor.execute("""
+        # Obtener detalle de proyectos en el DW (paginado) con nombre y estado desde DimProyecto
+        sql_proyectos = """
             SELECT 
                 hp.id_proyecto,
                 dp.nombre_proyecto,
@@ -282,21 +447,24 @@ def datos_datawarehouse():
                 de.nombre as gerente,
                 hp.cumplimiento_presupuesto,
                 hp.tareas_completadas,
-                hp.tareas_canceladas
+                hp.tareas_canceladas,
+                {id_estado} as id_estado
             FROM HechoProyecto hp
             LEFT JOIN DimProyecto dp ON hp.id_proyecto = dp.id_proyecto
             LEFT JOIN DimCliente dc ON hp.id_cliente = dc.id_cliente
             LEFT JOIN DimEmpleado de ON hp.id_empleado_gerente = de.id_empleado
             ORDER BY hp.id_proyecto
-            LIMIT 50
-        """)
+            LIMIT %s OFFSET %s
+        """
+        try:
+            cursor.execute(sql_proyectos.format(id_estado='dp.id_estado'), (limite, offset))
+        except Exception as e:
+            if getattr(e, 'errno', None) != 1054:  # DW aún sin DimProyecto.id_estado (antes de la próxima ETL)
+                raise
+            cursor.execute(sql_proyectos.format(id_estado='NULL'), (limite, offset))
         
         proyectos_dw_rows = cursor.fetchall()
         cursor.close()
-        conn.close()
-        
-        # Obtener estados desde base origen (solo en modo distribuido)
-        proyectos_dw = []
         
         # Mapeo de id_estado a nombre_estado
         mapeo_estados = {
@@ -307,34 +475,31 @@ def datos_datawarehouse():
             5: 'Cancelado'
         }
         
+        # id_estado viene de DimProyecto; solo los proyectos cargados antes de tener
+        # esa columna se resuelven en origen, todos en una consulta por id_proyecto
+        estados = {row[0]: row[13] for row in proyectos_dw_rows if row[13] is not None}
+        pendientes = [row[0] for row in proyectos_dw_rows if row[13] is None]
+        if pendientes:
+            conn_origen = None
+            try:
+                conn_origen = get_connection('origen')
+                cursor_origen = conn_origen.cursor()
+                cursor_origen.execute(
+                    f"SELECT id_proyecto, id_estado FROM Proyecto WHERE id_proyecto IN ({','.join(['%s'] * len(pendientes))})",
+                    tuple(pendientes)
+                )
+                estados.update(cursor_origen.fetchall())
+                cursor_origen.close()
+            except Exception as e:
+                print(f" Error obteniendo estados desde origen: {str(e)}")
+            finally:
+                if conn_origen is not None:
+                    conn_origen.close()
+        
+        proyectos_dw = []
         if AMBIENTE == 'distribuido':
-            conn_origen = get_connection('origen')
-            cursor_origen = conn_origen.cursor(buffered=True)
-            
             for row in proyectos_dw_rows:
-                id_proy = row[0]
-                nombre_proy = row[1]
-                # Consultar id_estado desde origen por NOMBRE
-                try:
-                    cursor_origen.execute("""
-                        SELECT id_estado FROM Proyecto WHERE nombre = %s
-                    """, (nombre_proy,))
-                    estado_row = cursor_origen.fetchone()
-                    if estado_row:
-                        id_estado = estado_row[0]
-                        estado = mapeo_estados.get(id_estado, 'Desconocido')
-                    else:
-                        # Si no encuentra por nombre, intentar por ID
-                        cursor_origen.execute("""
-                            SELECT id_estado FROM Proyecto WHERE id_proyecto = %s
-                        """, (id_proy,))
-                        estado_row = cursor_origen.fetchone()
-                        id_estado = estado_row[0] if estado_row else None
-                        estado = mapeo_estados.get(id_estado, 'Desconocido') if estado_row else 'Desconocido'
-                except Exception as e:
-                    print(f" Error obteniendo estado para proyecto {nombre_proy}: {str(e)}")
-                    estado = 'Desconocido'
-                    id_estado = None
+                estado = mapeo_estados.get(estados.get(row[0]), 'Desconocido')
                 
                 proyectos_dw.append({
                     'id_proyecto': row[0],
@@ -353,43 +518,14 @@ def datos_datawarehouse():
                     'estado': estado,
                     'prioridad': 'Media'
                 })
-            
-            cursor_origen.close()
-            conn_origen.close()
         else:
-            # Modo local: consultar id_estado desde base origen y mapear a nombre
-            conn_origen = get_connection('origen')
-            cursor_origen = conn_origen.cursor(buffered=True)  # buffered para evitar errores
-            
-            # Mapeo de id_estado a nombre_estado (actualizado)
-            mapeo_estados = {
-                1: 'Planificación',
-                2: 'En Progreso',
-                3: 'En Pausa',
-                4: 'Completado',
-                5: 'Cancelado'
-            }
-            
             for row in proyectos_dw_rows:
                 nombre_proyecto = row[1]
                 porcentaje_completado = float(row[7]) if row[7] else 0
                 
-                # Consultar id_estado desde origen usando el NOMBRE del proyecto
-                try:
-                    cursor_origen.execute("""
-                        SELECT p.id_estado
-                        FROM Proyecto p
-                        WHERE TRIM(p.nombre) = TRIM(%s)
-                    """, (nombre_proyecto,))
-                    estado_row = cursor_origen.fetchone()
-                    if estado_row:
-                        id_estado = estado_row[0]
-                        estado = mapeo_estados.get(id_estado, 'Desconocido')
-                    else:
-                        # Fallback: determinar por porcentaje
-                        estado = "Completado" if porcentaje_completado >= 100 else "Cancelado"
-                except Exception as e:
-                    print(f" Error obteniendo estado para proyecto '{nombre_proyecto}': {str(e)}")
+                if row[0] in estados:
+                    estado = mapeo_estados.get(estados[row[0]], 'Desconocido')
+                else:
                     # Fallback: determinar por porcentaje
                     estado = "Completado" if porcentaje_completado >= 100 else "Cancelado"
                 
@@ -409,9 +545,6 @@ def datos_datawarehouse():
                     'tareas_completadas': row[11] if row[11] else 0,
                     'tareas_canceladas': row[12] if row[12] else 0
                 })
-            
-            cursor_origen.close()
-            conn_origen.close()
         
         # Calcular proyectos completados basándose en estados reales
         proyectos_completados = sum(1 for p in proyectos_dw if p.get('estado') == 'Completado')
@@ -451,7 +584,13 @@ def datos_datawarehouse():
                 'hechos_tarea': stats['hechotarea']
             },
             'metricas': metricas,
-            'proyectos': proyectos_dw
+            'proyectos': proyectos_dw,
+            'paginacion': {
+                'limite': limite,
+                'offset': offset,
+                'total': stats['hechoproyecto'],
+                'siguiente_offset': offset + limite if offset + limite < stats['hechoproyecto'] else None
+            }
         })
         
     except Exception as e:
@@ -479,204 +618,403 @@ def insertar_datos():
         import traceback
         return jsonify({'status': 'error','message': str(e),'traceback': traceback.format_exc()}), 500
 
-@app.route('/ejecutar-etl', methods=['POST'])
-def ejecutar_etl():
-    """Ejecutar proceso ETL usando Python mysql-connector (sin subprocess)"""
+# ========================================
+# CARGAS ETL EN SEGUNDO PLANO
+# ========================================
+# La recarga corre en el hilo de GestorTrabajos, no en el request: Gunicorn
+# (--timeout 120) no la mata a medias y el worker sigue atendiendo. El estado se
+# guarda en TrabajoETL para que /etl/jobs/<id> responda desde cualquier worker.
+BLOQUEO_RECARGA = 'etl_recarga_completa'  # GET_LOCK: una recarga a la vez entre procesos
+_tabla_trabajos = {'lista': False}
+
+def _persistir_trabajo(trabajo):
+    """Guardar el estado de un trabajo ETL en el DW (lo llama GestorTrabajos)"""
+    conn = get_connection('destino')
     try:
-        print(" Iniciando proceso ETL...")
-        
-        conn = get_connection('destino')
         cursor = conn.cursor()
-        
-        # 0. Verificar y agregar columna id_equipo ANTES del truncate
-        print(" Verificando estructura HechoProyecto...")
-        cursor.execute("SHOW COLUMNS FROM HechoProyecto LIKE 'id_equipo'")
-        if not cursor.fetchone():
-            print(" - Agregando columna id_equipo...")
-            cursor.execute("ALTER TABLE HechoProyecto ADD COLUMN id_equipo INT AFTER id_empleado_gerente")
-            cursor.execute("ALTER TABLE HechoProyecto ADD KEY idx_id_equipo (id_equipo)")
-        
-        # 1. Limpiar tablas
-        print(" Limpiando tablas...")
-        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
-        conn.commit()
-        
-        cursor.execute("TRUNCATE TABLE HechoTarea")
-        cursor.execute("TRUNCATE TABLE HechoProyecto")
-        conn.commit()
-        
-        cursor.execute("DELETE FROM DimCliente")
-        cursor.execute("DELETE FROM DimEmpleado")
-        cursor.execute("DELETE FROM DimEquipo")
-        cursor.execute("DELETE FROM DimProyecto")
-        conn.commit()
-        
-        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        if not _tabla_trabajos['lista']:
+            asegurar_tabla_trabajos(cursor)
+            _tabla_trabajos['lista'] = True
+        guardar_trabajo(cursor, trabajo, json_rapido.dumps(trabajo))
+        cursor.close()
         conn.commit()
+    finally:
+        conn.close()
+
+trabajos_etl = GestorTrabajos(persistir=_persistir_trabajo)
+
+def _recarga_completa(progreso):
+    """Recarga completa blue/green: se carga en tablas *_next y se publican con un
+    único RENAME TABLE; el dashboard nunca ve el DW vacío o a medio cargar.
+    Cada paso es una etapa de ``progreso`` con sus filas."""
+    print(" Iniciando proceso ETL...")
+    
+    conn = get_connection('destino')
+    cursor = conn.cursor()
+    cursor.execute("SELECT GET_LOCK(%s, 0)", (BLOQUEO_RECARGA,))
+    if not cursor.fetchone()[0]:
+        cursor.close()
+        conn.close()
+        raise RuntimeError('Ya hay una recarga ETL en curso en otro proceso')
+    try:
+        # 0. Verificar y agregar columnas id_equipo e id_estado (DimProyecto) ANTES de crear las tablas sombra
+        with progreso.etapa('estructura'):
+            print(" Verificando estructura HechoProyecto...")
+            cursor.execute("SHOW COLUMNS FROM HechoProyecto LIKE 'id_equipo'")
+            if not cursor.fetchone():
+                print(" - Agregando columna id_equipo...")
+                cursor.execute("ALTER TABLE HechoProyecto ADD COLUMN id_equipo INT AFTER id_empleado_gerente")
+                cursor.execute("ALTER TABLE HechoProyecto ADD KEY idx_id_equipo (id_equipo)")
+            asegurar_columna(cursor, 'DimProyecto', 'id_estado', 'INT NULL')
+        
+        # 1. Preparar tablas sombra (*_next); las vivas siguen sirviendo al dashboard.
+        #    DimTiempo no se intercambia: solo acumula fechas y se carga en la viva.
+        with progreso.etapa('preparar'):
+            print(" Preparando tablas *_next...")
+            preparar_tablas_nuevas(cursor)
+            conn.commit()
         
         # 2. Cargar dimensiones desde origen
         print(" Cargando dimensiones...")
         
         # DimCliente
-        cursor.execute("""
-            INSERT INTO DimCliente (id_cliente, nombre, sector)
-            SELECT id_cliente, nombre, sector FROM gestionproyectos_hist.Cliente
-        """)
-        conn.commit()
-        print(f" - DimCliente: {cursor.rowcount} registros")
+        with progreso.etapa('DimCliente'):
+            cursor.execute("""
+                INSERT INTO DimCliente_next (id_cliente, nombre, sector)
+                SELECT id_cliente, nombre, sector FROM gestionproyectos_hist.Cliente
+            """)
+            conn.commit()
+            progreso.filas(cursor.rowcount)
+            print(f" - DimCliente: {cursor.rowcount} registros")
         
         # DimEmpleado  
-        cursor.execute("""
-            INSERT INTO DimEmpleado (id_empleado, nombre, puesto)
-            SELECT id_empleado, nombre, puesto FROM gestionproyectos_hist.Empleado
-        """)
-        conn.commit()
-        print(f" - DimEmpleado: {cursor.rowcount} registros")
+        with progreso.etapa('DimEmpleado'):
+            cursor.execute("""
+                INSERT INTO DimEmpleado_next (id_empleado, nombre, puesto)
+                SELECT id_empleado, nombre, puesto FROM gestionproyectos_hist.Empleado
+            """)
+            conn.commit()
+            progreso.filas(cursor.rowcount)
+            print(f" - DimEmpleado: {cursor.rowcount} registros")
         
         # DimEquipo
-        cursor.execute("""
-            INSERT INTO DimEquipo (id_equipo, nombre_equipo, descripcion)
-            SELECT id_equipo, nombre_equipo, descripcion FROM gestionproyectos_hist.Equipo
-        """)
-        conn.commit()
-        print(f" - DimEquipo: {cursor.rowcount} registros")
+        with progreso.etapa('DimEquipo'):
+            cursor.execute("""
+                INSERT INTO DimEquipo_next (id_equipo, nombre_equipo, descripcion)
+                SELECT id_equipo, nombre_equipo, descripcion FROM gestionproyectos_hist.Equipo
+            """)
+            conn.commit()
+            progreso.filas(cursor.rowcount)
+            print(f" - DimEquipo: {cursor.rowcount} registros")
         
         # DimProyecto (solo Completados/Cancelados)
-        cursor.execute("""
-            INSERT INTO DimProyecto (id_proyecto, nombre_proyecto, fecha_inicio, presupuesto_plan)
-            SELECT id_proyecto, nombre, fecha_inicio, presupuesto
-            FROM gestionproyectos_hist.Proyecto
-            WHERE id_estado IN (4, 5)
-        """)
-        conn.commit()
-        proyectos_dim = cursor.rowcount
-        print(f" - DimProyecto: {proyectos_dim} registros")
+        with progreso.etapa('DimProyecto'):
+            cursor.execute("""
+                INSERT INTO DimProyecto_next (id_proyecto, nombre_proyecto, fecha_inicio, presupuesto_plan, id_estado)
+                SELECT id_proyecto, nombre, fecha_inicio, presupuesto, id_estado
+                FROM gestionproyectos_hist.Proyecto
+                WHERE id_estado IN (4, 5)
+            """)
+            conn.commit()
+            proyectos_dim = cursor.rowcount
+            progreso.filas(proyectos_dim)
+            print(f" - DimProyecto: {proyectos_dim} registros")
         
         # DimTiempo
-        cursor.execute("""
-            INSERT IGNORE INTO DimTiempo (id_tiempo, fecha, anio, mes, trimestre)
-            SELECT DISTINCT
-                CAST(DATE_FORMAT(fecha_fin_real, '%Y%m%d') AS UNSIGNED),
-                fecha_fin_real,
-                YEAR(fecha_fin_real),
-                MONTH(fecha_fin_real),
-                QUARTER(fecha_fin_real)
-            FROM gestionproyectos_hist.Proyecto
-            WHERE fecha_fin_real IS NOT NULL AND id_estado IN (4, 5)
-        """)
-        conn.commit()
-        print(f" - DimTiempo: {cursor.rowcount} registros")
+        with progreso.etapa('DimTiempo'):
+            cursor.execute("""
+                INSERT IGNORE INTO DimTiempo (id_tiempo, fecha, anio, mes, trimestre)
+                SELECT DISTINCT
+                    CAST(DATE_FORMAT(fecha_fin_real, '%Y%m%d') AS UNSIGNED),
+                    fecha_fin_real,
+                    YEAR(fecha_fin_real),
+                    MONTH(fecha_fin_real),
+                    QUARTER(fecha_fin_real)
+                FROM gestionproyectos_hist.Proyecto
+                WHERE fecha_fin_real IS NOT NULL AND id_estado IN (4, 5)
+            """)
+            conn.commit()
+            progreso.filas(cursor.rowcount)
+            print(f" - DimTiempo: {cursor.rowcount} registros")
         
         # 3. Cargar HechoProyecto
-        print(" Cargando HechoProyecto...")
-        cursor.execute("""
-            INSERT INTO HechoProyecto (
-                id_proyecto, id_cliente, id_empleado_gerente, id_equipo, id_tiempo_fin_real,
-                presupuesto, costo_real, duracion_planificada, duracion_real,
-                cumplimiento_tiempo, cumplimiento_presupuesto,
-                tareas_total, tareas_completadas, tareas_canceladas
-            )
-            SELECT 
-                p.id_proyecto,
-                p.id_cliente,
-                p.id_empleado_gerente,
-                -- Obtener equipo principal del proyecto
-                (SELECT te.id_equipo 
-                 FROM gestionproyectos_hist.Tarea t 
-                 JOIN gestionproyectos_hist.TareaEquipoHist te ON t.id_tarea = te.id_tarea 
-                 WHERE t.id_proyecto = p.id_proyecto 
-                 GROUP BY te.id_equipo 
-                 ORDER BY COUNT(*) DESC 
-                 LIMIT 1) as id_equipo,
-                CAST(DATE_FORMAT(p.fecha_fin_real, '%Y%m%d') AS UNSIGNED),
-                p.presupuesto,
-                COALESCE(p.costo_real, p.presupuesto * 1.1),
-                DATEDIFF(p.fecha_fin_plan, p.fecha_inicio),
-                DATEDIFF(p.fecha_fin_real, p.fecha_inicio),
-                CASE WHEN p.fecha_fin_real <= p.fecha_fin_plan THEN 1 ELSE 0 END,
-                CASE WHEN COALESCE(p.costo_real, p.presupuesto * 1.1) <= p.presupuesto THEN 1 ELSE 0 END,
-                (SELECT COUNT(*) FROM gestionproyectos_hist.Tarea t WHERE t.id_proyecto = p.id_proyecto),
-                (SELECT COUNT(*) FROM gestionproyectos_hist.Tarea t WHERE t.id_proyecto = p.id_proyecto AND t.id_estado = 4),
-                (SELECT COUNT(*) FROM gestionproyectos_hist.Tarea t WHERE t.id_proyecto = p.id_proyecto AND t.id_estado = 5)
-            FROM gestionproyectos_hist.Proyecto p
-            WHERE p.id_estado IN (4, 5) AND p.fecha_fin_real IS NOT NULL
-        """)
+        with progreso.etapa('HechoProyecto'):
+            print(" Cargando HechoProyecto...")
+            cursor.execute("""
+                INSERT INTO HechoProyecto_next (
+                    id_proyecto, id_cliente, id_empleado_gerente, id_equipo, id_tiempo_fin_real,
+                    presupuesto, costo_real, duracion_planificada, duracion_real,
+                    cumplimiento_tiempo, cumplimiento_presupuesto,
+                    tareas_total, tareas_completadas, tareas_canceladas
+                )
+                SELECT 
+                    x.id_proyecto,
+                    x.id_cliente,
+                    x.id_empleado_gerente,
+                    x.id_equipo_principal,
+                    CAST(DATE_FORMAT(x.fecha_fin_real, '%Y%m%d') AS UNSIGNED),
+                    x.presupuesto,
+                    COALESCE(x.costo_real, x.presupuesto * 1.1),
+                    x.duracion_planificada,
+                    x.duracion_real,
+                    CASE WHEN x.fecha_fin_real <= x.fecha_fin_plan THEN 1 ELSE 0 END,
+                    CASE WHEN COALESCE(x.costo_real, x.presupuesto * 1.1) <= x.presupuesto THEN 1 ELSE 0 END,
+                    x.tareas_total,
+                    x.tareas_completadas,
+                    x.tareas_canceladas
+                FROM ({extraccion}) x
+                WHERE x.fecha_fin_real IS NOT NULL
+            """.format(extraccion=sql_extraccion_proyectos(
+                estados_proyecto=(4, 5),
+                estado_tarea_completada=4,
+                estado_tarea_cancelada=5,
+                esquema='gestionproyectos_hist'
+            )))
+            
+            hechos = cursor.rowcount
+            progreso.filas(hechos)
+            conn.commit()
+            print(f" - HechoProyecto: {hechos} registros")
+        
+        # 3b. Cargar HechoTarea: también entra en el RENAME, así que su sombra no puede publicarse vacía
+        with progreso.etapa('HechoTarea'):
+            print(" Cargando HechoTarea...")
+            cursor.execute("""
+                INSERT INTO HechoTarea_next (
+                    id_tarea, id_proyecto, id_empleado,
+                    id_tiempo_inicio_plan, id_tiempo_fin_plan,
+                    id_tiempo_inicio_real, id_tiempo_fin_real,
+                    duracion_planificada, duracion_real, variacion_cronograma,
+                    cumplimiento_tiempo, horas_plan, horas_reales,
+                    variacion_horas, eficiencia_horas,
+                    costo_estimado, costo_real, variacion_costo,
+                    progreso_porcentaje
+                )
+                SELECT 
+                    t.id_tarea,
+                    t.id_proyecto,
+                    t.id_empleado,
+                    CAST(DATE_FORMAT(t.fecha_inicio_plan, '%Y%m%d') AS UNSIGNED),
+                    CAST(DATE_FORMAT(t.fecha_fin_plan, '%Y%m%d') AS UNSIGNED),
+                    CAST(DATE_FORMAT(t.fecha_inicio_real, '%Y%m%d') AS UNSIGNED),
+                    CAST(DATE_FORMAT(t.fecha_fin_real, '%Y%m%d') AS UNSIGNED),
+                    IFNULL(DATEDIFF(t.fecha_fin_plan, t.fecha_inicio_plan), 0),
+                    IFNULL(DATEDIFF(t.fecha_fin_real, t.fecha_inicio_real), 0),
+                    IFNULL(DATEDIFF(t.fecha_fin_real, t.fecha_inicio_real) - 
+                           DATEDIFF(t.fecha_fin_plan, t.fecha_inicio_plan), 0),
+                    IF(t.fecha_fin_real IS NULL, 0, IF(t.fecha_fin_real <= t.fecha_fin_plan, 1, 0)),
+                    IFNULL(t.horas_plan, 0),
+                    IFNULL(t.horas_reales, 0),
+                    IFNULL(t.horas_reales, 0) - IFNULL(t.horas_plan, 0),
+                    IF(IFNULL(t.horas_reales, 0) > 0, 
+                       LEAST(ROUND(IFNULL(t.horas_plan, 0) / t.horas_reales * 100, 2), 999.99), 
+                       0),
+                    IFNULL(t.costo_estimado, 0),
+                    IFNULL(t.costo_real, 0),
+                    IFNULL(t.costo_real, 0) - IFNULL(t.costo_estimado, 0),
+                    IFNULL(t.progreso_porcentaje, 0)
+                FROM gestionproyectos_hist.Tarea t
+                INNER JOIN gestionproyectos_hist.Proyecto p ON t.id_proyecto = p.id_proyecto
+                WHERE p.id_estado IN (4, 5)
+            """)
+            tareas = cursor.rowcount
+            progreso.filas(tareas)
+            # Fechas de las tareas que aún no están en DimTiempo
+            cursor.execute("""
+                INSERT IGNORE INTO DimTiempo (id_tiempo, fecha, anio, mes, trimestre)
+                SELECT CAST(DATE_FORMAT(f.fecha, '%Y%m%d') AS UNSIGNED), f.fecha,
+                       YEAR(f.fecha), MONTH(f.fecha), QUARTER(f.fecha)
+                FROM (
+                    SELECT fecha_inicio_plan AS fecha FROM gestionproyectos_hist.Tarea
+                    UNION SELECT fecha_fin_plan FROM gestionproyectos_hist.Tarea
+                    UNION SELECT fecha_inicio_real FROM gestionproyectos_hist.Tarea
+                    UNION SELECT fecha_fin_real FROM gestionproyectos_hist.Tarea
+                ) f
+                WHERE f.fecha IS NOT NULL
+            """)
+            conn.commit()
+            print(f" - HechoTarea: {tareas} registros")
         
-        hechos = cursor.rowcount
-        conn.commit()
-        print(f" - HechoProyecto: {hechos} registros")
-        
-        cursor.close()
-        conn.close()
+        # 4. Publicar: intercambio atómico; las tablas reemplazadas quedan en *_prev
+        with progreso.etapa('publicar'):
+            print(" Publicando recarga (RENAME TABLE)...")
+            publicar_tablas_nuevas(cursor)
         
         print(f" ETL completado exitosamente")
         
-        # 4. Actualizar vistas OLAP
-        print(" Actualizando vistas OLAP...")
-        cursor.execute("""
-            CREATE OR REPLACE VIEW vw_olap_detallado AS
-            SELECT 
-                hp.id_proyecto,
-                dp.nombre as nombre_proyecto,
-                de_estado.nombre_estado as estado,
-                hp.id_cliente,
-                dc.nombre as cliente,
-                dc.sector,
-                COALESCE(de.nombre_equipo, 'Sin Equipo') as equipo,
-                hp.id_empleado_gerente as id_gerente,
-                dem.nombre as gerente,
-                dt.fecha,
-                dt.anio,
-                dt.mes,
-                dt.trimestre,
-                hp.presupuesto,
-                hp.costo_real,
-                hp.duracion_planificada,
-                hp.duracion_real,
-                hp.cumplimiento_tiempo,
-                hp.cumplimiento_presupuesto,
-                hp.tareas_total,
-                hp.tareas_completadas,
-                hp.tareas_canceladas,
-                CASE 
-                    WHEN hp.tareas_total > 0 
-                    THEN ROUND((hp.tareas_completadas / hp.tareas_total) * 100, 2)
-                    ELSE 0 
-                END as porcentaje_completado,
-                (hp.presupuesto - hp.costo_real) as margen,
-                CASE 
-                    WHEN hp.presupuesto > 0 
-                    THEN ROUND(((hp.presupuesto - hp.costo_real) / hp.presupuesto) * 100, 2)
-                    ELSE 0 
-                END as rentabilidad_porcentaje
-            FROM HechoProyecto hp
-            INNER JOIN DimCliente dc ON hp.id_cliente = dc.id_cliente
-            INNER JOIN DimProyecto dp ON hp.id_proyecto = dp.id_proyecto
-            INNER JOIN DimTiempo dt ON hp.id_tiempo_fin_real = dt.id_tiempo
-            LEFT JOIN DimEquipo de ON hp.id_equipo = de.id_equipo
-            LEFT JOIN DimEmpleado dem ON hp.id_empleado_gerente = dem.id_empleado
-            LEFT JOIN gestionproyectos_hist.Estado de_estado ON dp.id_estado = de_estado.id_estado
-            ORDER BY dt.fecha DESC
-        """)
+        # 5. Actualizar vistas OLAP (un fallo aquí no invalida la recarga ya publicada)
+        with progreso.etapa('vistas'):
+            print(" Actualizando vistas OLAP...")
+            try:
+                cursor.execute("""
+                    CREATE OR REPLACE VIEW vw_olap_detallado AS
+                    SELECT 
+                        hp.id_proyecto,
+                        dp.nombre as nombre_proyecto,
+                        de_estado.nombre_estado as estado,
+                        hp.id_cliente,
+                        hp.id_equipo,
+                        dc.nombre as cliente,
+                        dc.sector,
+                        COALESCE(de.nombre_equipo, 'Sin Equipo') as equipo,
+                        hp.id_empleado_gerente as id_gerente,
+                        dem.nombre as gerente,
+                        dt.fecha,
+                        dt.anio,
+                        dt.mes,
+                        dt.trimestre,
+                        hp.presupuesto,
+                        hp.costo_real,
+                        hp.duracion_planificada,
+                        hp.duracion_real,
+                        hp.cumplimiento_tiempo,
+                        hp.cumplimiento_presupuesto,
+                        hp.tareas_total,
+                        hp.tareas_completadas,
+                        hp.tareas_canceladas,
+                        CASE 
+                            WHEN hp.tareas_total > 0 
+                            THEN ROUND((hp.tareas_completadas / hp.tareas_total) * 100, 2)
+                            ELSE 0 
+                        END as porcentaje_completado,
+                        (hp.presupuesto - hp.costo_real) as margen,
+                        CASE 
+                            WHEN hp.presupuesto > 0 
+                            THEN ROUND(((hp.presupuesto - hp.costo_real) / hp.presupuesto) * 100, 2)
+                            ELSE 0 
+                        END as rentabilidad_porcentaje
+                    FROM HechoProyecto hp
+                    INNER JOIN DimCliente dc ON hp.id_cliente = dc.id_cliente
+                    INNER JOIN DimProyecto dp ON hp.id_proyecto = dp.id_proyecto
+                    INNER JOIN DimTiempo dt ON hp.id_tiempo_fin_real = dt.id_tiempo
+                    LEFT JOIN DimEquipo de ON hp.id_equipo = de.id_equipo
+                    LEFT JOIN DimEmpleado dem ON hp.id_empleado_gerente = dem.id_empleado
+                    LEFT JOIN gestionproyectos_hist.Estado de_estado ON dp.id_estado = de_estado.id_estado
+                    ORDER BY dt.fecha DESC
+                """)
+            except Exception as e:
+                print(f" ⚠️ No se pudo actualizar vw_olap_detallado: {e}")
         
-        return jsonify({
-            'success': True,
+        registrar_carga_dw(conn)
+        
+        return {
             'message': f'ETL ejecutado exitosamente: {hechos} proyectos cargados',
             'stats': {
                 'HechoProyecto': hechos,
+                'HechoTarea': tareas,
                 'DimProyecto': proyectos_dim
             }
-        })
-        
-    except Exception as e:
-        import traceback
-        print(f" Error en ETL: {str(e)}")
-        print(traceback.format_exc())
+        }
+    finally:
+        try:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (BLOQUEO_RECARGA,))
+            cursor.fetchall()
+        except Exception:
+            pass  # si la sesión se perdió, MySQL ya liberó el bloqueo
+        cursor.close()
+        conn.close()
+
+@app.route('/ejecutar-etl', methods=['POST'])
+def ejecutar_etl():
+    """Encolar la recarga completa del DW como trabajo en segundo plano.
+
+    Responde 202 con el id del trabajo; el avance se consulta en /etl/jobs/<id>.
+    409 si ya hay una recarga en curso (en este u otro worker).
+    """
+    try:
+        activo = trabajos_etl.activo()
+        if activo is None:
+            cursor = get_dw_connection().cursor()
+            cursor.execute("SELECT IS_USED_LOCK(%s)", (BLOQUEO_RECARGA,))
+            en_otro_proceso = cursor.fetchone()[0] is not None
+            cursor.close()
+            if en_otro_proceso:
+                return jsonify({'success': False, 'message': 'Ya hay una recarga ETL en curso en otro proceso'}), 409
+        trabajo, nuevo = trabajos_etl.enviar('recarga_completa', _recarga_completa)
+        if not nuevo:
+            return jsonify({
+                'success': False,
+                'message': 'Ya hay una recarga ETL en curso',
+                'job_id': trabajo.id,
+                'url': f'/etl/jobs/{trabajo.id}'
+            }), 409
         return jsonify({
-            'success': False,
-            'message': str(e),
-            'traceback': traceback.format_exc()
-        }), 500
+            'success': True,
+            'message': 'ETL encolado',
+            'job_id': trabajo.id,
+            'estado': trabajo.estado,
+            'url': f'/etl/jobs/{trabajo.id}'
+        }), 202
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/etl/jobs', methods=['GET'])
+def listar_trabajos_etl():
+    """Trabajos ETL recientes de este worker"""
+    return jsonify({'success': True, 'jobs': [t.a_dict() for t in trabajos_etl.listar()]})
+
+@app.route('/etl/jobs/<id_trabajo>', methods=['GET'])
+def estado_trabajo_etl(id_trabajo):
+    """Avance de un trabajo ETL: etapas, filas, filas/s y resultado o error"""
+    trabajo = trabajos_etl.obtener(id_trabajo)
+    if trabajo is not None:
+        return jsonify({'success': True, 'job': trabajo.a_dict()})
+    # El trabajo puede vivir en otro worker: se lee el último estado guardado
+    try:
+        cursor = get_dw_connection().cursor()
+        detalle = leer_trabajo(cursor, id_trabajo)
+        cursor.close()
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+    if detalle is None:
+        return jsonify({'success': False, 'message': 'Trabajo no encontrado'}), 404
+    return jsonify({'success': True, 'job': json_rapido.loads(detalle)})
+
+
+# ========================================
+# EVENTOS (SSE)
+# ========================================
+def _estado_eventos():
+    """Versión de datos del DW y último trabajo ETL (lo consulta el vigilante de CanalEventos)"""
+    conn = get_connection('destino')
+    try:
+        cursor = conn.cursor()
+        version = leer_version(cursor)
+        detalle = leer_ultimo_trabajo(cursor)
+        cursor.close()
+    finally:
+        conn.close()
+    return {'version': version, 'trabajo': json_rapido.loads(detalle) if detalle else None}
+
+canal_eventos = CanalEventos(_estado_eventos)
+
+@app.route('/eventos')
+def eventos():
+    """Flujo SSE: 'version' cuando cambian los datos del DW, 'etl' con el avance de las cargas"""
+    cola = canal_eventos.suscribir()
+    if cola is None:
+        return jsonify({'success': False, 'message': 'Demasiadas conexiones de eventos; usar sondeo'}), 503, {'Retry-After': '30'}
+    return app.response_class(canal_eventos.flujo(cola), mimetype='text/event-stream',
+                              headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/ejecutar-etl/revertir', methods=['POST'])
+def revertir_etl():
+    """Vuelve a la recarga anterior intercambiando las tablas vivas con *_prev"""
+    try:
+        conn = get_connection('destino')
+        cursor = conn.cursor()
+        if not puede_revertir(cursor):
+            cursor.close()
+            conn.close()
+            return jsonify({'success': False, 'message': 'No hay una recarga anterior para revertir'}), 409
+        revertir_publicacion(cursor)
+        cursor.close()
+        registrar_carga_dw(conn)
+        conn.close()
+        return jsonify({'success': True, 'message': 'DataWarehouse revertido a la recarga anterior'})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
 
 
 @app.route('/datos-origen/todas-tablas', methods=['GET'])
@@ -717,26 +1055,15 @@ def obtener_todas_tablas_origen():
                 cursor.execute(f"SELECT * FROM {tabla} ORDER BY {columnas[0]} DESC LIMIT {limite}")
                 filas = cursor.fetchall()
                 
-                # Convertir a diccionarios
-                datos = []
-                for fila in filas:
-                    fila_dict = {}
-                    for i, valor in enumerate(fila):
-                        # Convertir tipos especiales a string para JSON
-                        if isinstance(valor, (date, datetime)):
-                            fila_dict[columnas[i]] = valor.strftime('%Y-%m-%d')
-                        elif isinstance(valor, Decimal):
-                            fila_dict[columnas[i]] = float(valor)
-                        else:
-                            fila_dict[columnas[i]] = valor
-                    datos.append(fila_dict)
+                # Convertir a diccionarios (fechas y Decimal los serializa json_rapido)
+                datos = [dict(zip(columnas, fila)) for fila in filas]
                 
                 resultado.append({
                     'tabla': tabla,
                     'total_registros': total,
                     'registros_mostrados': len(datos),
                     'columnas': columnas,
-                    'datos': datos
+                    'datos': filas_en_columnas(datos, columnas) if formato_columnar() else datos
                 })
                 
             except Exception as e:
@@ -793,6 +1120,7 @@ def limpiar_datos():
         cursor_destino.execute("SET FOREIGN_KEY_CHECKS=1")
         
         cursor_destino.close()
+        registrar_carga_dw(conn_destino)
         conn_destino.close()
         
         return jsonify({
@@ -1181,11 +1509,6 @@ def buscar_trazabilidad():
             
             if proyecto_origen:
                 resultado['encontrado_origen'] = True
-                for key, val in proyecto_origen.items():
-                    if isinstance(val, (date, datetime)):
-                        proyecto_origen[key] = val.isoformat()
-                    elif isinstance(val, Decimal):
-                        proyecto_origen[key] = float(val)
                 resultado['datos_origen'] = proyecto_origen
                 
                 # Buscar en DW
@@ -1199,11 +1522,6 @@ def buscar_trazabilidad():
                 
                 if proyecto_dw:
                     resultado['encontrado_dw'] = True
-                    for key, val in proyecto_dw.items():
-                        if isinstance(val, (date, datetime)):
-                            proyecto_dw[key] = val.isoformat()
-                        elif isinstance(val, Decimal):
-                            proyecto_dw[key] = float(val)
                     resultado['datos_dw'] = proyecto_dw
                     resultado['mensaje'] = '✓ Proyecto encontrado en ambas bases de datos'
                 else:
@@ -1222,11 +1540,6 @@ def buscar_trazabilidad():
             
             if cliente_origen:
                 resultado['encontrado_origen'] = True
-                for key, val in cliente_origen.items():
-                    if isinstance(val, (date, datetime)):
-                        cliente_origen[key] = val.isoformat()
-                    elif isinstance(val, Decimal):
-                        cliente_origen[key] = float(val)
                 resultado['datos_origen'] = cliente_origen
                 
                 # Buscar en DW
@@ -1237,11 +1550,6 @@ def buscar_trazabilidad():
                 
                 if cliente_dw:
                     resultado['encontrado_dw'] = True
-                    for key, val in cliente_dw.items():
-                        if isinstance(val, (date, datetime)):
-                            cliente_dw[key] = val.isoformat()
-                        elif isinstance(val, Decimal):
-                            cliente_dw[key] = float(val)
                     resultado['datos_dw'] = cliente_dw
                     resultado['mensaje'] = '✓ Cliente encontrado en ambas bases de datos'
                 else:
@@ -1260,11 +1568,6 @@ def buscar_trazabilidad():
             
             if empleado_origen:
                 resultado['encontrado_origen'] = True
-                for key, val in empleado_origen.items():
-                    if isinstance(val, (date, datetime)):
-                        empleado_origen[key] = val.isoformat()
-                    elif isinstance(val, Decimal):
-                        empleado_origen[key] = float(val)
                 resultado['datos_origen'] = empleado_origen
                 
                 # Buscar en DW
@@ -1275,11 +1578,6 @@ def buscar_trazabilidad():
                 
                 if empleado_dw:
                     resultado['encontrado_dw'] = True
-                    for key, val in empleado_dw.items():
-                        if isinstance(val, (date, datetime)):
-                            empleado_dw[key] = val.isoformat()
-                        elif isinstance(val, Decimal):
-                            empleado_dw[key] = float(val)
                     resultado['datos_dw'] = empleado_dw
                     resultado['mensaje'] = '✓ Empleado encontrado en ambas bases de datos'
                 else:
@@ -1298,11 +1596,6 @@ def buscar_trazabilidad():
             
             if equipo_origen:
                 resultado['encontrado_origen'] = True
-                for key, val in equipo_origen.items():
-                    if isinstance(val, (date, datetime)):
-                        equipo_origen[key] = val.isoformat()
-                    elif isinstance(val, Decimal):
-                        equipo_origen[key] = float(val)
                 resultado['datos_origen'] = equipo_origen
                 
                 # Buscar en DW
@@ -1313,11 +1606,6 @@ def buscar_trazabilidad():
                 
                 if equipo_dw:
                     resultado['encontrado_dw'] = True
-                    for key, val in equipo_dw.items():
-                        if isinstance(val, (date, datetime)):
-                            equipo_dw[key] = val.isoformat()
-                        elif isinstance(val, Decimal):
-                            equipo_dw[key] = float(val)
                     resultado['datos_dw'] = equipo_dw
                     resultado['mensaje'] = '✓ Equipo encontrado en ambas bases de datos'
                 else:
@@ -1360,11 +1648,6 @@ def buscar_trazabilidad():
             
             if tarea_origen:
                 resultado['encontrado_origen'] = True
-                for key, val in tarea_origen.items():
-                    if isinstance(val, (date, datetime)):
-                        tarea_origen[key] = val.isoformat()
-                    elif isinstance(val, Decimal):
-                        tarea_origen[key] = float(val)
                 resultado['datos_origen'] = tarea_origen
                 
                 # Buscar en DW
@@ -1378,11 +1661,6 @@ def buscar_trazabilidad():
                 
                 if tarea_dw:
                     resultado['encontrado_dw'] = True
-                    for key, val in tarea_dw.items():
-                        if isinstance(val, (date, datetime)):
-                            tarea_dw[key] = val.isoformat()
-                        elif isinstance(val, Decimal):
-                            tarea_dw[key] = float(val)
                     resultado['datos_dw'] = tarea_dw
                     resultado['mensaje'] = ' Tarea encontrada en ambas bases de datos'
                 else:
@@ -1411,11 +1689,6 @@ def buscar_trazabilidad():
                             )
                             tarea_dw_alt = cursor_destino.fetchone()
                             if tarea_dw_alt:
-                                for key, val in tarea_dw_alt.items():
-                                    if isinstance(val, (date, datetime)):
-                                        tarea_dw_alt[key] = val.isoformat()
-                                    elif isinstance(val, Decimal):
-                                        tarea_dw_alt[key] = float(val)
                                 resultado['datos_dw_sugerido'] = tarea_dw_alt
                                 resultado['mensaje'] = ' No se encontró por id_tarea, pero existe una tarea probable relacionada en DW'
                             else:
@@ -1449,6 +1722,7 @@ def buscar_trazabilidad():
 # ========================================
 
 @app.route('/olap/kpis', methods=['GET'])
+@cache_dw
 def get_olap_kpis():
     """
     Endpoint para obtener KPIs con capacidad de drill-down
@@ -1464,13 +1738,7 @@ def get_olap_kpis():
         nivel = request.args.get('nivel', 'DETALLADO')
         
         # Conectar a DataWarehouse
-        conn_destino = mysql.connector.connect(
-            host=DB_CONFIG['host_destino'],
-            port=DB_CONFIG['port_destino'],
-            user=DB_CONFIG['user_destino'],
-            password=DB_CONFIG['password_destino'],
-            database=DB_CONFIG['db_destino']
-        )
+        conn_destino = get_dw_connection()
         cursor_destino = conn_destino.cursor(dictionary=True)
         
         # Construir consulta dinámica usando el procedimiento OLAP
@@ -1489,14 +1757,7 @@ def get_olap_kpis():
                 print(f"DEBUG: Primera fila - Completados: {first_row.get('proyectos_completados')}, Progreso: {first_row.get('progreso_promedio')}", flush=True, file=sys.stderr)
             resultados.extend(rows)
         
-        # Convertir Decimal a float para JSON
-        for row in resultados:
-            for key, value in row.items():
-                if isinstance(value, Decimal):
-                    row[key] = float(value)
-        
         cursor_destino.close()
-        conn_destino.close()
         
         return jsonify({
             'success': True,
@@ -1520,6 +1781,7 @@ def get_olap_kpis():
         }), 500
 
 @app.route('/olap/series', methods=['GET'])
+@cache_dw
 def get_olap_series():
     """
     Endpoint para series temporales OLAP
@@ -1544,13 +1806,7 @@ def get_olap_series():
             }), 400
         
         # Conectar a DataWarehouse
-        conn_destino = mysql.connector.connect(
-            host=DB_CONFIG['host_destino'],
-            port=DB_CONFIG['port_destino'],
-            user=DB_CONFIG['user_destino'],
-            password=DB_CONFIG['password_destino'],
-            database=DB_CONFIG['db_destino']
-        )
+        conn_destino = get_dw_connection()
         cursor_destino = conn_destino.cursor(dictionary=True)
         
         # Llamar procedimiento para series temporales
@@ -1562,14 +1818,7 @@ def get_olap_series():
         for result in cursor_destino.stored_results():
             resultados.extend(result.fetchall())
         
-        # Convertir Decimal a float para JSON
-        for row in resultados:
-            for key, value in row.items():
-                if isinstance(value, Decimal):
-                    row[key] = float(value)
-        
         cursor_destino.close()
-        conn_destino.close()
         
         return jsonify({
             'success': True,
@@ -1590,55 +1839,13 @@ def get_olap_series():
         }), 500
 
 @app.route('/olap/kpis-ejecutivos', methods=['GET'])
+@cache_dw
 def get_kpis_ejecutivos():
     """
     Endpoint para KPIs ejecutivos del dashboard principal
     """
     try:
-        # Conectar a DataWarehouse
-        conn_destino = mysql.connector.connect(
-            host=DB_CONFIG['host_destino'],
-            port=DB_CONFIG['port_destino'],
-            user=DB_CONFIG['user_destino'],
-            password=DB_CONFIG['password_destino'],
-            database=DB_CONFIG['db_destino']
-        )
-        cursor_destino = conn_destino.cursor(dictionary=True)
-        
-        # Obtener KPIs ejecutivos
-        cursor_destino.execute("""
-            SELECT * FROM vw_olap_kpis_ejecutivos 
-            ORDER BY anio DESC, trimestre DESC 
-            LIMIT 12
-        """)
-        
-        kpis_temporales = cursor_destino.fetchall()
-        
-        # Obtener resumen por sector
-        cursor_destino.execute("""
-            SELECT * FROM vw_olap_sector_performance 
-            WHERE anio = YEAR(CURDATE())
-            ORDER BY facturacion_sector DESC
-        """)
-        
-        performance_sectores = cursor_destino.fetchall()
-        
-        # Convertir Decimal a float
-        for row in kpis_temporales + performance_sectores:
-            for key, value in row.items():
-                if isinstance(value, Decimal):
-                    row[key] = float(value)
-                elif isinstance(value, date):
-                    row[key] = value.isoformat()
-        
-        cursor_destino.close()
-        conn_destino.close()
-        
-        return jsonify({
-            'success': True,
-            'kpis_temporales': kpis_temporales,
-            'performance_sectores': performance_sectores
-        })
+        return jsonify(panel_kpis_ejecutivos(get_dw_connection(), abrir_conexion=nueva_conexion_dw))
         
     except Exception as e:
         import traceback
@@ -1649,19 +1856,14 @@ def get_kpis_ejecutivos():
         }), 500
 
 @app.route('/olap/rollup', methods=['GET'])
+@cache_dw
 def get_olap_rollup():
     """
     Endpoint para obtener datos con ROLLUP (agregaciones jerárquicas)
     """
     try:
         # Conectar a DataWarehouse
-        conn_destino = mysql.connector.connect(
-            host=DB_CONFIG['host_destino'],
-            port=DB_CONFIG['port_destino'],
-            user=DB_CONFIG['user_destino'],
-            password=DB_CONFIG['password_destino'],
-            database=DB_CONFIG['db_destino']
-        )
+        conn_destino = get_dw_connection()
         cursor_destino = conn_destino.cursor(dictionary=True)
         
         # Obtener datos ROLLUP
@@ -1669,11 +1871,10 @@ def get_olap_rollup():
         datos_rollup = cursor_destino.fetchall()
         
         cursor_destino.close()
-        conn_destino.close()
         
         return jsonify({
             'success': True,
-            'datos': datos_rollup,
+            'datos': filas_en_columnas(datos_rollup) if formato_columnar() else datos_rollup,
             'total_registros': len(datos_rollup)
         })
     except Exception as e:
@@ -1685,48 +1886,23 @@ def get_olap_rollup():
         }), 500
 
 @app.route('/olap/dimensiones', methods=['GET'])
+@cache_dw
 def get_dimensiones():
     """
     Endpoint para obtener valores únicos de dimensiones para filtros
     """
     try:
-        # Conectar a DataWarehouse
-        conn_destino = mysql.connector.connect(
-            host=DB_CONFIG['host_destino'],
-            port=DB_CONFIG['port_destino'],
-            user=DB_CONFIG['user_destino'],
-            password=DB_CONFIG['password_destino'],
-            database=DB_CONFIG['db_destino']
-        )
-        cursor_destino = conn_destino.cursor(dictionary=True)
-        
-        # Obtener clientes
-        cursor_destino.execute("SELECT id_cliente, nombre AS nombre_cliente, sector FROM DimCliente ORDER BY nombre")
-        clientes = cursor_destino.fetchall()
-        
-        # Obtener equipos
-        cursor_destino.execute("SELECT id_equipo, nombre_equipo, descripcion AS tipo FROM DimEquipo ORDER BY nombre_equipo")
-        equipos = cursor_destino.fetchall()
-        
-        # Obtener años disponibles
-        cursor_destino.execute("SELECT DISTINCT anio FROM DimTiempo WHERE anio <= YEAR(CURDATE()) ORDER BY anio DESC")
-        anios = cursor_destino.fetchall()
-        
-        # Obtener sectores únicos
-        cursor_destino.execute("SELECT DISTINCT sector FROM DimCliente ORDER BY sector")
-        sectores = cursor_destino.fetchall()
-        
-        cursor_destino.close()
-        conn_destino.close()
+        # Las cuatro consultas son independientes: corren a la vez (ver paralelo.py)
+        dimensiones = consultas_en_paralelo(get_dw_connection(), {
+            'clientes': "SELECT id_cliente, nombre AS nombre_cliente, sector FROM DimCliente ORDER BY nombre",
+            'equipos': "SELECT id_equipo, nombre_equipo, descripcion AS tipo FROM DimEquipo ORDER BY nombre_equipo",
+            'anios': "SELECT DISTINCT anio FROM DimTiempo WHERE anio <= YEAR(CURDATE()) ORDER BY anio DESC",
+            'sectores': "SELECT DISTINCT sector FROM DimCliente ORDER BY sector"
+        }, nueva_conexion_dw)
         
         return jsonify({
             'success': True,
-            'dimensiones': {
-                'clientes': clientes,
-                'equipos': equipos,
-                'anios': anios,
-                'sectores': sectores
-            }
+            'dimensiones': dimensiones
         })
         
     except Exception as e:
@@ -1742,101 +1918,14 @@ def get_dimensiones():
 # ========================================
 
 @app.route('/bsc/okr', methods=['GET'])
+@cache_dw
 def get_bsc_okr():
     """
     Endpoint para obtener tablero BSC consolidado con OKRs
     """
     try:
-        # Conectar a DataWarehouse
-        conn_destino = mysql.connector.connect(
-            host=DB_CONFIG['host_destino'],
-            port=DB_CONFIG['port_destino'],
-            user=DB_CONFIG['user_destino'],
-            password=DB_CONFIG['password_destino'],
-            database=DB_CONFIG['db_destino']
-        )
-        cursor_destino = conn_destino.cursor(dictionary=True)
-        
-        # Obtener tablero BSC consolidado
-        cursor_destino.execute("SELECT * FROM vw_bsc_tablero_consolidado ORDER BY perspectiva, codigo_objetivo")
-        objetivos = cursor_destino.fetchall()
-        
-        # Obtener detalle de KRs
-        cursor_destino.execute("SELECT * FROM vw_bsc_krs_detalle ORDER BY perspectiva, codigo_objetivo, codigo_kr")
-        krs = cursor_destino.fetchall()
-        
-        # Organizar datos por perspectiva
-        perspectivas = {}
-        for objetivo in objetivos:
-            perspectiva = objetivo['perspectiva']
-            if perspectiva not in perspectivas:
-                perspectivas[perspectiva] = {
-                    'nombre': perspectiva,
-                    'avance_global': 0,
-                    'objetivos': [],
-                    'resumen': {
-                        'total_objetivos': 0,
-                        'objetivos_verde': 0,
-                        'objetivos_amarillo': 0,
-                        'objetivos_rojo': 0,
-                        'avance_promedio': 0
-                    }
-                }
-            
-            # Convertir Decimal a float
-            for key, value in objetivo.items():
-                if isinstance(value, Decimal):
-                    objetivo[key] = float(value)
-                elif isinstance(value, date):
-                    objetivo[key] = value.isoformat()
-            
-            # Mapear campos a los nombres esperados por el frontend
-            objetivo['nombre'] = objetivo.get('objetivo_nombre', '')
-            objetivo['descripcion'] = objetivo.get('objetivo_descripcion', '')
-            # avance_objetivo_porcentaje ya viene de la vista, no necesita mapeo
-            
-            # Agregar KRs al objetivo
-            objetivo['krs'] = []
-            for kr in krs:
-                if kr['codigo_objetivo'] == objetivo['codigo_objetivo']:
-                    # Convertir Decimal a float en KRs
-                    for key, value in kr.items():
-                        if isinstance(value, Decimal):
-                            kr[key] = float(value)
-                        elif isinstance(value, date):
-                            kr[key] = value.isoformat()
-                    objetivo['krs'].append(kr)
-            
-            perspectivas[perspectiva]['objetivos'].append(objetivo)
-            
-            # Actualizar resumen de perspectiva
-            resumen = perspectivas[perspectiva]['resumen']
-            resumen['total_objetivos'] += 1
-            estado = objetivo.get('estado_objetivo', '')
-            if estado == 'Verde':
-                resumen['objetivos_verde'] += 1
-            elif estado == 'Amarillo':
-                resumen['objetivos_amarillo'] += 1
-            else:
-                resumen['objetivos_rojo'] += 1
-            
-            avance = objetivo.get('avance_objetivo_porcentaje', 0)
-            if avance:
-                resumen['avance_promedio'] += float(avance)
-        
-        # Calcular promedios y avance global
-        for perspectiva in perspectivas.values():
-            if perspectiva['resumen']['total_objetivos'] > 0:
-                perspectiva['resumen']['avance_promedio'] /= perspectiva['resumen']['total_objetivos']
-                perspectiva['avance_global'] = perspectiva['resumen']['avance_promedio']
-        
-        cursor_destino.close()
-        conn_destino.close()
-        
-        return jsonify({
-            'success': True,
-            'perspectivas': perspectivas
-        })
+        return jsonify(panel_bsc_okr(get_dw_connection(), columnar=formato_columnar(),
+                                     abrir_conexion=nueva_conexion_dw))
         
     except Exception as e:
         import traceback
@@ -1846,7 +1935,6 @@ def get_bsc_okr():
             'traceback': traceback.format_exc()
         }), 500
 
-
 # ================================================================
 # NOTA: Endpoint deshabilitado - El BSC debe mostrar solo datos del ETL
 # según los requisitos del proyecto (visualización, no captura manual)
@@ -1907,6 +1995,7 @@ def get_bsc_okr():
 #         }), 500
 
 @app.route('/bsc/historico-kr/<int:id_kr>', methods=['GET'])
+@cache_dw
 def get_historico_kr(id_kr):
     """
     Endpoint para obtener histórico de mediciones de un KR específico
@@ -1915,13 +2004,7 @@ def get_historico_kr(id_kr):
         meses = request.args.get('meses', 12, type=int)
         
         # Conectar a DataWarehouse
-        conn_destino = mysql.connector.connect(
-            host=DB_CONFIG['host_destino'],
-            port=DB_CONFIG['port_destino'],
-            user=DB_CONFIG['user_destino'],
-            password=DB_CONFIG['password_destino'],
-            database=DB_CONFIG['db_destino']
-        )
+        conn_destino = get_dw_connection()
         cursor_destino = conn_destino.cursor(dictionary=True)
         
         # Obtener histórico del KR
@@ -1949,16 +2032,7 @@ def get_historico_kr(id_kr):
         
         historico = cursor_destino.fetchall()
         
-        # Convertir Decimal y date a tipos serializables
-        for row in historico:
-            for key, value in row.items():
-                if isinstance(value, Decimal):
-                    row[key] = float(value)
-                elif isinstance(value, date):
-                    row[key] = value.isoformat()
-        
         cursor_destino.close()
-        conn_destino.close()
         
         return jsonify({
             'success': True,
@@ -1974,61 +2048,13 @@ def get_historico_kr(id_kr):
         }), 500
 
 @app.route('/bsc/vision-estrategica', methods=['GET'])
+@cache_dw
 def get_vision_estrategica():
     """
     Endpoint para obtener resumen de la visión estratégica
     """
     try:
-        # Conectar a DataWarehouse
-        conn_destino = mysql.connector.connect(
-            host=DB_CONFIG['host_destino'],
-            port=DB_CONFIG['port_destino'],
-            user=DB_CONFIG['user_destino'],
-            password=DB_CONFIG['password_destino'],
-            database=DB_CONFIG['db_destino']
-        )
-        cursor_destino = conn_destino.cursor(dictionary=True)
-        
-        # Obtener resumen por componente de visión
-        cursor_destino.execute("""
-            SELECT 
-                bsc.perspectiva as vision_componente,
-                COUNT(*) as total_objetivos,
-                AVG(bsc.avance) as avance_promedio,
-                COUNT(CASE WHEN bsc.estado = 'Verde' THEN 1 END) as objetivos_verde,
-                COUNT(CASE WHEN bsc.estado = 'Amarillo' THEN 1 END) as objetivos_amarillo,
-                COUNT(CASE WHEN bsc.estado = 'Rojo' THEN 1 END) as objetivos_rojo
-            FROM vw_bsc_tablero_consolidado bsc
-            GROUP BY bsc.perspectiva
-            ORDER BY avance_promedio DESC
-        """)
-        
-        vision_componentes = cursor_destino.fetchall()
-        
-        # Convertir Decimal a float
-        for row in vision_componentes:
-            for key, value in row.items():
-                if isinstance(value, Decimal):
-                    row[key] = float(value)
-        
-        cursor_destino.close()
-        conn_destino.close()
-        
-        return jsonify({
-            'success': True,
-            'vision_componentes': vision_componentes,
-            'vision_statement': {
-                'titulo': 'Transformación Digital para la Excelencia Operacional',
-                'descripcion': 'Liderar la transformación digital mediante sistemas de soporte de decisiones, procesos automatizados y analítica avanzada para entregar valor superior a nuestros clientes.',
-                'pilares': [
-                    'Transformación Digital',
-                    'Confiabilidad y Calidad',
-                    'Analítica Avanzada',
-                    'Automatización de Procesos',
-                    'Excelencia Operacional'
-                ]
-            }
-        })
+        return jsonify(panel_vision_estrategica(get_dw_connection()))
         
     except Exception as e:
         import traceback
@@ -2112,6 +2138,13 @@ def predecir_defectos_rayleigh():
                 'message': f'Tipo de proyecto debe ser uno de: {tipos_validos}'
             }), 400
         
+        # Conexión DW del request para calibrar (sin DW se usa la calibración por defecto)
+        try:
+            conn_calibracion = get_dw_connection()
+        except Exception as e:
+            print(f"⚠️ DW no disponible para calibrar: {e}")
+            conn_calibracion = None
+        
         # Generar predicción
         prediccion = generar_prediccion_completa(
             tamanio_proyecto=datos['tamanio_proyecto'],
@@ -2119,19 +2152,14 @@ def predecir_defectos_rayleigh():
             complejidad=complejidad,
             tipo_proyecto=tipo_proyecto,
             fecha_inicio=datetime.now(),
-            esfuerzo_testing=esfuerzo_testing
+            esfuerzo_testing=esfuerzo_testing,
+            conn=conn_calibracion
         )
         
         # Opcional: guardar predicción en DataWarehouse para auditoría
         if datos.get('guardar_en_dw', False):
             try:
-                conn_destino = mysql.connector.connect(
-                    host=DB_CONFIG['host_destino'],
-                    port=DB_CONFIG['port_destino'],
-                    user=DB_CONFIG['user_destino'],
-                    password=DB_CONFIG['password_destino'],
-                    database=DB_CONFIG['db_destino']
-                )
+                conn_destino = get_dw_connection()
                 cursor_destino = conn_destino.cursor()
                 
                 # Crear tabla de predicciones si no existe
@@ -2172,7 +2200,6 @@ def predecir_defectos_rayleigh():
                 
                 conn_destino.commit()
                 cursor_destino.close()
-                conn_destino.close()
                 
                 prediccion['guardado_en_dw'] = True
                 
@@ -2207,13 +2234,7 @@ def get_historico_predicciones():
         usuario = request.args.get('usuario')
         
         # Conectar a DataWarehouse
-        conn_destino = mysql.connector.connect(
-            host=DB_CONFIG['host_destino'],
-            port=DB_CONFIG['port_destino'],
-            user=DB_CONFIG['user_destino'],
-            password=DB_CONFIG['password_destino'],
-            database=DB_CONFIG['db_destino']
-        )
+        conn_destino = get_dw_connection()
         cursor_destino = conn_destino.cursor(dictionary=True)
         
         # Verificar si tabla existe
@@ -2257,16 +2278,7 @@ def get_historico_predicciones():
         cursor_destino.execute(sql_base, parametros)
         predicciones = cursor_destino.fetchall()
         
-        # Convertir Decimal y datetime
-        for pred in predicciones:
-            for key, value in pred.items():
-                if isinstance(value, Decimal):
-                    pred[key] = float(value)
-                elif isinstance(value, datetime):
-                    pred[key] = value.isoformat()
-        
         cursor_destino.close()
-        conn_destino.close()
         
         return jsonify({
             'success': True,
@@ -2352,21 +2364,10 @@ def trazabilidad_tarea(id_tarea: int):
                 ]
             }), 404
 
-        # Transformar fila a dict serializable
-        from datetime import date, datetime
-        from decimal import Decimal
-        tarea_origen = {}
-        for i, v in enumerate(row):
-            c = cols[i]
-            if isinstance(v, (date, datetime)):
-                tarea_origen[c] = v.isoformat()
-            elif isinstance(v, Decimal):
-                tarea_origen[c] = float(v)
-            else:
-                tarea_origen[c] = v
+        tarea_origen = dict(zip(cols, row))
 
         # Conexión y consulta destino
-        conn_destino = get_connection('destino')
+        conn_destino = get_dw_connection()
         cursor_destino = conn_destino.cursor()
         cursor_destino.execute(
             """
@@ -2385,17 +2386,7 @@ def trazabilidad_tarea(id_tarea: int):
         row_dw = cursor_destino.fetchone()
         cols_dw = [d[0] for d in cursor_destino.description] if cursor_destino.description else []
 
-        tarea_dw = None
-        if row_dw:
-            tarea_dw = {}
-            for i, v in enumerate(row_dw):
-                c = cols_dw[i]
-                if isinstance(v, (date, datetime)):
-                    tarea_dw[c] = v.isoformat()
-                elif isinstance(v, Decimal):
-                    tarea_dw[c] = float(v)
-                else:
-                    tarea_dw[c] = v
+        tarea_dw = dict(zip(cols_dw, row_dw)) if row_dw else None
 
         # Última ETL (tuple)
         cursor_destino.execute("SELECT COALESCE(MAX(fecha_actualizacion), '2000-01-01') FROM HechoTarea")
@@ -2432,7 +2423,7 @@ def trazabilidad_tarea(id_tarea: int):
         }
 
         cursor_origen.close(); conn_origen.close()
-        cursor_destino.close(); conn_destino.close()
+        cursor_destino.close()
         return jsonify(resultado)
 
     except Exception as e:
@@ -2449,6 +2440,7 @@ def trazabilidad_tarea(id_tarea: int):
 # ========================================
 
 @app.route('/olap/kpis-v2', methods=['GET'])
+@cache_dw
 def get_olap_kpis_v2():
     """
     Endpoint mejorado para KPIs OLAP usando vistas optimizadas
@@ -2462,177 +2454,9 @@ def get_olap_kpis_v2():
         equipo_id = request.args.get('equipo_id', type=int)
         anio = request.args.get('anio', type=int)
         
-        conn = get_connection('destino')
-        cursor = conn.cursor(dictionary=True)
-        
-        # Seleccionar vista según nivel
-        if nivel == 'total':
-            # Usar vista detallada para poder filtrar por año
-            query = """
-                SELECT 
-                    COUNT(DISTINCT id_proyecto) as total_proyectos,
-                    SUM(CASE WHEN estado = 'Completado' THEN 1 ELSE 0 END) as proyectos_completados,
-                    SUM(CASE WHEN estado = 'Cancelado' THEN 1 ELSE 0 END) as proyectos_cancelados,
-                    0 as proyectos_activos,
-                    COUNT(DISTINCT cliente) as total_clientes,
-                    COUNT(DISTINCT equipo) as total_equipos,
-                    SUM(presupuesto) as presupuesto_total,
-                    SUM(costo_real) as costo_total,
-                    SUM(margen) as margen_total,
-                    ROUND(AVG(rentabilidad_porcentaje), 2) as rentabilidad_promedio_porcentaje,
-                    ROUND(AVG(CASE 
-                        WHEN en_presupuesto = 'Sí' THEN 100
-                        WHEN en_presupuesto = 'No' THEN 0
-                        ELSE NULL
-                    END), 2) as porcentaje_cumplimiento_presupuesto,
-                    SUM(horas_reales) as horas_reales_total,
-                    SUM(horas_estimadas) as horas_estimadas_total,
-                    CASE 
-                        WHEN SUM(horas_estimadas) > 0 
-                        THEN ROUND((SUM(horas_reales) / SUM(horas_estimadas) * 100), 2)
-                        ELSE 0 
-                    END as eficiencia_estimacion_porcentaje
-                FROM vw_olap_detallado
-            """
-            conditions = []
-            if cliente_id:
-                conn_temp = get_connection('destino')
-                cur_temp = conn_temp.cursor(dictionary=True)
-                cur_temp.execute(f"SELECT nombre FROM DimCliente WHERE id_cliente = {cliente_id}")
-                cliente_row = cur_temp.fetchone()
-                cur_temp.close()
-                conn_temp.close()
-                if cliente_row:
-                    conditions.append(f"cliente = '{cliente_row['nombre']}'")
-            if equipo_id:
-                conn_temp = get_connection('destino')
-                cur_temp = conn_temp.cursor(dictionary=True)
-                cur_temp.execute(f"SELECT nombre_equipo FROM DimEquipo WHERE id_equipo = {equipo_id}")
-                equipo_row = cur_temp.fetchone()
-                cur_temp.close()
-                conn_temp.close()
-                if equipo_row:
-                    conditions.append(f"equipo = '{equipo_row['nombre_equipo']}'")
-            if anio:
-                conditions.append(f"anio = {anio}")
-            
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
-            
-        elif nivel == 'por_cliente':
-            # Usar vista detallada y agregar por cliente
-            query = """
-                SELECT 
-                    cliente,
-                    MAX(sector) as sector,
-                    COUNT(DISTINCT id_proyecto) as total_proyectos,
-                    SUM(CASE WHEN estado = 'Completado' THEN 1 ELSE 0 END) as proyectos_completados,
-                    SUM(presupuesto) as presupuesto_total,
-                    SUM(costo_real) as costo_total,
-                    SUM(margen) as margen_total,
-                    ROUND(AVG(rentabilidad_porcentaje), 2) as rentabilidad_promedio_porcentaje,
-                    ROUND(AVG(CASE 
-                        WHEN en_presupuesto = 'Sí' THEN 100
-                        WHEN en_presupuesto = 'No' THEN 0
-                        ELSE NULL
-                    END), 2) as porcentaje_en_presupuesto
-                FROM vw_olap_detallado
-            """
-            conditions = []
-            if cliente_id:
-                # Necesitamos obtener el nombre del cliente
-                conn_temp = get_connection('destino')
-                cur_temp = conn_temp.cursor(dictionary=True)
-                cur_temp.execute(f"SELECT nombre FROM DimCliente WHERE id_cliente = {cliente_id}")
-                cliente_row = cur_temp.fetchone()
-                cur_temp.close()
-                conn_temp.close()
-                if cliente_row:
-                    conditions.append(f"cliente = '{cliente_row['nombre']}'")
-            if anio:
-                conditions.append(f"anio = {anio}")
-            
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
-            query += " GROUP BY cliente ORDER BY total_proyectos DESC"
-            
-        elif nivel == 'por_equipo':
-            # Usar vista detallada y agregar por equipo
-            query = """
-                SELECT 
-                    equipo,
-                    COUNT(DISTINCT id_proyecto) as total_proyectos,
-                    SUM(CASE WHEN estado = 'Completado' THEN 1 ELSE 0 END) as proyectos_completados,
-                    SUM(presupuesto) as presupuesto_total,
-                    SUM(costo_real) as costo_total,
-                    SUM(margen) as margen_total,
-                    ROUND(AVG(rentabilidad_porcentaje), 2) as rentabilidad_promedio_porcentaje,
-                    SUM(horas_reales) as horas_reales_total,
-                    SUM(horas_estimadas) as horas_estimadas_total
-                FROM vw_olap_detallado
-            """
-            conditions = []
-            if equipo_id:
-                # Necesitamos obtener el nombre del equipo
-                conn_temp = get_connection('destino')
-                cur_temp = conn_temp.cursor(dictionary=True)
-                cur_temp.execute(f"SELECT nombre_equipo FROM DimEquipo WHERE id_equipo = {equipo_id}")
-                equipo_row = cur_temp.fetchone()
-                cur_temp.close()
-                conn_temp.close()
-                if equipo_row:
-                    conditions.append(f"equipo = '{equipo_row['nombre_equipo']}'")
-            if anio:
-                conditions.append(f"anio = {anio}")
-            
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
-            query += " GROUP BY equipo ORDER BY total_proyectos DESC"
-            
-        elif nivel == 'por_tiempo':
-            query = "SELECT * FROM vw_olap_por_anio"
-            if anio:
-                query += f" WHERE anio = {anio}"
-            query += " ORDER BY anio DESC"
-            
-        else:  # detallado
-            query = "SELECT * FROM vw_olap_detallado"
-            conditions = []
-            if cliente_id:
-                # La vista ya tiene el cliente, solo filtrar
-                conditions.append(f"cliente = (SELECT nombre FROM DimCliente WHERE id_cliente = {cliente_id})")
-            if anio:
-                conditions.append(f"anio = {anio}")
-                
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
-            query += " ORDER BY anio DESC, proyecto DESC LIMIT 100"
-        
-        cursor.execute(query)
-        resultados = cursor.fetchall()
-        
-        # Convertir Decimal a float
-        for row in resultados:
-            for key, value in row.items():
-                if isinstance(value, Decimal):
-                    row[key] = float(value)
-                elif isinstance(value, date):
-                    row[key] = value.isoformat()
-        
-        cursor.close()
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'nivel': nivel,
-            'total_resultados': len(resultados),
-            'data': resultados,
-            'filtros': {
-                'cliente_id': cliente_id,
-                'equipo_id': equipo_id,
-                'anio': anio
-            }
-        })
+        # Filtros por claves sustitutas con parámetros ligados (ver consultas_olap)
+        return jsonify(panel_kpis_v2(get_dw_connection(), nivel, cliente_id=cliente_id, equipo_id=equipo_id,
+                                     anio=anio, columnar=formato_columnar()))
         
     except Exception as e:
         import traceback
@@ -2643,56 +2467,14 @@ def get_olap_kpis_v2():
         }), 500
 
 @app.route('/olap/filtros-disponibles', methods=['GET'])
+@cache_dw
 def get_filtros_disponibles():
     """
     Obtiene los valores disponibles para los filtros (clientes, equipos, años)
     de forma dinámica desde el DataWarehouse
     """
     try:
-        conn = get_connection('destino')
-        cursor = conn.cursor(dictionary=True)
-        
-        # Clientes con proyectos
-        cursor.execute("""
-            SELECT DISTINCT 
-                dc.id_cliente,
-                dc.nombre as nombre_cliente,
-                dc.sector,
-                COUNT(hp.id_proyecto) as total_proyectos
-            FROM DimCliente dc
-            INNER JOIN HechoProyecto hp ON dc.id_cliente = hp.id_cliente
-            GROUP BY dc.id_cliente, dc.nombre, dc.sector
-            HAVING total_proyectos > 0
-            ORDER BY dc.nombre
-        """)
-        clientes = cursor.fetchall()
-        
-        # Equipos con proyectos (nota: HechoProyecto no tiene id_equipo, retornar lista vacía)
-        equipos = []
-        
-        # Años disponibles
-        cursor.execute("""
-            SELECT DISTINCT 
-                dt.anio,
-                COUNT(DISTINCT hp.id_proyecto) as total_proyectos
-            FROM DimTiempo dt
-            INNER JOIN HechoProyecto hp ON dt.id_tiempo = hp.id_tiempo_fin_real
-            GROUP BY dt.anio
-            ORDER BY dt.anio DESC
-        """)
-        anios = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'filtros': {
-                'clientes': clientes,
-                'equipos': equipos,
-                'anios': anios
-            }
-        })
+        return jsonify(panel_filtros_disponibles(get_dw_connection(), abrir_conexion=nueva_conexion_dw))
         
     except Exception as e:
         import traceback
@@ -2702,6 +2484,46 @@ def get_filtros_disponibles():
             'traceback': traceback.format_exc()
         }), 500
 
+@app.route('/dashboard/snapshot', methods=['GET'])
+@cache_dw
+def get_dashboard_snapshot():
+    """
+    Todos los paneles OLAP/BSC en una sola respuesta: filtros-disponibles,
+    kpis-ejecutivos, kpis-v2, bsc/okr y vision-estrategica. El primero corre
+    en la conexión del request y los demás en paralelo, cada uno con su propia
+    conexión del pool de consultas (una por hilo, así que con más paneles que
+    hilos los restantes esperan turno en lugar de pedir más conexiones). Cada
+    panel trae el mismo cuerpo que su endpoint; kpis-v2 toma
+    nivel/cliente_id/equipo_id/anio (nivel 'total' por defecto) y
+    ?format=columns se aplica a kpis-v2 y bsc/okr.
+    """
+    nivel = request.args.get('nivel', 'total').lower()
+    filtros = {
+        'cliente_id': request.args.get('cliente_id', type=int),
+        'equipo_id': request.args.get('equipo_id', type=int),
+        'anio': request.args.get('anio', type=int)
+    }
+    columnar = formato_columnar()
+    inicio = time.perf_counter()
+    paneles, errores, tiempos = ejecutar_en_paralelo({
+        'filtros_disponibles': panel_filtros_disponibles,
+        'kpis_ejecutivos': panel_kpis_ejecutivos,
+        'kpis_v2': lambda conn: panel_kpis_v2(conn, nivel, columnar=columnar, **filtros),
+        'bsc_okr': lambda conn: panel_bsc_okr(conn, columnar=columnar),
+        'vision_estrategica': panel_vision_estrategica
+    }, nueva_conexion_dw, get_dw_connection())
+    cuerpo = {
+        'success': not errores,
+        'version_datos': _version_dw['valor'],
+        'paneles': paneles,
+        'tiempos_ms': dict(tiempos, total=round((time.perf_counter() - inicio) * 1000, 1))
+    }
+    if errores:
+        # Paneles parciales para que el cliente pinte lo que pudo; 500 = no se guarda en caché
+        cuerpo['errores'] = errores
+        return jsonify(cuerpo), 500
+    return jsonify(cuerpo)
+
 if __name__ == '__main__':
     # Usar puerto de variable de entorno (Railway, Heroku, etc) o 5001 por defecto
     port = int(os.getenv('PORT', 5001))
@@ -0,0 +1,81 @@
+"""
+Microbenchmark: costo de serializar filas de cursor a JSON
+
+Compara, sobre filas sintéticas con la forma de HechoProyecto (Decimal, date,
+datetime, enteros y texto):
+    antes       bucle por fila convirtiendo Decimal/fechas + json.dumps (lo que hacía cada endpoint)
+    stdlib      json.dumps con json_rapido.default, sin bucle previo
+    json_rapido dumps de json_rapido (orjson si está instalado)
+
+Uso:
+    python benchmark_json.py [filas] [repeticiones]
+"""
+
+import json
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import json_rapido
+
+
+def generar_filas(n):
+    base = date(2024, 1, 1)
+    return [{
+        'id_hecho_proyecto': i,
+        'id_proyecto': i + 1000,
+        'nombre_proyecto': f'Proyecto {i}',
+        'fecha_inicio': base + timedelta(days=i % 365),
+        'fecha_fin_real': base + timedelta(days=i % 365 + 90),
+        'presupuesto': Decimal('150000.00') + i,
+        'costo_real': Decimal('143250.75') + i,
+        'variacion_costos': Decimal('-6749.25'),
+        'porcentaje_completado': Decimal('87.50'),
+        'tareas_total': 40 + i % 7,
+        'tareas_completadas': 35 + i % 5,
+        'fecha_carga': datetime(2024, 6, 1, 12, 30) + timedelta(minutes=i),
+    } for i in range(n)]
+
+
+def antes(filas):
+    for row in filas:
+        for key, value in row.items():
+            if isinstance(value, Decimal):
+                row[key] = float(value)
+            elif isinstance(value, date):
+                row[key] = value.isoformat()
+    return json.dumps({'success': True, 'data': filas}, separators=(',', ':'))
+
+
+def stdlib(filas):
+    return json.dumps({'success': True, 'data': filas}, default=json_rapido.default, separators=(',', ':'))
+
+
+def rapido(filas):
+    return json_rapido.dumps_bytes({'success': True, 'data': filas})
+
+
+def medir(funcion, n, repeticiones):
+    mejores = []
+    for _ in range(repeticiones):
+        filas = generar_filas(n)  # "antes" modifica las filas: cada repetición usa filas nuevas
+        inicio = time.perf_counter()
+        funcion(filas)
+        mejores.append(time.perf_counter() - inicio)
+    return min(mejores) * 1000 * 10000 / n
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(f"Filas: {n}  repeticiones: {repeticiones}  motor json_rapido: {json_rapido.MOTOR}")
+    base = None
+    for nombre, funcion in (('antes', antes), ('stdlib', stdlib), ('json_rapido', rapido)):
+        ms = medir(funcion, n, repeticiones)
+        base = base or ms
+        print(f"  {nombre:<12} {ms:8.2f} ms / 10k filas  ({base / ms:4.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Caché LRU con TTL para respuestas de endpoints de solo lectura (OLAP / BSC)
+
+Cada entrada guarda la versión de datos del DW con la que se calculó
+(``src/etl/version_datos.py``); si al leerla la versión actual es otra, la
+entrada se descarta. Así se invalida exactamente cuando una carga confirma
+datos nuevos, y el TTL solo acota lo que puede vivir una entrada.
+
+``una_vez`` agrupa los cálculos concurrentes de la misma clave y versión: el
+primer hilo ejecuta, los demás esperan su resultado (``coalesced``). Evita que
+N usuarios que abren el dashboard tras una carga lancen N veces la misma
+consulta pesada antes de que exista la entrada.
+
+Variables de entorno:
+    CACHE_MAX_ENTRADAS  máximo de entradas antes de desalojar la menos usada (256)
+    CACHE_TTL_SEG       vida máxima de una entrada; 0 desactiva la caché (300)
+    CACHE_COALESCER     1 = agrupar cálculos concurrentes idénticos (1)
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+CACHE_MAX_ENTRADAS = int(os.getenv('CACHE_MAX_ENTRADAS', '256'))
+CACHE_TTL_SEG = float(os.getenv('CACHE_TTL_SEG', '300'))
+CACHE_COALESCER = os.getenv('CACHE_COALESCER', '1') in {'1', 'true', 'True'}
+
+
+class _Vuelo:
+    """Cálculo en curso de una clave: los hilos que llegan después esperan ``listo``."""
+
+    __slots__ = ('listo', 'valor', 'error')
+
+    def __init__(self):
+        self.listo = threading.Event()
+        self.valor: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class CacheRespuestas:
+    """LRU acotada, con TTL y etiquetada por versión de datos. Segura entre hilos."""
+
+    def __init__(self, max_entradas: int = CACHE_MAX_ENTRADAS, ttl_seg: float = CACHE_TTL_SEG,
+                 coalescer: bool = CACHE_COALESCER):
+        self.max_entradas = max_entradas
+        self.ttl_seg = ttl_seg
+        self.coalescer = coalescer
+        self._entradas: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._vuelos: Dict[Hashable, _Vuelo] = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expiradas': 0, 'invalidadas': 0,
+                       'no_modificados': 0, 'coalesced': 0}
+
+    @property
+    def activa(self) -> bool:
+        return self.max_entradas > 0 and self.ttl_seg > 0
+
+    def obtener(self, clave: Hashable, version: Any) -> Optional[Any]:
+        """Valor de ``clave`` si existe, no expiró y es de ``version``; si no, None."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self._stats['misses'] += 1
+                return None
+            version_entrada, expira, valor = entrada
+            if version_entrada != version or expira <= time.monotonic():
+                del self._entradas[clave]
+                self._stats['invalidadas' if version_entrada != version else 'expiradas'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self._stats['hits'] += 1
+            return valor
+
+    def guardar(self, clave: Hashable, version: Any, valor: Any) -> None:
+        with self._lock:
+            self._entradas[clave] = (version, time.monotonic() + self.ttl_seg, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def una_vez(self, clave: Hashable, version: Any, funcion: Callable[[], Any]) -> Any:
+        """``funcion()`` una sola vez por (clave, versión) entre hilos concurrentes.
+
+        Los hilos que piden lo mismo mientras el primero calcula reciben su
+        resultado (o su excepción) en lugar de calcularlo de nuevo.
+        """
+        if not self.coalescer:
+            return funcion()
+        llave = (clave, version)
+        with self._lock:
+            vuelo = self._vuelos.get(llave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._vuelos[llave] = _Vuelo()
+            else:
+                self._stats['coalesced'] += 1
+        if not lider:
+            vuelo.listo.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            return vuelo.valor
+        try:
+            vuelo.valor = funcion()
+            return vuelo.valor
+        except BaseException as e:
+            vuelo.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._vuelos[llave]
+            vuelo.listo.set()
+
+    def registrar_no_modificado(self) -> None:
+        """Cuenta una respuesta 304 (el cliente ya tenía la versión vigente)."""
+        with self._lock:
+            self._stats['no_modificados'] += 1
+
+    def invalidar(self, version: Any = None) -> int:
+        """Descarta las entradas de versiones distintas a ``version`` (todas si es None)."""
+        with self._lock:
+            viejas = [c for c, (v, _, _) in self._entradas.items() if version is None or v != version]
+            for clave in viejas:
+                del self._entradas[clave]
+            self._stats['invalidadas'] += len(viejas)
+            return len(viejas)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entradas'] = len(self._entradas)
+            stats['en_vuelo'] = len(self._vuelos)
+        consultas = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / consultas, 4) if consultas else 0.0
+        stats['max_entradas'] = self.max_entradas
+        stats['ttl_seg'] = self.ttl_seg
+        return stats
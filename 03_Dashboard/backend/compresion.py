@@ -0,0 +1,58 @@
+"""
+Compresión negociada (gzip / deflate) y formato columnar de respuestas JSON
+
+``comprimir_respuesta`` se registra como ``after_request``: comprime las
+respuestas JSON/texto que superan un umbral según el ``Accept-Encoding`` del
+cliente. ``filas_en_columnas`` convierte una lista de filas (dicts) al formato
+``?format=columns``: la lista de columnas una sola vez y un arreglo de valores
+por columna, en vez de repetir los nombres en cada fila.
+
+Variables de entorno:
+    COMPRESION_MIN_BYTES  tamaño mínimo del cuerpo para comprimir (1024)
+    COMPRESION_NIVEL      nivel 1-9; 0 desactiva la compresión (6)
+"""
+
+import os
+import gzip
+import zlib
+from typing import Any, Dict, List, Optional, Sequence
+
+COMPRESION_MIN_BYTES = int(os.getenv('COMPRESION_MIN_BYTES', '1024'))
+COMPRESION_NIVEL = int(os.getenv('COMPRESION_NIVEL', '6'))
+CODIFICACIONES = ('gzip', 'deflate')
+TIPOS_COMPRIMIBLES = ('application/json', 'text/')
+
+
+def filas_en_columnas(filas: List[Dict[str, Any]], columnas: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """[{col: valor}, ...] -> {'columnas': [...], 'valores': [[valores de col0], [valores de col1], ...]}"""
+    if columnas is None:
+        columnas = list(filas[0].keys()) if filas else []
+    return {
+        'columnas': list(columnas),
+        'valores': [[fila.get(c) for fila in filas] for c in columnas]
+    }
+
+
+def comprimir_respuesta(respuesta, accept_encodings, nivel: int = COMPRESION_NIVEL,
+                        minimo: int = COMPRESION_MIN_BYTES):
+    """Comprime ``respuesta`` in situ con la mejor codificación aceptada (si conviene)"""
+    if (nivel <= 0 or respuesta.status_code != 200 or respuesta.direct_passthrough
+            or respuesta.is_streamed or 'Content-Encoding' in respuesta.headers
+            or not (respuesta.mimetype or '').startswith(TIPOS_COMPRIMIBLES)):
+        return respuesta
+    respuesta.vary.add('Accept-Encoding')
+    codificacion = accept_encodings.best_match(CODIFICACIONES)
+    datos = respuesta.get_data()
+    if codificacion is None or len(datos) < minimo:
+        return respuesta
+    if codificacion == 'gzip':
+        comprimidos = gzip.compress(datos, compresslevel=nivel)
+    else:
+        comprimidos = zlib.compress(datos, nivel)  # "deflate" en HTTP = formato zlib
+    respuesta.set_data(comprimidos)
+    respuesta.headers['Content-Encoding'] = codificacion
+    # El ETag fuerte identifica bytes concretos: la versión comprimida lleva el suyo
+    etag, debil = respuesta.get_etag()
+    if etag and not debil:
+        respuesta.set_etag(f"{etag}-{codificacion}")
+    return respuesta
@@ -0,0 +1,147 @@
+"""
+Constructor de consultas para /olap/kpis-v2
+
+Cada nivel (total, por_cliente, por_equipo, por_tiempo, detallado) tiene una
+consulta base y la lista de filtros que admite. Los filtros se aplican sobre
+claves sustitutas (``id_cliente``, ``id_equipo``) y sobre ``anio`` de
+DimTiempo, siempre con parámetros ligados: nada de nombres interpolados en el
+SQL. El texto de cada combinación nivel + filtros presentes se arma una sola
+vez y es siempre el mismo, así que el servidor (y el caché de sentencias
+preparadas, si se activa) lo ve como una sola sentencia.
+
+Variables de entorno:
+    OLAP_SENTENCIAS_PREPARADAS  1 = sentencias preparadas del servidor, reutilizadas
+                                por conexión; conviene con DB_POOL_RESET_SESSION=0 (0)
+"""
+
+import os
+import weakref
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+SENTENCIAS_PREPARADAS = os.getenv('OLAP_SENTENCIAS_PREPARADAS', '0') in {'1', 'true', 'True'}
+
+# conexión física -> {sql: cursor preparado}
+_cursores_preparados: 'weakref.WeakKeyDictionary[Any, Dict[str, Any]]' = weakref.WeakKeyDictionary()
+
+# Filtro -> condición sobre la vista (un marcador %s por filtro)
+CONDICIONES = {
+    'cliente_id': 'id_cliente = %s',
+    'equipo_id': 'id_equipo = %s',
+    'anio': 'anio = %s',
+}
+
+_PORCENTAJE_EN_PRESUPUESTO = """ROUND(AVG(CASE
+                        WHEN en_presupuesto = 'Sí' THEN 100
+                        WHEN en_presupuesto = 'No' THEN 0
+                        ELSE NULL
+                    END), 2)"""
+
+# nivel -> (SELECT ... FROM, filtros admitidos, sufijo GROUP BY/ORDER BY/LIMIT)
+NIVELES: Dict[str, Tuple[str, Tuple[str, ...], str]] = {
+    'total': (f"""
+                SELECT
+                    COUNT(DISTINCT id_proyecto) as total_proyectos,
+                    SUM(CASE WHEN estado = 'Completado' THEN 1 ELSE 0 END) as proyectos_completados,
+                    SUM(CASE WHEN estado = 'Cancelado' THEN 1 ELSE 0 END) as proyectos_cancelados,
+                    0 as proyectos_activos,
+                    COUNT(DISTINCT cliente) as total_clientes,
+                    COUNT(DISTINCT equipo) as total_equipos,
+                    SUM(presupuesto) as presupuesto_total,
+                    SUM(costo_real) as costo_total,
+                    SUM(margen) as margen_total,
+                    ROUND(AVG(rentabilidad_porcentaje), 2) as rentabilidad_promedio_porcentaje,
+                    {_PORCENTAJE_EN_PRESUPUESTO} as porcentaje_cumplimiento_presupuesto,
+                    SUM(horas_reales) as horas_reales_total,
+                    SUM(horas_estimadas) as horas_estimadas_total,
+                    CASE
+                        WHEN SUM(horas_estimadas) > 0
+                        THEN ROUND((SUM(horas_reales) / SUM(horas_estimadas) * 100), 2)
+                        ELSE 0
+                    END as eficiencia_estimacion_porcentaje
+                FROM vw_olap_detallado""",
+              ('cliente_id', 'equipo_id', 'anio'), ''),
+    'por_cliente': (f"""
+                SELECT
+                    cliente,
+                    MAX(sector) as sector,
+                    COUNT(DISTINCT id_proyecto) as total_proyectos,
+                    SUM(CASE WHEN estado = 'Completado' THEN 1 ELSE 0 END) as proyectos_completados,
+                    SUM(presupuesto) as presupuesto_total,
+                    SUM(costo_real) as costo_total,
+                    SUM(margen) as margen_total,
+                    ROUND(AVG(rentabilidad_porcentaje), 2) as rentabilidad_promedio_porcentaje,
+                    {_PORCENTAJE_EN_PRESUPUESTO} as porcentaje_en_presupuesto
+                FROM vw_olap_detallado""",
+                    ('cliente_id', 'anio'), " GROUP BY cliente ORDER BY total_proyectos DESC"),
+    'por_equipo': ("""
+                SELECT
+                    equipo,
+                    COUNT(DISTINCT id_proyecto) as total_proyectos,
+                    SUM(CASE WHEN estado = 'Completado' THEN 1 ELSE 0 END) as proyectos_completados,
+                    SUM(presupuesto) as presupuesto_total,
+                    SUM(costo_real) as costo_total,
+                    SUM(margen) as margen_total,
+                    ROUND(AVG(rentabilidad_porcentaje), 2) as rentabilidad_promedio_porcentaje,
+                    SUM(horas_reales) as horas_reales_total,
+                    SUM(horas_estimadas) as horas_estimadas_total
+                FROM vw_olap_detallado""",
+                   ('equipo_id', 'anio'), " GROUP BY equipo ORDER BY total_proyectos DESC"),
+    'por_tiempo': ("SELECT * FROM vw_olap_por_anio", ('anio',), " ORDER BY anio DESC"),
+    'detallado': ("SELECT * FROM vw_olap_detallado", ('cliente_id', 'anio'),
+                  " ORDER BY anio DESC, proyecto DESC LIMIT 100"),
+}
+
+
+@lru_cache(maxsize=None)
+def _sql(nivel: str, filtros: Tuple[str, ...]) -> str:
+    base, _, sufijo = NIVELES[nivel]
+    condiciones = [CONDICIONES[f] for f in filtros]
+    return base + (" WHERE " + " AND ".join(condiciones) if condiciones else "") + sufijo
+
+
+def construir_consulta(nivel: str, **filtros: Optional[Any]) -> Tuple[str, tuple]:
+    """(sql, parámetros) para ``nivel``; niveles desconocidos se tratan como 'detallado'.
+
+    Los filtros en None (o no admitidos por el nivel) no se aplican.
+    """
+    if nivel not in NIVELES:
+        nivel = 'detallado'
+    presentes = tuple(f for f in NIVELES[nivel][1] if filtros.get(f))
+    return _sql(nivel, presentes), tuple(filtros[f] for f in presentes)
+
+
+def _cursor_preparado(conn: Any, sql: str) -> Any:
+    """Cursor preparado para ``sql`` en la conexión física (sobrevive a las devoluciones al pool)."""
+    fisica = getattr(conn, '_cnx', conn)  # PooledMySQLConnection -> MySQLConnection
+    cursores = _cursores_preparados.setdefault(fisica, {})
+    if sql not in cursores:
+        cursores[sql] = conn.cursor(prepared=True, dictionary=True)
+    return cursores[sql]
+
+
+def ejecutar_consulta(conn: Any, sql: str, params: tuple, preparada: bool = SENTENCIAS_PREPARADAS) -> list:
+    """Ejecuta y devuelve las filas como dicts.
+
+    Con ``preparada`` la sentencia se prepara una vez por conexión física y se
+    reutiliza en los requests siguientes que la tomen del pool. Si el pool
+    reinicia la sesión (DB_POOL_RESET_SESSION=1) el servidor descarta las
+    sentencias; entonces se vuelve a preparar.
+    """
+    if not preparada:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+    cursor = _cursor_preparado(conn, sql)
+    try:
+        cursor.execute(sql, params)
+    except Exception as e:
+        if getattr(e, 'errno', None) != 1243:  # sentencia desconocida: la sesión se reinició
+            raise
+        _cursores_preparados[getattr(conn, '_cnx', conn)].pop(sql, None)
+        cursor = _cursor_preparado(conn, sql)
+        cursor.execute(sql, params)
+    return cursor.fetchall()
@@ -0,0 +1,131 @@
+"""
+Server-Sent Events: avance de cargas ETL y cambios de versión de datos del DW
+
+Un solo hilo vigilante por worker consulta cada ``EVENTOS_INTERVALO_SEG`` la
+versión de datos (``VersionDatosDW``) y el último trabajo ETL (``TrabajoETL``)
+y, si algo cambió, lo publica a todos los clientes conectados a ``/eventos``.
+Así el costo en MySQL es una consulta por intervalo por worker, sin importar
+cuántos navegadores estén abiertos, y los clientes solo recargan cuando los
+datos cambian en vez de consultar los endpoints OLAP a ciegas.
+
+Eventos:
+    version  {'version': n}                  al conectar y cada vez que cambia
+    etl      estado del trabajo (a_dict)     cada cambio de etapa/estado
+
+El vigilante solo corre mientras haya clientes. Cada cliente ocupa un hilo del
+worker durante toda la conexión, así que se acotan por worker
+(``EVENTOS_MAX_CLIENTES``); el resto recibe 503 y sigue con su sondeo.
+
+Variables de entorno:
+    EVENTOS_INTERVALO_SEG  período del vigilante (2)
+    EVENTOS_LATIDO_SEG     comentario keep-alive si no hay eventos (15)
+    EVENTOS_MAX_CLIENTES   conexiones SSE simultáneas por worker (16)
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import json_rapido
+
+logger = logging.getLogger("dashboard.eventos")
+
+EVENTOS_INTERVALO_SEG = float(os.getenv('EVENTOS_INTERVALO_SEG', '2'))
+EVENTOS_LATIDO_SEG = float(os.getenv('EVENTOS_LATIDO_SEG', '15'))
+EVENTOS_MAX_CLIENTES = int(os.getenv('EVENTOS_MAX_CLIENTES', '16'))
+COLA_POR_CLIENTE = 100
+
+
+def formato_sse(evento: str, datos: Any) -> str:
+    """Un mensaje SSE (``event:`` + ``data:`` en una línea JSON)."""
+    return f"event: {evento}\ndata: {json_rapido.dumps(datos)}\n\n"
+
+
+class CanalEventos:
+    """Difunde a los suscriptores los cambios que detecta ``leer_estado``.
+
+    ``leer_estado()`` devuelve ``{'version': int, 'trabajo': dict | None}``.
+    """
+
+    def __init__(self, leer_estado: Callable[[], Dict[str, Any]],
+                 intervalo: float = EVENTOS_INTERVALO_SEG, max_clientes: int = EVENTOS_MAX_CLIENTES):
+        self._leer_estado = leer_estado
+        self.intervalo = intervalo
+        self.max_clientes = max_clientes
+        self._lock = threading.Lock()
+        self._clientes: set = set()
+        self._vigilante: Optional[threading.Thread] = None
+        self._ultimo: Dict[str, Any] = {'version': None, 'trabajo': None}
+        self._stats = {'publicados': 0, 'rechazados': 0, 'descartados': 0}
+
+    def suscribir(self) -> Optional['queue.Queue[str]']:
+        """Cola de mensajes del nuevo cliente, o None si se alcanzó el máximo."""
+        with self._lock:
+            if len(self._clientes) >= self.max_clientes:
+                self._stats['rechazados'] += 1
+                return None
+            cola: 'queue.Queue[str]' = queue.Queue(maxsize=COLA_POR_CLIENTE)
+            self._clientes.add(cola)
+            if self._ultimo['version'] is not None:
+                cola.put_nowait(formato_sse('version', {'version': self._ultimo['version']}))
+            if self._vigilante is None or not self._vigilante.is_alive():
+                self._vigilante = threading.Thread(target=self._vigilar, name='eventos-dw', daemon=True)
+                self._vigilante.start()
+            return cola
+
+    def desuscribir(self, cola: 'queue.Queue[str]') -> None:
+        with self._lock:
+            self._clientes.discard(cola)
+
+    def publicar(self, evento: str, datos: Any) -> None:
+        mensaje = formato_sse(evento, datos)
+        with self._lock:
+            clientes = list(self._clientes)
+            self._stats['publicados'] += 1
+        for cola in clientes:
+            try:
+                cola.put_nowait(mensaje)
+            except queue.Full:  # cliente que no lee: pierde mensajes, no frena a los demás
+                self._stats['descartados'] += 1
+
+    def flujo(self, cola: 'queue.Queue[str]', latido: float = EVENTOS_LATIDO_SEG) -> Iterator[str]:
+        """Generador para la respuesta ``text/event-stream`` de un cliente."""
+        try:
+            yield f"retry: {int(self.intervalo * 2500)}\n\n"
+            while True:
+                try:
+                    yield cola.get(timeout=latido)
+                except queue.Empty:
+                    yield ": latido\n\n"
+        finally:
+            self.desuscribir(cola)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, clientes=len(self._clientes), version=self._ultimo['version'])
+
+    def _vigilar(self) -> None:
+        while True:
+            with self._lock:
+                if not self._clientes:
+                    self._vigilante = None
+                    return
+            try:
+                self._comparar(self._leer_estado())
+            except Exception as e:
+                logger.warning("Vigilante de eventos: %s", e)
+            time.sleep(self.intervalo)
+
+    def _comparar(self, estado: Dict[str, Any]) -> None:
+        version, trabajo = estado.get('version'), estado.get('trabajo')
+        anterior = self._ultimo
+        self._ultimo = {'version': version, 'trabajo': trabajo}
+        # En la primera lectura solo interesa un trabajo que siga en curso, no el último terminado
+        if (trabajo is not None and trabajo != anterior['trabajo']
+                and (anterior['version'] is not None or trabajo.get('estado') in ('en_cola', 'ejecutando'))):
+            self.publicar('etl', trabajo)
+        if version is not None and version != anterior['version']:
+            self.publicar('version', {'version': version})
@@ -0,0 +1,64 @@
+"""
+Serialización JSON de filas de cursor sin conversiones por endpoint
+
+``dumps`` codifica directamente Decimal, date, datetime, time, timedelta y
+bytes, de modo que los endpoints pueden devolver las filas del cursor tal cual.
+Usa ``orjson`` si está instalado (C, varias veces más rápido) y si no el
+``json`` de la biblioteca estándar con el mismo ``default``. Ambos motores
+convierten igual los tipos (Decimal -> float, fechas -> ISO 8601, bytes ->
+hex) y producen JSON equivalente, pero no idéntico byte a byte (p.ej. la
+notación de los floats grandes o pequeños difiere).
+
+``benchmark_json.py`` mide el costo por 10k filas frente a la conversión fila
+a fila que hacía cada endpoint.
+"""
+
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+MOTOR = 'orjson' if orjson is not None else 'json'
+
+
+def default(valor: Any) -> Any:
+    """Tipos que devuelve mysql.connector y que ``json`` no conoce."""
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, timedelta):
+        return str(valor)  # TIME de MySQL llega como timedelta: 'H:MM:SS'
+    if isinstance(valor, (bytes, bytearray)):
+        return bytes(valor).hex()
+    if isinstance(valor, (set, frozenset)):
+        return list(valor)
+    raise TypeError(f"Objeto de tipo {type(valor).__name__} no serializable a JSON")
+
+
+def dumps_bytes(obj: Any, ordenar: bool = False, indentar: bool = False) -> bytes:
+    """Serializa ``obj`` a JSON compacto (UTF-8)."""
+    if orjson is not None:
+        opciones = orjson.OPT_NON_STR_KEYS
+        if ordenar:
+            opciones |= orjson.OPT_SORT_KEYS
+        if indentar:
+            opciones |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=opciones)
+    return dumps(obj, ordenar=ordenar, indentar=indentar).encode('utf-8')
+
+
+def dumps(obj: Any, ordenar: bool = False, indentar: bool = False) -> str:
+    if orjson is not None:
+        return dumps_bytes(obj, ordenar=ordenar, indentar=indentar).decode('utf-8')
+    return json.dumps(obj, default=default, ensure_ascii=False, sort_keys=ordenar,
+                      indent=2 if indentar else None, separators=None if indentar else (',', ':'))
+
+
+def loads(datos: Any) -> Any:
+    return orjson.loads(datos) if orjson is not None else json.loads(datos)
@@ -0,0 +1,209 @@
+"""
+Paneles del dashboard OLAP/BSC como funciones de una conexión
+
+Cada función recibe una conexión al DW y devuelve el cuerpo JSON del endpoint
+correspondiente (``success`` incluido), sin tocar ``request`` ni ``g``. Así
+las usan tanto los endpoints individuales (con la conexión del request) como
+``/dashboard/snapshot``, que corre la primera en la conexión del request y
+las demás en los hilos de consultas, cada una con su propia conexión del pool
+``destino_consultas`` (tantas conexiones como hilos, ver ``paralelo``).
+
+Los paneles con varias consultas aceptan ``abrir_conexion``: con ella las
+consultas corren a la vez (ver ``paralelo.consultas_en_paralelo``).
+"""
+
+from typing import Any, Callable, Dict, Optional
+
+from compresion import filas_en_columnas
+from consultas_olap import construir_consulta, ejecutar_consulta
+from paralelo import consultar, consultas_en_paralelo
+
+AbrirConexion = Optional[Callable[[], Any]]
+
+VISION_ESTRATEGICA = {
+    'titulo': 'Transformación Digital para la Excelencia Operacional',
+    'descripcion': 'Liderar la transformación digital mediante sistemas de soporte de decisiones, procesos automatizados y analítica avanzada para entregar valor superior a nuestros clientes.',
+    'pilares': [
+        'Transformación Digital',
+        'Confiabilidad y Calidad',
+        'Analítica Avanzada',
+        'Automatización de Procesos',
+        'Excelencia Operacional'
+    ]
+}
+
+
+def panel_filtros_disponibles(conn: Any, abrir_conexion: AbrirConexion = None) -> Dict[str, Any]:
+    """/olap/filtros-disponibles: clientes, equipos y años con proyectos"""
+    filas = consultas_en_paralelo(conn, {
+        'clientes': """
+            SELECT DISTINCT
+                dc.id_cliente,
+                dc.nombre as nombre_cliente,
+                dc.sector,
+                COUNT(hp.id_proyecto) as total_proyectos
+            FROM DimCliente dc
+            INNER JOIN HechoProyecto hp ON dc.id_cliente = hp.id_cliente
+            GROUP BY dc.id_cliente, dc.nombre, dc.sector
+            HAVING total_proyectos > 0
+            ORDER BY dc.nombre
+        """,
+        'equipos': """
+            SELECT
+                de.id_equipo,
+                de.nombre_equipo,
+                COUNT(hp.id_proyecto) as total_proyectos
+            FROM DimEquipo de
+            INNER JOIN HechoProyecto hp ON de.id_equipo = hp.id_equipo
+            GROUP BY de.id_equipo, de.nombre_equipo
+            ORDER BY de.nombre_equipo
+        """,
+        'anios': """
+            SELECT DISTINCT
+                dt.anio,
+                COUNT(DISTINCT hp.id_proyecto) as total_proyectos
+            FROM DimTiempo dt
+            INNER JOIN HechoProyecto hp ON dt.id_tiempo = hp.id_tiempo_fin_real
+            GROUP BY dt.anio
+            ORDER BY dt.anio DESC
+        """
+    }, abrir_conexion)
+    return {
+        'success': True,
+        'filtros': {
+            'clientes': filas['clientes'],
+            'equipos': filas['equipos'],
+            'anios': filas['anios']
+        }
+    }
+
+
+def panel_kpis_ejecutivos(conn: Any, abrir_conexion: AbrirConexion = None) -> Dict[str, Any]:
+    """/olap/kpis-ejecutivos: últimos 12 trimestres y desempeño por sector del año"""
+    filas = consultas_en_paralelo(conn, {
+        'kpis_temporales': """
+            SELECT * FROM vw_olap_kpis_ejecutivos
+            ORDER BY anio DESC, trimestre DESC
+            LIMIT 12
+        """,
+        'performance_sectores': """
+            SELECT * FROM vw_olap_sector_performance
+            WHERE anio = YEAR(CURDATE())
+            ORDER BY facturacion_sector DESC
+        """
+    }, abrir_conexion)
+    return {
+        'success': True,
+        'kpis_temporales': filas['kpis_temporales'],
+        'performance_sectores': filas['performance_sectores']
+    }
+
+
+def panel_kpis_v2(conn: Any, nivel: str = 'detallado', cliente_id: Optional[int] = None,
+                  equipo_id: Optional[int] = None, anio: Optional[int] = None,
+                  columnar: bool = False) -> Dict[str, Any]:
+    """/olap/kpis-v2: un nivel de agregación con filtros por claves sustitutas"""
+    query, parametros = construir_consulta(nivel, cliente_id=cliente_id, equipo_id=equipo_id, anio=anio)
+    resultados = ejecutar_consulta(conn, query, parametros)
+    return {
+        'success': True,
+        'nivel': nivel,
+        'total_resultados': len(resultados),
+        'data': filas_en_columnas(resultados) if columnar else resultados,
+        'filtros': {
+            'cliente_id': cliente_id,
+            'equipo_id': equipo_id,
+            'anio': anio
+        }
+    }
+
+
+def panel_bsc_okr(conn: Any, columnar: bool = False, abrir_conexion: AbrirConexion = None) -> Dict[str, Any]:
+    """/bsc/okr: objetivos con sus KRs agrupados por perspectiva"""
+    filas = consultas_en_paralelo(conn, {
+        'objetivos': "SELECT * FROM vw_bsc_tablero_consolidado ORDER BY perspectiva, codigo_objetivo",
+        'krs': "SELECT * FROM vw_bsc_krs_detalle ORDER BY perspectiva, codigo_objetivo, codigo_kr"
+    }, abrir_conexion)
+    objetivos, krs = filas['objetivos'], filas['krs']
+
+    krs_por_objetivo: Dict[Any, list] = {}
+    for kr in krs:
+        krs_por_objetivo.setdefault(kr['codigo_objetivo'], []).append(kr)
+
+    # Organizar datos por perspectiva
+    perspectivas = {}
+    for objetivo in objetivos:
+        perspectiva = objetivo['perspectiva']
+        if perspectiva not in perspectivas:
+            perspectivas[perspectiva] = {
+                'nombre': perspectiva,
+                'avance_global': 0,
+                'objetivos': [],
+                'resumen': {
+                    'total_objetivos': 0,
+                    'objetivos_verde': 0,
+                    'objetivos_amarillo': 0,
+                    'objetivos_rojo': 0,
+                    'avance_promedio': 0
+                }
+            }
+
+        # Mapear campos a los nombres esperados por el frontend
+        objetivo['nombre'] = objetivo.get('objetivo_nombre', '')
+        objetivo['descripcion'] = objetivo.get('objetivo_descripcion', '')
+        objetivo['krs'] = krs_por_objetivo.get(objetivo['codigo_objetivo'], [])
+
+        perspectivas[perspectiva]['objetivos'].append(objetivo)
+
+        # Actualizar resumen de perspectiva
+        resumen = perspectivas[perspectiva]['resumen']
+        resumen['total_objetivos'] += 1
+        estado = objetivo.get('estado_objetivo', '')
+        if estado == 'Verde':
+            resumen['objetivos_verde'] += 1
+        elif estado == 'Amarillo':
+            resumen['objetivos_amarillo'] += 1
+        else:
+            resumen['objetivos_rojo'] += 1
+
+        avance = objetivo.get('avance_objetivo_porcentaje', 0)
+        if avance:
+            resumen['avance_promedio'] += float(avance)
+
+    # Calcular promedios y avance global
+    for perspectiva in perspectivas.values():
+        if perspectiva['resumen']['total_objetivos'] > 0:
+            perspectiva['resumen']['avance_promedio'] /= perspectiva['resumen']['total_objetivos']
+            perspectiva['avance_global'] = perspectiva['resumen']['avance_promedio']
+
+    if columnar:
+        for perspectiva in perspectivas.values():
+            for objetivo in perspectiva['objetivos']:
+                objetivo['krs'] = filas_en_columnas(objetivo['krs'])
+            perspectiva['objetivos'] = filas_en_columnas(perspectiva['objetivos'])
+
+    return {
+        'success': True,
+        'perspectivas': perspectivas
+    }
+
+
+def panel_vision_estrategica(conn: Any) -> Dict[str, Any]:
+    """/bsc/vision-estrategica: avance por componente de la visión"""
+    vision_componentes = consultar(conn, """
+            SELECT
+                bsc.perspectiva as vision_componente,
+                COUNT(*) as total_objetivos,
+                AVG(bsc.avance) as avance_promedio,
+                COUNT(CASE WHEN bsc.estado = 'Verde' THEN 1 END) as objetivos_verde,
+                COUNT(CASE WHEN bsc.estado = 'Amarillo' THEN 1 END) as objetivos_amarillo,
+                COUNT(CASE WHEN bsc.estado = 'Rojo' THEN 1 END) as objetivos_rojo
+            FROM vw_bsc_tablero_consolidado bsc
+            GROUP BY bsc.perspectiva
+            ORDER BY avance_promedio DESC
+        """)
+    return {
+        'success': True,
+        'vision_componentes': vision_componentes,
+        'vision_statement': VISION_ESTRATEGICA
+    }
@@ -0,0 +1,144 @@
+"""
+Ejecución concurrente de consultas independientes sobre conexiones del pool
+
+Tres niveles, todos sobre el mismo pool de hilos acotado:
+    en_paralelo            dict ``nombre -> funcion()``; resultados, errores y tiempos
+    ejecutar_en_paralelo   igual, pero cada tarea recibe su propia conexión de
+                           ``abrir_conexion`` y la devuelve al terminar; con
+                           ``conn``, la primera corre en la del llamador
+    consultas_en_paralelo  dict ``nombre -> sql | (sql, params)``; la primera
+                           corre en la conexión del llamador y las demás en
+                           conexiones nuevas del pool
+
+La latencia queda en la de la tarea más lenta en lugar de la suma, que es lo
+que importa con el DW en un host remoto.
+
+El pool de hilos es uno por proceso (se recrea tras el fork de un worker). Una
+llamada hecha desde uno de sus propios hilos corre en línea, para no esperar
+por hilos que no se liberan.
+
+``abrir_conexion`` debe sacar las conexiones de un pool propio de
+``CONSULTAS_HILOS`` conexiones (en el dashboard, ``destino_consultas``), nunca
+del pool de los requests: cada request retiene su conexión mientras espera a
+estos hilos, y con el pool compartido agotado los hilos esperarían a su vez por
+esas conexiones. Con un pool del mismo tamaño que el de hilos, cada hilo tiene
+siempre una conexión libre.
+
+Variables de entorno:
+    CONSULTAS_HILOS  hilos (y conexiones) para consultas concurrentes por worker (4, hasta 32)
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+CONSULTAS_HILOS = max(1, min(int(os.getenv('CONSULTAS_HILOS', '4')), 32))  # límite de pool de mysql.connector
+
+Consulta = Union[str, Tuple[str, tuple]]
+
+_ejecutor = {'pool': None, 'pid': None}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _obtener_ejecutor() -> ThreadPoolExecutor:
+    with _lock:
+        if _ejecutor['pool'] is None or _ejecutor['pid'] != os.getpid():
+            _ejecutor['pool'] = ThreadPoolExecutor(max_workers=CONSULTAS_HILOS,
+                                                   thread_name_prefix='consultas',
+                                                   initializer=lambda: setattr(_local, 'en_pool', True))
+            _ejecutor['pid'] = os.getpid()
+        return _ejecutor['pool']
+
+
+def _en_linea() -> bool:
+    return CONSULTAS_HILOS <= 1 or getattr(_local, 'en_pool', False)
+
+
+def consultar(conn: Any, sql: str, params: tuple = ()) -> list:
+    """Filas de ``sql`` como dicts."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _con_conexion(funcion: Callable[[Any], Any], abrir_conexion: Callable[[], Any]) -> Any:
+    conn = abrir_conexion()
+    try:
+        return funcion(conn)
+    finally:
+        conn.close()
+
+
+def _cronometrar(funcion: Callable[[], Any]) -> Tuple[Any, float]:
+    inicio = time.perf_counter()
+    return funcion(), time.perf_counter() - inicio
+
+
+def en_paralelo(funciones: Dict[str, Callable[[], Any]], en_llamador: Optional[str] = None
+                ) -> Tuple[Dict[str, Any], Dict[str, str], Dict[str, float]]:
+    """Ejecuta ``funciones`` concurrentemente; ``en_llamador`` corre en el hilo
+    que llama mientras las demás avanzan en el pool.
+
+    Returns:
+        (resultados, errores, tiempos_ms) por nombre; una función que falla
+        aparece solo en ``errores`` y no cancela a las demás.
+    """
+    resultados: Dict[str, Any] = {}
+    errores: Dict[str, str] = {}
+    tiempos: Dict[str, float] = {}
+    if len(funciones) <= 1 or _en_linea():
+        pendientes = {nombre: None for nombre in funciones}
+    else:
+        ejecutor = _obtener_ejecutor()
+        pendientes = {en_llamador: None} if en_llamador in funciones else {}
+        pendientes.update({nombre: ejecutor.submit(_cronometrar, funcion)
+                           for nombre, funcion in funciones.items() if nombre != en_llamador})
+    for nombre, futuro in pendientes.items():
+        try:
+            resultado, segundos = futuro.result() if futuro else _cronometrar(funciones[nombre])
+            resultados[nombre] = resultado
+            tiempos[nombre] = round(segundos * 1000, 1)
+        except Exception as e:
+            errores[nombre] = str(e)
+    return resultados, errores, tiempos
+
+
+def ejecutar_en_paralelo(tareas: Dict[str, Callable[[Any], Any]], abrir_conexion: Callable[[], Any],
+                         conn: Any = None) -> Tuple[Dict[str, Any], Dict[str, str], Dict[str, float]]:
+    """``en_paralelo`` donde cada tarea recibe su propia conexión (se cierra al terminar).
+
+    Con ``conn`` la primera tarea la usa en el hilo del llamador (sin cerrarla):
+    una conexión menos del pool y un hilo menos ocupado.
+    """
+    funciones = {nombre: (lambda f=funcion: _con_conexion(f, abrir_conexion))
+                 for nombre, funcion in tareas.items()}
+    primera = next(iter(tareas), None) if conn is not None else None
+    if primera is not None:
+        funciones[primera] = lambda f=tareas[primera]: f(conn)
+    return en_paralelo(funciones, en_llamador=primera)
+
+
+def consultas_en_paralelo(conn: Any, consultas: Dict[str, Consulta],
+                          abrir_conexion: Optional[Callable[[], Any]] = None) -> Dict[str, list]:
+    """Filas de cada consulta por nombre; la primera que falle se propaga.
+
+    Sin ``abrir_conexion`` (o dentro de un hilo del pool) corren una tras otra
+    en ``conn``, como antes.
+    """
+    normalizadas = {nombre: (c, ()) if isinstance(c, str) else c for nombre, c in consultas.items()}
+    if abrir_conexion is None or len(normalizadas) <= 1 or _en_linea():
+        return {nombre: consultar(conn, sql, params) for nombre, (sql, params) in normalizadas.items()}
+    (primera, (sql, params)), *resto = normalizadas.items()
+    ejecutor = _obtener_ejecutor()
+    futuros = {nombre: ejecutor.submit(_con_conexion, lambda c, q=q: consultar(c, *q), abrir_conexion)
+               for nombre, q in resto}
+    filas = {primera: consultar(conn, sql, params)}
+    for nombre, futuro in futuros.items():
+        filas[nombre] = futuro.result()
+    return {nombre: filas[nombre] for nombre in normalizadas}
@@ -13,7 +13,6 @@ import math
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 import json
-import mysql.connector
 import os
 
 class RayleighModel:
@@ -284,23 +283,30 @@ class RayleighModel:
         
         return cronograma
 
-def obtener_datos_proyectos_reales():
+def obtener_datos_proyectos_reales(conn=None):
     """
     Obtiene datos históricos reales de HechoProyecto para calibrar el modelo
     
+    Args:
+        conn: Conexión al DW ya abierta (p.ej. la del request); si es None se
+            toma una del pool 'destino' y se devuelve al terminar
+    
     Returns:
         Dict con estadísticas de proyectos reales
     """
+    propia = conn is None
     try:
-        # Usar configuración de Railway desde variables de entorno
-        conn = mysql.connector.connect(
-            host=os.getenv('DB_HOST_DESTINO', 'localhost'),
-            port=int(os.getenv('DB_PORT_DESTINO', 3306)),
-            user=os.getenv('DB_USER_DESTINO', 'root'),
-            password=os.getenv('DB_PASSWORD_DESTINO', ''),
-            database=os.getenv('DB_NAME_DESTINO', 'dw_proyectos_hist')
-        )
-        cursor = conn.cursor(dictionary=True)
+        if propia:
+            from src.config.config_conexion import configure_pool
+
+            # Pool 'destino' compartido con la API (configuración de Railway desde variables de entorno)
+            conn = configure_pool('destino', {
+                'host': os.getenv('DB_HOST_DESTINO', 'localhost'),
+                'port': int(os.getenv('DB_PORT_DESTINO', 3306)),
+                'user': os.getenv('DB_USER_DESTINO', 'root'),
+                'password': os.getenv('DB_PASSWORD_DESTINO', ''),
+                'database': os.getenv('DB_NAME_DESTINO', 'dw_proyectos_hist')
+            }).get_connection()
         
         # Obtener estadísticas de proyectos completados
         query = """
@@ -321,11 +327,17 @@ def obtener_datos_proyectos_reales():
         WHERE hp.tareas_total > 0
         """
         
-        cursor.execute(query)
-        stats = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
+        # La conexión propia vuelve al pool también si la consulta falla
+        try:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                cursor.execute(query)
+                stats = cursor.fetchone()
+            finally:
+                cursor.close()
+        finally:
+            if propia:
+                conn.close()
         
         if stats and stats['total_proyectos'] > 0:
             # Convertir días a semanas
@@ -357,7 +369,8 @@ def generar_prediccion_completa(tamanio_proyecto: float,
                               tipo_proyecto: str = 'web',
                               fecha_inicio: Optional[datetime] = None,
                               esfuerzo_testing: float = 160.0,
-                              usar_datos_reales: bool = True) -> Dict:
+                              usar_datos_reales: bool = True,
+                              conn=None) -> Dict:
     """
     Función principal para generar predicción completa de defectos
     
@@ -369,6 +382,7 @@ def generar_prediccion_completa(tamanio_proyecto: float,
         fecha_inicio: Fecha de inicio (si None, usa fecha actual)
         esfuerzo_testing: Horas totales disponibles para testing
         usar_datos_reales: Si True, calibra con datos de HechoProyecto
+        conn: Conexión al DW para esa calibración (None = una del pool)
         
     Returns:
         Dict con predicción completa
@@ -380,7 +394,7 @@ def generar_prediccion_completa(tamanio_proyecto: float,
     # Obtener datos reales si está habilitado
     datos_reales = None
     if usar_datos_reales:
-        datos_reales = obtener_datos_proyectos_reales()
+        datos_reales = obtener_datos_proyectos_reales(conn)
         if datos_reales and datos_reales.get('tiene_datos'):
             # Ajustar parámetros basados en datos reales
             if datos_reales['duracion_promedio_semanas'] > 0:
@@ -0,0 +1,222 @@
+"""
+Ejecución de cargas ETL como trabajos en segundo plano
+
+``POST /ejecutar-etl`` ya no corre la recarga dentro del request: la encola
+en ``GestorTrabajos`` (un hilo, una carga a la vez por proceso) y devuelve el
+id del trabajo. La función de carga recibe un ``Progreso`` y marca con él cada
+etapa y las filas que procesa; ``GET /etl/jobs/<id>`` devuelve ese estado
+(etapas, filas, filas/s, resultado o error).
+
+Con varios workers de Gunicorn el trabajo vive en uno solo, así que cada
+cambio de etapa se guarda además con ``persistir`` (tabla ``TrabajoETL`` del
+DW) para que cualquier worker pueda responder por él. La exclusión entre
+procesos la da el bloqueo con nombre de MySQL que toma la propia carga.
+
+Variables de entorno:
+    ETL_TRABAJOS_HISTORIAL  trabajos terminados que se conservan en memoria (20)
+"""
+
+import os
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("dashboard.trabajos_etl")
+
+TABLA_TRABAJOS = 'TrabajoETL'
+HISTORIAL = int(os.getenv('ETL_TRABAJOS_HISTORIAL', '20'))
+
+EN_COLA, EJECUTANDO, COMPLETADO, FALLIDO = 'en_cola', 'ejecutando', 'completado', 'fallido'
+ACTIVOS = (EN_COLA, EJECUTANDO)
+
+
+class Trabajo:
+    """Estado de una carga: etapas con sus filas y tiempos, resultado o error."""
+
+    def __init__(self, tipo: str):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.estado = EN_COLA
+        self.creado = datetime.now()
+        self.inicio: Optional[float] = None
+        self.fin: Optional[float] = None
+        self.etapas: List[Dict[str, Any]] = []
+        self.resultado: Any = None
+        self.error: Optional[str] = None
+
+    @property
+    def filas(self) -> int:
+        return sum(e['filas'] for e in self.etapas)
+
+    def a_dict(self) -> Dict[str, Any]:
+        ahora = time.monotonic()
+        duracion = ((self.fin or ahora) - self.inicio) if self.inicio else 0.0
+        etapas = []
+        for e in self.etapas:
+            seg = ((e['fin'] or ahora) - e['inicio'])
+            etapas.append({'nombre': e['nombre'], 'estado': e['estado'], 'filas': e['filas'],
+                           'duracion_seg': round(seg, 3),
+                           'filas_por_seg': round(e['filas'] / seg, 1) if seg > 0 else None})
+        actual = next((e['nombre'] for e in reversed(self.etapas) if e['estado'] == EJECUTANDO), None)
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'estado': self.estado,
+            'creado': self.creado.isoformat(timespec='seconds'),
+            'etapa_actual': actual,
+            'etapas': etapas,
+            'filas': self.filas,
+            'duracion_seg': round(duracion, 3),
+            'filas_por_seg': round(self.filas / duracion, 1) if duracion > 0 else None,
+            'resultado': self.resultado,
+            'error': self.error,
+        }
+
+
+class Progreso:
+    """Lo que ve la función de carga: marca etapas y cuenta filas."""
+
+    def __init__(self, trabajo: Trabajo, notificar: Callable[[Trabajo], None]):
+        self._trabajo = trabajo
+        self._notificar = notificar
+        self._etapa: Optional[Dict[str, Any]] = None
+
+    @contextmanager
+    def etapa(self, nombre: str):
+        etapa = {'nombre': nombre, 'estado': EJECUTANDO, 'filas': 0, 'inicio': time.monotonic(), 'fin': None}
+        self._trabajo.etapas.append(etapa)
+        self._etapa = etapa
+        self._notificar(self._trabajo)
+        try:
+            yield self
+            etapa['estado'] = COMPLETADO
+        except BaseException:
+            etapa['estado'] = FALLIDO
+            raise
+        finally:
+            etapa['fin'] = time.monotonic()
+            self._etapa = None
+            self._notificar(self._trabajo)
+
+    def filas(self, n: int) -> None:
+        """Suma ``n`` filas a la etapa en curso (rowcount negativo = desconocido, se ignora)."""
+        if self._etapa is not None and n and n > 0:
+            self._etapa['filas'] += n
+
+
+class GestorTrabajos:
+    """Cola de un solo hilo: a lo sumo una carga en curso por proceso."""
+
+    def __init__(self, persistir: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 historial: int = HISTORIAL):
+        self._ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='etl')
+        self._lock = threading.Lock()
+        self._trabajos: Dict[str, Trabajo] = {}
+        self._persistir = persistir
+        self._historial = historial
+
+    def activo(self) -> Optional[Trabajo]:
+        with self._lock:
+            return next((t for t in self._trabajos.values() if t.estado in ACTIVOS), None)
+
+    def enviar(self, tipo: str, funcion: Callable[[Progreso], Any]) -> Tuple[Trabajo, bool]:
+        """Encola ``funcion(progreso)``. Si ya hay una carga activa devuelve esa y False."""
+        with self._lock:
+            activo = next((t for t in self._trabajos.values() if t.estado in ACTIVOS), None)
+            if activo is not None:
+                return activo, False
+            trabajo = Trabajo(tipo)
+            self._trabajos[trabajo.id] = trabajo
+            self._podar()
+        self._notificar(trabajo)
+        self._ejecutor.submit(self._ejecutar, trabajo, funcion)
+        return trabajo, True
+
+    def obtener(self, id_trabajo: str) -> Optional[Trabajo]:
+        with self._lock:
+            return self._trabajos.get(id_trabajo)
+
+    def listar(self) -> List[Trabajo]:
+        with self._lock:
+            return sorted(self._trabajos.values(), key=lambda t: t.creado, reverse=True)
+
+    def _ejecutar(self, trabajo: Trabajo, funcion: Callable[[Progreso], Any]) -> None:
+        trabajo.estado = EJECUTANDO
+        trabajo.inicio = time.monotonic()
+        self._notificar(trabajo)
+        try:
+            trabajo.resultado = funcion(Progreso(trabajo, self._notificar))
+            trabajo.estado = COMPLETADO
+        except Exception as e:
+            logger.exception("Trabajo %s (%s) falló", trabajo.id, trabajo.tipo)
+            trabajo.error = str(e)
+            trabajo.estado = FALLIDO
+        finally:
+            trabajo.fin = time.monotonic()
+            self._notificar(trabajo)
+
+    def _notificar(self, trabajo: Trabajo) -> None:
+        if self._persistir is None:
+            return
+        try:
+            self._persistir(trabajo.a_dict())
+        except Exception as e:  # el seguimiento no debe tumbar la carga
+            logger.warning("No se pudo guardar el estado del trabajo %s: %s", trabajo.id, e)
+
+    def _podar(self) -> None:
+        terminados = [t for t in self._trabajos.values() if t.estado not in ACTIVOS]
+        terminados.sort(key=lambda t: t.creado)
+        for t in terminados[:max(0, len(terminados) - self._historial)]:
+            del self._trabajos[t.id]
+
+
+def asegurar_tabla_trabajos(cursor: Any) -> None:
+    """Crea ``TrabajoETL`` si falta (DDL: commit implícito)."""
+    cursor.execute(f"""CREATE TABLE IF NOT EXISTS {TABLA_TRABAJOS} (
+        id                  CHAR(32) PRIMARY KEY,
+        tipo                VARCHAR(32) NOT NULL,
+        estado              VARCHAR(16) NOT NULL,
+        detalle             LONGTEXT,
+        fecha_creacion      TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        INDEX idx_trabajo_estado (estado),
+        INDEX idx_trabajo_actualizacion (fecha_actualizacion)
+    ) ENGINE=InnoDB""")
+
+
+def guardar_trabajo(cursor: Any, trabajo: Dict[str, Any], detalle: str) -> None:
+    """Upsert del estado de ``trabajo`` (``detalle`` = su JSON). No hace commit."""
+    cursor.execute(
+        f"""INSERT INTO {TABLA_TRABAJOS} (id, tipo, estado, detalle) VALUES (%s,%s,%s,%s)
+        ON DUPLICATE KEY UPDATE estado=VALUES(estado), detalle=VALUES(detalle)""",
+        (trabajo['id'], trabajo['tipo'], trabajo['estado'], detalle)
+    )
+
+
+def leer_trabajo(cursor: Any, id_trabajo: str) -> Optional[str]:
+    """JSON guardado del trabajo, o None si no existe (o la tabla aún no se creó)."""
+    try:
+        cursor.execute(f"SELECT detalle FROM {TABLA_TRABAJOS} WHERE id = %s", (id_trabajo,))
+    except Exception as e:
+        if getattr(e, 'errno', None) == 1146:  # tabla inexistente
+            return None
+        raise
+    fila = cursor.fetchone()
+    return fila[0] if fila else None
+
+
+def leer_ultimo_trabajo(cursor: Any) -> Optional[str]:
+    """JSON del trabajo actualizado más recientemente (None si no hay)."""
+    try:
+        cursor.execute(f"SELECT detalle FROM {TABLA_TRABAJOS} ORDER BY fecha_actualizacion DESC LIMIT 1")
+    except Exception as e:
+        if getattr(e, 'errno', None) == 1146:
+            return None
+        raise
+    fila = cursor.fetchone()
+    return fila[0] if fila else None
@@ -64,6 +64,19 @@ function formatDate(dateString) {
     return new Date(dateString).toLocaleDateString('es-MX');
 }
 
+// Respuesta ?format=columns -> arreglo de filas ({columnas, valores} del backend)
+function filasDesdeColumnas(columnar) {
+    if (!columnar || !Array.isArray(columnar.columnas)) return columnar;
+    const total = columnar.valores.length ? columnar.valores[0].length : 0;
+    const filas = [];
+    for (let i = 0; i < total; i++) {
+        const fila = {};
+        columnar.columnas.forEach((col, j) => { fila[col] = columnar.valores[j][i]; });
+        filas.push(fila);
+    }
+    return filas;
+}
+
 // Funciones de API
 async function makeRequest(endpoint, options = {}) {
     try {
@@ -78,7 +91,7 @@ async function makeRequest(endpoint, options = {}) {
         const data = await response.json();
         
         if (!response.ok) {
-            throw new Error(data.error || `HTTP error! status: ${response.status}`);
+            throw new Error(data.error || data.message || `HTTP error! status: ${response.status}`);
         }
         
         return data;
@@ -456,6 +469,95 @@ async function insertarDatos() {
     }
 }
 
+// Consulta /etl/jobs/<id> hasta que el trabajo termina; registra cada etapa nueva
+async function esperarTrabajoETL(jobId, intervaloMs = 1500) {
+    const etapasVistas = new Set();
+    while (true) {
+        const { job } = await makeRequest(`/etl/jobs/${jobId}`);
+        for (const etapa of job.etapas) {
+            if (etapa.estado !== 'ejecutando' && !etapasVistas.has(etapa.nombre)) {
+                etapasVistas.add(etapa.nombre);
+                addLog(` - ${etapa.nombre}: ${etapa.filas} filas en ${etapa.duracion_seg}s`, etapa.estado === 'fallido' ? 'error' : 'info');
+            }
+        }
+        if (job.estado === 'completado' || job.estado === 'fallido') {
+            return job;
+        }
+        await new Promise(resolve => setTimeout(resolve, intervaloMs));
+    }
+}
+
+// Secciones que dependen de los datos del DW y la función que las recarga
+const RECARGAS_POR_SECCION = {
+    'dashboard': [cargarMetricas],
+    'olap-kpis': [aplicarFiltrosOLAP],
+    'bsc-okr': [cargarBSC_OKR],
+    'datawarehouse': [cargarTablaDatawarehouseCompleta],
+    'analisis': [cargarAnalisis]
+};
+
+let versionDatosDW = null;
+let sondeoEstado = null;
+
+function iniciarSondeoEstado() {
+    if (sondeoEstado) return;
+    sondeoEstado = setInterval(async () => {
+        if (connectionStatus) {
+            await checkStatus();
+        }
+    }, 30000);
+}
+
+// Recarga solo las secciones visibles: las ocultas se cargan al mostrarlas
+async function recargarSeccionesVisibles() {
+    for (const [seccion, funciones] of Object.entries(RECARGAS_POR_SECCION)) {
+        const elemento = document.getElementById(`section-${seccion}`);
+        if (elemento && elemento.style.display !== 'none') {
+            for (const funcion of funciones) {
+                await funcion();
+            }
+        }
+    }
+}
+
+// Suscripción a /eventos (SSE): avance del ETL y cambios de versión de datos del DW.
+// Si el servidor rechaza la conexión o no hay EventSource, se vuelve al sondeo cada 30 s.
+function iniciarEventos() {
+    const fuente = new EventSource(`${API_BASE}/eventos`);
+    const etapasAnunciadas = new Set();
+
+    fuente.addEventListener('version', async (evento) => {
+        const { version } = JSON.parse(evento.data);
+        const anterior = versionDatosDW;
+        versionDatosDW = version;
+        if (anterior === null || anterior === version) return;  // la primera es la línea base
+        addLog(` Datos del DataWarehouse actualizados (versión ${version})`, 'info');
+        precargarSnapshot();
+        await checkStatus();
+        await recargarSeccionesVisibles();
+    });
+
+    fuente.addEventListener('etl', (evento) => {
+        const trabajo = JSON.parse(evento.data);
+        const clave = `${trabajo.id}:${trabajo.etapa_actual || trabajo.estado}`;
+        if (etapasAnunciadas.has(clave)) return;
+        etapasAnunciadas.add(clave);
+        if (trabajo.etapa_actual) {
+            addLog(` ETL en curso: ${trabajo.etapa_actual} (${trabajo.filas} filas)`, 'info');
+        } else if (trabajo.estado === 'completado' || trabajo.estado === 'fallido') {
+            addLog(` Trabajo ETL ${trabajo.estado} en ${trabajo.duracion_seg}s`, trabajo.estado === 'fallido' ? 'error' : 'success');
+        }
+    });
+
+    fuente.onerror = () => {
+        // CONNECTING: el navegador reintenta solo; CLOSED: 503 u otro error definitivo
+        if (fuente.readyState === EventSource.CLOSED) {
+            addLog('Eventos en vivo no disponibles, consultando estado cada 30 s', 'warning');
+            iniciarSondeoEstado();
+        }
+    };
+}
+
 async function ejecutarETL() {
     if (!connectionStatus) {
         showToast('No hay conexión con el servidor', 'error');
@@ -473,12 +575,19 @@ async function ejecutarETL() {
         addLog(' Iniciando proceso ETL...', 'info');
         showToast('Ejecutando proceso ETL...', 'info');
         
-        const result = await makeRequest('/ejecutar-etl', {
+        const envio = await makeRequest('/ejecutar-etl', {
             method: 'POST'
         });
+        addLog(` Trabajo ETL encolado (${envio.job_id})`, 'info');
+        
+        const trabajo = await esperarTrabajoETL(envio.job_id);
+        if (trabajo.estado !== 'completado') {
+            throw new Error(trabajo.error || `Trabajo ETL ${trabajo.estado}`);
+        }
+        const result = trabajo.resultado || {};
         
         addLog(' Proceso ETL completado exitosamente', 'success');
-        addLog(` Registros procesados: ${JSON.stringify(result.registros_procesados)}`, 'info');
+        addLog(` Registros procesados: ${JSON.stringify(result.stats)} (${trabajo.filas} filas, ${trabajo.filas_por_seg || 0} filas/s)`, 'info');
         showToast(result.message, 'success');
         
         // Recargar datos
@@ -1011,6 +1120,7 @@ document.addEventListener('DOMContentLoaded', async function() {
     
     // Cargar datos iniciales según la sección activa
     if (connectionStatus) {
+        precargarSnapshot();
         await cargarMetricas();
         // Verificar si estamos en la sección Dashboard (la inicial)
         const dashboardSection = document.getElementById('dashboard');
@@ -1019,12 +1129,12 @@ document.addEventListener('DOMContentLoaded', async function() {
         }
     }
     
-    // Configurar actualizaciones automáticas cada 30 segundos
-    setInterval(async () => {
-        if (connectionStatus) {
-            await checkStatus();
-        }
-    }, 30000);
+    // Actualizaciones en vivo por SSE; sin EventSource, sondeo cada 30 segundos
+    if (window.EventSource) {
+        iniciarEventos();
+    } else {
+        iniciarSondeoEstado();
+    }
     
     addLog('Dashboard listo para usar', 'success');
 });
@@ -1036,11 +1146,31 @@ document.addEventListener('DOMContentLoaded', async function() {
 // Variable para controlar acceso PM (simulación)
 let tieneAccesoPM = false;
 
+// Paneles OLAP/BSC precargados en una sola petición (/dashboard/snapshot)
+let snapshotDashboard = null;
+
+function precargarSnapshot() {
+    const nivel = document.getElementById('nivel-agregacion')?.value || 'total';
+    snapshotDashboard = fetch(`${API_BASE}/dashboard/snapshot?nivel=${encodeURIComponent(nivel)}`)
+        .then(response => response.json())
+        .then(data => data.paneles || {})
+        .catch(() => ({}));
+}
+
+// Cuerpo de un panel: del snapshot si lo trae (y `valido` lo acepta), si no de su endpoint
+async function datosPanel(nombre, ruta, valido = () => true) {
+    if (snapshotDashboard) {
+        const panel = (await snapshotDashboard)[nombre];
+        if (panel && valido(panel)) return panel;
+    }
+    const response = await fetch(`${API_BASE}${ruta}`);
+    return response.json();
+}
+
 async function cargarDimensionesOLAP() {
     try {
         // Usar nuevo endpoint de filtros disponibles
-        const response = await fetch(`${API_BASE}/olap/filtros-disponibles`);
-        const data = await response.json();
+        const data = await datosPanel('filtros_disponibles', '/olap/filtros-disponibles');
         
         if (data.success) {
             // Poblar selectores
@@ -1151,13 +1281,15 @@ async function aplicarFiltrosOLAP() {
         if (equipoId) params.append('equipo_id', equipoId);
         if (anio) params.append('anio', anio);
         params.append('nivel', nivel);
+        params.append('format', 'columns');  // payload columnar (más compacto)
         
-        // Usar nuevo endpoint v2 con vistas optimizadas
-        const response = await fetch(`${API_BASE}/olap/kpis-v2?${params}`);
-        const data = await response.json();
+        // Usar nuevo endpoint v2 con vistas optimizadas (sin filtros sirve el del snapshot)
+        const sinFiltros = !clienteId && !equipoId && !anio;
+        const data = await datosPanel('kpis_v2', `/olap/kpis-v2?${params}`,
+            panel => sinFiltros && panel.nivel === nivel);
         
         if (data.success) {
-            mostrarResultadosOLAP(data.data, nivel);
+            mostrarResultadosOLAP(filasDesdeColumnas(data.data), nivel);
             showToast(`${data.total_resultados} resultados encontrados (${nivel})`, 'success');
         } else {
             showToast('Error aplicando filtros OLAP: ' + (data.error || data.message), 'error');
@@ -1332,8 +1464,7 @@ let chartDonutObjetivos = null;
 
 async function cargarBSC_OKR() {
     try {
-        const response = await fetch(`${API_BASE}/bsc/okr`);
-        const data = await response.json();
+        const data = await datosPanel('bsc_okr', '/bsc/okr');
         
         if (data.success) {
             mostrarVisionEstrategica();
@@ -1484,8 +1615,7 @@ function renderizarGraficosResumen(perspectivas) {
 
 async function mostrarVisionEstrategica() {
     try {
-        const response = await fetch(`${API_BASE}/bsc/vision-estrategica`);
-        const data = await response.json();
+        const data = await datosPanel('vision_estrategica', '/bsc/vision-estrategica');
         
         if (data.success) {
             const container = document.getElementById('vision-componentes');
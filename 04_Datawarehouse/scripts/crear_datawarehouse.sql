@@ -29,6 +29,7 @@ CREATE TABLE DimCliente (
   direccion         VARCHAR(200),
   fecha_registro    DATE,
   activo            TINYINT(1) DEFAULT 1,
+  hash_fila         BINARY(16) NULL,  -- digest de columnas de negocio (ETL incremental)
   fecha_carga       TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   
@@ -44,6 +45,7 @@ CREATE TABLE DimEmpleado (
   salario_base      DECIMAL(10,2),
   fecha_ingreso     DATE,
   activo            TINYINT(1) DEFAULT 1,
+  hash_fila         BINARY(16) NULL,  -- digest de columnas de negocio (ETL incremental)
   fecha_carga       TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   
@@ -58,6 +60,7 @@ CREATE TABLE DimEquipo (
   descripcion       VARCHAR(200),
   fecha_creacion    DATE,
   activo            TINYINT(1) DEFAULT 1,
+  hash_fila         BINARY(16) NULL,  -- digest de columnas de negocio (ETL incremental)
   fecha_carga       TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   
@@ -72,11 +75,14 @@ CREATE TABLE DimProyecto (
   fecha_fin_plan    DATE,
   presupuesto_plan  DECIMAL(12,2) DEFAULT 0,
   prioridad         VARCHAR(20),
+  id_estado         INT NULL,         -- estado en origen (Proyecto.id_estado) al cargar
+  hash_fila         BINARY(16) NULL,  -- digest de columnas de negocio (ETL incremental)
   fecha_carga       TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   
   INDEX idx_dim_proyecto_fechas (fecha_inicio, fecha_fin_plan),
-  INDEX idx_dim_proyecto_prioridad (prioridad)
+  INDEX idx_dim_proyecto_prioridad (prioridad),
+  INDEX idx_dim_proyecto_estado (id_estado)
 ) ENGINE=InnoDB;
 
 CREATE TABLE DimTiempo (
@@ -110,6 +116,7 @@ CREATE TABLE HechoProyecto (
   id_proyecto            INT NOT NULL,
   id_cliente             INT,
   id_empleado_gerente    INT,
+  id_equipo              INT,
   id_tiempo_inicio       INT,
   id_tiempo_fin_plan     INT,
   id_tiempo_fin_real     INT,
@@ -151,13 +158,15 @@ CREATE TABLE HechoProyecto (
   satisfaccion_cliente   DECIMAL(3,1) DEFAULT 0, -- 1-10
   
   -- Metadatos
+  hash_fila              BINARY(16) NULL,  -- digest de columnas de negocio (ETL incremental)
   fecha_carga            TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   fecha_actualizacion    TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   
   -- Índices para optimización de consultas
-  INDEX idx_hp_proyecto (id_proyecto),
+  UNIQUE KEY uq_hechoproyecto_id_proyecto (id_proyecto),
   INDEX idx_hp_cliente (id_cliente),
   INDEX idx_hp_gerente (id_empleado_gerente),
+  INDEX idx_id_equipo (id_equipo),
   INDEX idx_hp_tiempo_inicio (id_tiempo_inicio),
   INDEX idx_hp_tiempo_fin (id_tiempo_fin_real),
   INDEX idx_hp_cumplimiento (cumplimiento_tiempo, cumplimiento_presupuesto),
@@ -210,11 +219,12 @@ CREATE TABLE HechoTarea (
   complejidad_real        INT DEFAULT 1, -- 1-5
   
   -- Metadatos
+  hash_fila               BINARY(16) NULL,  -- digest de columnas de negocio (ETL incremental)
   fecha_carga             TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   fecha_actualizacion     TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   
   -- Índices para optimización
-  INDEX idx_ht_tarea (id_tarea),
+  UNIQUE KEY uq_hechotarea_id_tarea (id_tarea),
   INDEX idx_ht_proyecto (id_proyecto),
   INDEX idx_ht_empleado (id_empleado),
   INDEX idx_ht_equipo (id_equipo),
@@ -224,6 +234,56 @@ CREATE TABLE HechoTarea (
   INDEX idx_ht_eficiencia (eficiencia_horas)
 ) ENGINE=InnoDB;
 
+-- =========================================================
+-- CONTROL DE CARGA INCREMENTAL
+-- =========================================================
+
+-- Marca de agua por tabla origen (ver src/etl/marca_agua.py)
+CREATE TABLE MarcaAguaETL (
+  tabla_origen        VARCHAR(64) PRIMARY KEY,
+  columna_marca       VARCHAR(64),
+  marca               DATETIME NOT NULL,
+  filas_ultima_carga  INT DEFAULT 0,
+  fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+-- Último id_cambio de RegistroCambios (origen) aplicado por cada consumidor
+CREATE TABLE ConsumoCambiosETL (
+  consumidor          VARCHAR(64) PRIMARY KEY,
+  ultimo_id_cambio    BIGINT NOT NULL DEFAULT 0,
+  fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+-- Versión de los datos: cada carga la incrementa al confirmar (ver src/etl/version_datos.py)
+CREATE TABLE VersionDatosDW (
+  id                  TINYINT PRIMARY KEY,
+  version             BIGINT NOT NULL DEFAULT 0,
+  fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+-- Punto de control por etapa de la corrida en curso (ver src/etl/puntos_control.py);
+-- se vacía al terminar la corrida
+CREATE TABLE PuntoControlETL (
+  etapa               VARCHAR(64) PRIMARY KEY,
+  limite              DATETIME NULL,
+  ultima_clave        BIGINT NOT NULL DEFAULT 0,
+  filas               INT NOT NULL DEFAULT 0,
+  completada          TINYINT(1) NOT NULL DEFAULT 0,
+  fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+-- Estado de las cargas lanzadas desde el dashboard (ver 03_Dashboard/backend/trabajos_etl.py)
+CREATE TABLE TrabajoETL (
+  id                  CHAR(32) PRIMARY KEY,
+  tipo                VARCHAR(32) NOT NULL,
+  estado              VARCHAR(16) NOT NULL,
+  detalle             LONGTEXT,
+  fecha_creacion      TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  INDEX idx_trabajo_estado (estado),
+  INDEX idx_trabajo_actualizacion (fecha_actualizacion)
+) ENGINE=InnoDB;
+
 -- =========================================================
 -- FOREIGN KEYS OPCIONALES (Para integridad referencial)
 -- =========================================================
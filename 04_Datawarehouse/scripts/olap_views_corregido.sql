@@ -233,6 +233,8 @@ FROM vw_olap_base;
 CREATE OR REPLACE VIEW vw_olap_detallado AS
 SELECT 
     id_proyecto,
+    id_cliente,
+    id_equipo,
     cliente_nombre,
     equipo_nombre,
     anio,
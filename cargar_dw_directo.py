@@ -7,6 +7,9 @@ Evita problemas con procedimientos almacenados y conexiones entre BD
 import mysql.connector
 from datetime import datetime, timedelta
 
+from src.etl.carga_masiva import cargar_filas
+from src.etl.dim_tiempo import ResolutorTiempo
+
 def log(msg):
     print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
 
@@ -15,7 +18,8 @@ def conectar(db):
         host='localhost',
         user='root',
         password='',
-        database=db
+        database=db,
+        allow_local_infile=True
     )
 
 # 1. LIMPIAR DW
@@ -33,18 +37,9 @@ log(" Limpieza completada")
 
 # 2. GENERAR DIMENSIÓN TIEMPO
 log("Generando dimensión tiempo...")
-fecha = datetime.now() - timedelta(days=365*2)
-fecha_max = datetime.now() + timedelta(days=365)
-count = 0
-
-while fecha <= fecha_max:
-    cursor_dw.execute("""
-        INSERT IGNORE INTO DimTiempo (id_tiempo, fecha, anio, trimestre, mes)
-        VALUES (%s, %s, %s, %s, %s)
-    """, (fecha, fecha, fecha.year, (fecha.month-1)//3+1, fecha.month))
-    fecha += timedelta(days=1)
-    count += 1
-
+tiempo = ResolutorTiempo(conn_dw)
+tiempo.cargar()
+count = tiempo.asegurar_rango(datetime.now() - timedelta(days=365*2), datetime.now() + timedelta(days=365))
 conn_dw.commit()
 log(f" {count} días generados")
 
@@ -114,14 +109,17 @@ cursor_origen.execute("""
     FROM Proyecto p
 """)
 
-for row in cursor_origen.fetchall():
-    cursor_dw.execute("""
-        INSERT INTO HechoProyecto (
-            id_proyecto, id_tiempo_inicio, id_tiempo_fin_plan, id_tiempo_fin_real,
-            presupuesto_planificado, presupuesto_real, horas_estimadas, horas_reales,
-            total_tareas, tareas_completadas, dias_retraso
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """, tuple(row.values()))
+filas = cursor_origen.fetchall()
+claves_tiempo = ('id_tiempo_inicio', 'id_tiempo_fin_plan', 'id_tiempo_fin_real')
+tiempo.asegurar(row[k] for row in filas for k in claves_tiempo)
+for row in filas:
+    for k in claves_tiempo:
+        row[k] = tiempo.id_tiempo(row[k])
+cargar_filas(cursor_dw, 'HechoProyecto', (
+    'id_proyecto', 'id_tiempo_inicio', 'id_tiempo_fin_plan', 'id_tiempo_fin_real',
+    'presupuesto_planificado', 'presupuesto_real', 'horas_estimadas', 'horas_reales',
+    'total_tareas', 'tareas_completadas', 'dias_retraso'
+), [tuple(row.values()) for row in filas])
 
 conn_dw.commit()
 log(f" {cursor_origen.rowcount} hechos proyecto cargados")
@@ -144,14 +142,17 @@ cursor_origen.execute("""
     FROM Tarea t
 """)
 
-for row in cursor_origen.fetchall():
-    cursor_dw.execute("""
-        INSERT INTO HechoTarea (
-            id_tarea, id_proyecto, id_equipo, id_tiempo_inicio_plan, id_tiempo_fin_plan,
-            id_tiempo_inicio_real, id_tiempo_fin_real, horas_estimadas, horas_reales,
-            prioridad, estado, dias_retraso
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """, tuple(row.values()))
+filas = cursor_origen.fetchall()
+claves_tiempo = ('id_tiempo_inicio_plan', 'id_tiempo_fin_plan', 'id_tiempo_inicio_real', 'id_tiempo_fin_real')
+tiempo.asegurar(row[k] for row in filas for k in claves_tiempo)
+for row in filas:
+    for k in claves_tiempo:
+        row[k] = tiempo.id_tiempo(row[k])
+cargar_filas(cursor_dw, 'HechoTarea', (
+    'id_tarea', 'id_proyecto', 'id_equipo', 'id_tiempo_inicio_plan', 'id_tiempo_fin_plan',
+    'id_tiempo_inicio_real', 'id_tiempo_fin_real', 'horas_estimadas', 'horas_reales',
+    'prioridad', 'estado', 'dias_retraso'
+), [tuple(row.values()) for row in filas])
 
 conn_dw.commit()
 log(f" {cursor_origen.rowcount} hechos tarea cargados")
@@ -161,6 +162,7 @@ log("Generando mediciones OKR...")
 
 # Fecha actual
 hoy = datetime.now().date()
+tiempo.asegurar([hoy])
 
 # Calcular valores basados en datos reales del DW
 cursor_dw.execute("""
@@ -204,7 +206,7 @@ for id_kr, valor in valores_okr.items():
             id_kr, id_tiempo, valor_observado, progreso_hacia_meta, 
             estado_semaforo, cumple_meta, fecha_medicion, fuente_medicion
         ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-    """, (id_kr, hoy, valor, result[1], result[0], result[2], hoy, 'ETL Automático'))
+    """, (id_kr, tiempo.id_tiempo(hoy), valor, result[1], result[0], result[2], hoy, 'ETL Automático'))
 
 conn_dw.commit()
 log(f" {len(valores_okr)} mediciones OKR generadas")
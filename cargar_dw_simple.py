@@ -3,11 +3,15 @@
 import mysql.connector
 from datetime import datetime, timedelta
 
+from src.etl.carga_masiva import cargar_filas
+from src.etl.dim_tiempo import ResolutorTiempo
+
 def log(msg):
     print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
 
 def conectar(db):
-    return mysql.connector.connect(host='localhost', user='root', password='', database=db)
+    return mysql.connector.connect(host='localhost', user='root', password='', database=db,
+                                   allow_local_infile=True)
 
 # Conexiones
 conn_origen = conectar('gestionproyectos_hist')
@@ -29,24 +33,11 @@ log(" Limpieza completada")
 log("Generando dimensión tiempo...")
 fecha_inicio = datetime.now() - timedelta(days=730)
 fecha_fin = datetime.now() + timedelta(days=365)
-fecha_actual = fecha_inicio
-fechas = []
-while fecha_actual <= fecha_fin:
-    fechas.append((
-        fecha_actual,
-        fecha_actual,
-        fecha_actual.year,
-        (fecha_actual.month - 1) // 3 + 1,
-        fecha_actual.month
-    ))
-    fecha_actual += timedelta(days=1)
-
-cursor_dw.executemany("""
-    INSERT INTO DimTiempo (id_tiempo, fecha, anio, trimestre, mes)
-    VALUES (%s, %s, %s, %s, %s)
-""", fechas)
+tiempo = ResolutorTiempo(conn_dw)
+tiempo.cargar()
+dias = tiempo.asegurar_rango(fecha_inicio, fecha_fin)
 conn_dw.commit()
-log(f" {len(fechas)} días generados")
+log(f" {dias} días generados")
 
 # 3. CARGAR DIMENSIONES
 log("Cargando DimCliente...")
@@ -113,20 +104,22 @@ cursor_origen.execute("""
     WHERE p.fecha_inicio IS NOT NULL
 """)
 proyectos_hecho = cursor_origen.fetchall()
+tiempo.asegurar(p[k] for p in proyectos_hecho for k in ('fecha_inicio', 'fecha_fin_plan', 'fecha_fin_real'))
+filas_hp = []
 for p in proyectos_hecho:
     fecha_fin = p['fecha_fin_real'] if p['fecha_fin_real'] else p['fecha_fin_plan']
-    cursor_dw.execute("""
-        INSERT INTO HechoProyecto (
-            id_proyecto, id_cliente, id_empleado, id_equipo,
-            id_tiempo_inicio, id_tiempo_fin, 
-            presupuesto, costo_real, costo_hora_promedio,
-            horas_planificadas, horas_reales, desviacion_cronograma
-        ) VALUES (%s, %s, %s, NULL, %s, %s, %s, %s, 0, 0, 0, 0)
-    """, (p['id_proyecto'], p['id_cliente'], p['id_empleado_gerente'],
-          p['fecha_inicio'], fecha_fin,
-          p['presupuesto'] or 0, p['costo_real'] or 0))
+    filas_hp.append((p['id_proyecto'], p['id_cliente'], p['id_empleado_gerente'], None,
+                     tiempo.id_tiempo(p['fecha_inicio']), tiempo.id_tiempo(fecha_fin),
+                     p['presupuesto'] or 0, p['costo_real'] or 0, 0, 0, 0, 0))
+# Tabla recién vaciada: INSERT simple (LOAD DATA por encima de ETL_UMBRAL_MASIVO filas)
+carga = cargar_filas(conn_dw.cursor(), 'HechoProyecto', (
+    'id_proyecto', 'id_cliente', 'id_empleado', 'id_equipo',
+    'id_tiempo_inicio', 'id_tiempo_fin',
+    'presupuesto', 'costo_real', 'costo_hora_promedio',
+    'horas_planificadas', 'horas_reales', 'desviacion_cronograma'
+), filas_hp)
 conn_dw.commit()
-log(f" {len(proyectos_hecho)} proyectos en HechoProyecto")
+log(f" {len(proyectos_hecho)} proyectos en HechoProyecto ({carga['metodo']})")
 
 log("Cargando HechoTarea...")
 cursor_origen.execute("""
@@ -142,19 +135,20 @@ cursor_origen.execute("""
     WHERE t.fecha_inicio IS NOT NULL
 """)
 tareas_hecho = cursor_origen.fetchall()
+tiempo.asegurar([t['fecha_inicio'] for t in tareas_hecho] + [t['fecha_fin'] for t in tareas_hecho] + [datetime.now().date()])
+filas_ht = []
 for t in tareas_hecho:
     fecha_fin = t['fecha_fin'] if t['fecha_fin'] else datetime.now().date()
-    cursor_dw.execute("""
-        INSERT INTO HechoTarea (
-            id_tarea, id_proyecto, id_empleado, id_equipo,
-            id_tiempo_inicio, id_tiempo_fin,
-            horas_estimadas, horas_reales, costo_tarea, prioridad_tarea
-        ) VALUES (%s, %s, %s, NULL, %s, %s, %s, %s, 0, 'Media')
-    """, (t['id_tarea'], t['id_proyecto'], t['id_empleado'],
-          t['fecha_inicio'], fecha_fin,
-          t['horas_estimadas'] or 0, t['horas_trabajadas'] or 0))
+    filas_ht.append((t['id_tarea'], t['id_proyecto'], t['id_empleado'], None,
+                     tiempo.id_tiempo(t['fecha_inicio']), tiempo.id_tiempo(fecha_fin),
+                     t['horas_estimadas'] or 0, t['horas_trabajadas'] or 0, 0, 'Media'))
+carga = cargar_filas(conn_dw.cursor(), 'HechoTarea', (
+    'id_tarea', 'id_proyecto', 'id_empleado', 'id_equipo',
+    'id_tiempo_inicio', 'id_tiempo_fin',
+    'horas_estimadas', 'horas_reales', 'costo_tarea', 'prioridad_tarea'
+), filas_ht)
 conn_dw.commit()
-log(f" {len(tareas_hecho)} tareas en HechoTarea")
+log(f" {len(tareas_hecho)} tareas en HechoTarea ({carga['metodo']})")
 
 # 5. GENERAR OKRs BASADOS EN DATOS REALES
 log("Generando OKRs con datos reales...")
@@ -265,6 +259,7 @@ okrs = [
     }
 ]
 
+tiempo.asegurar([hoy])
 for okr in okrs:
     cursor_dw.execute("""
         INSERT INTO HechoOKR (
@@ -272,7 +267,7 @@ for okr in okrs:
             valor_inicial, valor_meta, valor_observado,
             progreso_hacia_meta, estado_semaforo
         ) VALUES (%s, %s, %s, %s, %s, %s, %s, 0, 'Amarillo')
-    """, (hoy, okr['objetivo'], okr['kr'], okr['tipo'],
+    """, (tiempo.id_tiempo(hoy), okr['objetivo'], okr['kr'], okr['tipo'],
           okr['inicial'], okr['meta'], okr['actual']))
 
 conn_dw.commit()
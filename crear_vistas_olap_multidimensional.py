@@ -21,12 +21,21 @@ cursor = conn.cursor()
 
 print("🔧 Creando vistas OLAP para análisis multidimensional...")
 
+# DW creados antes de id_equipo: la vista detallada lo expone
+cursor.execute("SHOW COLUMNS FROM HechoProyecto LIKE 'id_equipo'")
+if not cursor.fetchone():
+    print(" - Agregando columna id_equipo...")
+    cursor.execute("ALTER TABLE HechoProyecto ADD COLUMN id_equipo INT AFTER id_empleado_gerente")
+    cursor.execute("ALTER TABLE HechoProyecto ADD KEY idx_id_equipo (id_equipo)")
+
 # Vista 1: OLAP Detallado (nivel más granular)
 print("1. Creando vw_olap_detallado...")
 cursor.execute("""
 CREATE OR REPLACE VIEW vw_olap_detallado AS
 SELECT 
     hp.id_proyecto as proyecto,
+    hp.id_cliente,
+    hp.id_equipo,
     dp.nombre_proyecto,
     COALESCE(dc.nombre, 'Sin Cliente') as cliente,
     COALESCE(dc.sector, '-') as sector,
@@ -53,6 +53,8 @@ def deploy_views_to_railway():
         CREATE VIEW vw_olap_detallado AS
         SELECT 
             hp.id_proyecto,
+            hp.id_cliente,
+            hp.id_equipo,
             dp.nombre_proyecto as proyecto,
             COALESCE(dc.nombre, 'Sin Cliente') as cliente,
             dc.sector,
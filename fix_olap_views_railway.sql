@@ -12,6 +12,8 @@ DROP VIEW IF EXISTS vw_olap_total;
 CREATE VIEW vw_olap_detallado AS
 SELECT 
     hp.id_proyecto,
+    hp.id_cliente,
+    hp.id_equipo,
     dp.nombre_proyecto as proyecto,
     COALESCE(dc.nombre, 'Sin Cliente') as cliente,
     dc.sector,
@@ -10,6 +10,9 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime
 
+from src.etl.carga_masiva import cargar_filas
+from src.etl.dim_tiempo import ResolutorTiempo
+
 load_dotenv('/Users/andrescruzortiz/Documents/GitHub/ProyectoETL/03_Dashboard/backend/.env')
 
 print("🚀 Poblando datos de horas en DW...\n")
@@ -28,7 +31,8 @@ conn_dw = mysql.connector.connect(
     port=int(os.getenv('DB_PORT_DESTINO', '3306')),
     user=os.getenv('DB_USER_DESTINO'),
     password=os.getenv('DB_PASSWORD_DESTINO'),
-    database=os.getenv('DB_NAME_DESTINO')
+    database=os.getenv('DB_NAME_DESTINO'),
+    allow_local_infile=True
 )
 
 cursor_origen = conn_origen.cursor(dictionary=True)
@@ -64,32 +68,34 @@ if total_tareas == 0:
     tareas = cursor_origen.fetchall()
     print(f"   ✓ Obtenidas {len(tareas)} tareas con horas")
     
-    # Insertar en HechoTarea
-    insert_query = """
-        INSERT INTO HechoTarea (
-            id_tarea, id_proyecto, id_empleado, 
-            nombre_tarea, descripcion_tarea,
-            horas_plan, horas_reales,
-            id_estado, prioridad, fecha_carga
-        ) VALUES (
-            %(id_tarea)s, %(id_proyecto)s, %(id_empleado)s,
-            %(nombre_tarea)s, %(descripcion)s,
-            %(horas_plan)s, %(horas_reales)s,
-            %(id_estado)s, %(prioridad)s, NOW()
-        )
-        ON DUPLICATE KEY UPDATE
-            horas_reales = VALUES(horas_reales),
-            horas_plan = VALUES(horas_plan)
-    """
+    # Claves de DimTiempo resueltas en memoria (una carga + altas en bloque)
+    columnas_fecha = ('inicio_plan', 'fin_plan', 'inicio_real', 'fin_real')
+    tiempo = ResolutorTiempo(conn_dw)
+    tiempo.cargar()
+    tiempo.asegurar(t[f'fecha_{c}'] for t in tareas for c in columnas_fecha)
+    conn_dw.commit()
+    for t in tareas:
+        for c in columnas_fecha:
+            t[f'id_tiempo_{c}'] = tiempo.id_tiempo(t[f'fecha_{c}'])
     
-    batch_size = 500
-    for i in range(0, len(tareas), batch_size):
-        batch = tareas[i:i+batch_size]
-        cursor_dw.executemany(insert_query, batch)
-        conn_dw.commit()
-        print(f"   ✓ Insertadas {min(i+batch_size, len(tareas))}/{len(tareas)} tareas")
+    # Insertar en HechoTarea (LOAD DATA LOCAL INFILE por encima de ETL_UMBRAL_MASIVO filas;
+    # fecha_carga toma su DEFAULT CURRENT_TIMESTAMP)
+    columnas = (
+        'id_tarea', 'id_proyecto', 'id_empleado',
+        'nombre_tarea', 'descripcion_tarea',
+        'horas_plan', 'horas_reales',
+        'id_tiempo_inicio_plan', 'id_tiempo_fin_plan',
+        'id_tiempo_inicio_real', 'id_tiempo_fin_real',
+        'id_estado', 'prioridad'
+    )
+    campos = ('id_tarea', 'id_proyecto', 'id_empleado', 'nombre_tarea', 'descripcion', 'horas_plan', 'horas_reales',
+              'id_tiempo_inicio_plan', 'id_tiempo_fin_plan', 'id_tiempo_inicio_real', 'id_tiempo_fin_real',
+              'id_estado', 'prioridad')
+    carga = cargar_filas(conn_dw.cursor(), 'HechoTarea', columnas,
+                         [tuple(t[c] for c in campos) for t in tareas], clave='id_tarea')
+    conn_dw.commit()
     
-    print(f"   ✅ HechoTarea cargado: {len(tareas)} registros\n")
+    print(f"   ✅ HechoTarea cargado: {len(tareas)} registros ({carga['metodo']})\n")
 else:
     print(f"✓ HechoTarea ya tiene {total_tareas} registros\n")
 
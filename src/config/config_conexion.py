@@ -2,9 +2,36 @@
 """
 Configuración de conexiones para el sistema ETL
 Soporta tanto configuración local como distribuida
+
+Además de los diccionarios de configuración expone pools de conexiones con
+nombre (``get_pool`` / ``get_pooled_connection``), creados de forma perezosa en
+el primer uso y compartidos por la API y el ETL, para no pagar el handshake
+TCP + autenticación en cada request. Variables de entorno:
+
+    DB_POOL_TAMANO          conexiones por pool (GUNICORN_THREADS si está definido,
+                            hasta 32; si no, 5). Cada hilo de un worker toma a lo
+                            sumo una conexión por pool, así que debe cumplirse
+                            DB_POOL_TAMANO >= GUNICORN_THREADS; si no, se avisa al
+                            arrancar. Las consultas concurrentes del dashboard
+                            usan un pool propio (ver 03_Dashboard/backend/paralelo.py).
+    ETL_UNIX_SOCKET         socket local de MySQL en lugar de host/puerto
+    DB_POOL_RESET_SESSION   reiniciar la sesión al devolver la conexión (1)
+    DB_POOL_ESPERA_SEG      espera máxima cuando el pool está agotado (10)
+    DB_POOL_PING            ping con reconexión en varios intentos al entregar (0;
+                            mysql.connector ya reconecta una vez si la encuentra caída)
+    DB_POOL_PING_INTENTOS   intentos de reconexión de ese ping (3)
+
+Los engines SQLAlchemy (``get_engine``) se registran igual, uno por proceso y
+tipo de BD, y se descartan en el proceso hijo tras un fork:
+
+    DB_ENGINE_POOL_SIZE     conexiones persistentes por engine (5)
+    DB_ENGINE_MAX_OVERFLOW  conexiones extra temporales (10)
+    DB_ENGINE_POOL_RECYCLE  segundos antes de reciclar una conexión (1800)
 """
 
 import os
+import time
+import threading
 from typing import Dict, Any
 
 # =========================================================
@@ -101,6 +128,8 @@ def get_config(ambiente: str = 'local') -> Dict[str, Any]:
         'password_destino': os.getenv('ETL_PASSWORD_DESTINO', config['password_destino']),
         'database_destino': os.getenv('ETL_DB_DESTINO', config['database_destino'])
     })
+    if os.getenv('ETL_UNIX_SOCKET'):
+        config['unix_socket'] = os.getenv('ETL_UNIX_SOCKET')
     
     return config
 
@@ -124,6 +153,242 @@ def get_connection_string(tipo: str = 'origen', ambiente: str = 'local') -> str:
     else:
         raise ValueError("tipo debe ser 'origen' o 'destino'")
 
+# =========================================================
+# POOLS DE CONEXIONES
+# =========================================================
+HILOS_WORKER = int(os.getenv('GUNICORN_THREADS', '0'))
+POOL_TAMANO = int(os.getenv('DB_POOL_TAMANO', str(min(HILOS_WORKER, 32) if HILOS_WORKER else 5)))
+if HILOS_WORKER > POOL_TAMANO:
+    print(f"⚠️ DB_POOL_TAMANO={POOL_TAMANO} es menor que GUNICORN_THREADS={HILOS_WORKER}: "
+          f"los requests esperarán conexión hasta DB_POOL_ESPERA_SEG")
+POOL_RESET_SESSION = os.getenv('DB_POOL_RESET_SESSION', '1') in {'1', 'true', 'True'}
+POOL_ESPERA_SEG = float(os.getenv('DB_POOL_ESPERA_SEG', '10'))
+POOL_PING = os.getenv('DB_POOL_PING', '0') in {'1', 'true', 'True'}
+POOL_PING_INTENTOS = int(os.getenv('DB_POOL_PING_INTENTOS', '3'))
+
+
+class PoolConexiones:
+    """Pool con nombre sobre ``mysql.connector.pooling`` con estadísticas de uso.
+
+    El pool real se crea en el primer ``get_connection()`` (y se recrea si el
+    proceso cambió, p.ej. tras el fork de un worker de gunicorn). Cuando está
+    agotado espera hasta ``espera_seg`` en lugar de fallar de inmediato.
+    ``close()`` sobre la conexión entregada la devuelve al pool.
+    """
+
+    def __init__(self, nombre: str, parametros: Dict[str, Any], tamano: int = POOL_TAMANO,
+                 reiniciar_sesion: bool = POOL_RESET_SESSION, espera_seg: float = POOL_ESPERA_SEG,
+                 ping: bool = POOL_PING):
+        self.nombre = nombre
+        self.parametros = dict(parametros)
+        self.tamano = max(1, min(int(tamano), 32))  # límite de mysql.connector
+        self.reiniciar_sesion = reiniciar_sesion
+        self.espera_seg = espera_seg
+        self.ping = ping
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stats = {'checkouts': 0, 'espera_total_seg': 0.0, 'espera_max_seg': 0.0,
+                       'agotamientos': 0, 'fallos_salud': 0}
+
+    def _obtener_pool(self):
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                from mysql.connector import pooling
+                self._pool = pooling.MySQLConnectionPool(
+                    pool_name=f"{self.nombre}_{os.getpid()}", pool_size=self.tamano,
+                    pool_reset_session=self.reiniciar_sesion, **self.parametros
+                )
+                self._pid = os.getpid()
+            return self._pool
+
+    def get_connection(self):
+        """Toma una conexión del pool (esperando si está agotado)."""
+        from mysql.connector import errors
+        pool = self._obtener_pool()
+        inicio = time.perf_counter()
+        agotado = False
+        while True:
+            try:
+                conexion = pool.get_connection()
+                break
+            except errors.PoolError:
+                if not agotado:
+                    agotado = True
+                    with self._lock:
+                        self._stats['agotamientos'] += 1
+                if time.perf_counter() - inicio >= self.espera_seg:
+                    raise
+                time.sleep(0.02)
+        espera = time.perf_counter() - inicio
+        if self.ping:
+            try:
+                conexion.ping(reconnect=True, attempts=POOL_PING_INTENTOS, delay=1)
+            except Exception:
+                with self._lock:
+                    self._stats['fallos_salud'] += 1
+                conexion.close()
+                raise
+        if not self.reiniciar_sesion and conexion.in_transaction:
+            conexion.rollback()  # sin reset, no heredar el snapshot/transacción del uso anterior
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['espera_total_seg'] += espera
+            self._stats['espera_max_seg'] = max(self._stats['espera_max_seg'], espera)
+        return conexion
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['tamano'] = self.tamano
+        stats['espera_media_seg'] = stats['espera_total_seg'] / stats['checkouts'] if stats['checkouts'] else 0.0
+        return stats
+
+
+_POOLS: Dict[str, PoolConexiones] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_connection_params(tipo: str = 'origen', ambiente: str = 'local') -> Dict[str, Any]:
+    """
+    Parámetros de ``mysql.connector.connect`` para origen o destino
+
+    Args:
+        tipo: 'origen' o 'destino'
+        ambiente: 'local', 'distribuido', o 'test'
+
+    Returns:
+        Dict con user, password, database y host/port (o unix_socket si está configurado)
+    """
+    if tipo not in ('origen', 'destino'):
+        raise ValueError("tipo debe ser 'origen' o 'destino'")
+    config = get_config(ambiente)
+    parametros = {
+        'user': config[f'user_{tipo}'],
+        'password': config[f'password_{tipo}'],
+        'database': config[f'database_{tipo}']
+    }
+    # Igual que el dashboard y el ETL incremental: el socket reemplaza a host/port
+    if config.get('unix_socket'):
+        parametros['unix_socket'] = config['unix_socket']
+    else:
+        parametros['host'] = config[f'host_{tipo}']
+        parametros['port'] = config[f'port_{tipo}']
+    return parametros
+
+
+def configure_pool(nombre: str, parametros: Dict[str, Any], **opciones) -> PoolConexiones:
+    """
+    Registra (o devuelve, si ya existe) el pool ``nombre`` con ``parametros`` de conexión
+
+    Args:
+        nombre: Nombre del pool (p.ej. 'origen', 'destino', 'etl_destino')
+        parametros: Argumentos de ``mysql.connector.connect``
+        **opciones: tamano, reiniciar_sesion, espera_seg, ping
+
+    Returns:
+        PoolConexiones (la conexión real se abre en el primer uso)
+    """
+    with _POOLS_LOCK:
+        if nombre not in _POOLS:
+            _POOLS[nombre] = PoolConexiones(nombre, parametros, **opciones)
+        return _POOLS[nombre]
+
+
+def get_pool(nombre: str = 'origen', ambiente: str = 'local') -> PoolConexiones:
+    """
+    Pool con nombre; 'origen' y 'destino' se configuran solos desde ``get_config``
+
+    Args:
+        nombre: Nombre del pool registrado con ``configure_pool``, u 'origen'/'destino'
+        ambiente: Ambiente usado si hay que crear 'origen'/'destino'
+
+    Returns:
+        PoolConexiones
+    """
+    pool = _POOLS.get(nombre)
+    if pool is None:
+        if nombre not in ('origen', 'destino'):
+            raise KeyError(f"Pool '{nombre}' no configurado")
+        pool = configure_pool(nombre, get_connection_params(nombre, ambiente))
+    return pool
+
+
+def get_pooled_connection(nombre: str = 'origen', ambiente: str = 'local'):
+    """Conexión del pool ``nombre``; ``close()`` la devuelve al pool."""
+    return get_pool(nombre, ambiente).get_connection()
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Estadísticas de uso (checkouts, espera, agotamientos) de cada pool."""
+    return {nombre: pool.estadisticas() for nombre, pool in list(_POOLS.items())}
+
+
+# =========================================================
+# ENGINES SQLALCHEMY
+# =========================================================
+ENGINE_POOL_SIZE = int(os.getenv('DB_ENGINE_POOL_SIZE', '5'))
+ENGINE_MAX_OVERFLOW = int(os.getenv('DB_ENGINE_MAX_OVERFLOW', '10'))
+ENGINE_POOL_RECYCLE = int(os.getenv('DB_ENGINE_POOL_RECYCLE', '1800'))
+
+_ENGINES: Dict[str, Any] = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_engine(tipo: str = 'origen', url: str = None, ambiente: str = 'local', **opciones):
+    """
+    Engine SQLAlchemy compartido en el proceso para ``tipo`` (se crea en la primera llamada)
+
+    Args:
+        tipo: Clave del registro ('origen', 'destino', ...)
+        url: URL de conexión; por defecto ``get_connection_string(tipo, ambiente)``
+        ambiente: Ambiente usado para construir la URL por defecto
+        **opciones: Argumentos extra de ``create_engine`` (solo al crearlo)
+
+    Returns:
+        Engine (pool_size/max_overflow/pool_recycle según DB_ENGINE_*)
+    """
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(tipo)
+        if engine is None:
+            from sqlalchemy import create_engine
+            parametros = {'pool_size': ENGINE_POOL_SIZE, 'max_overflow': ENGINE_MAX_OVERFLOW,
+                          'pool_recycle': ENGINE_POOL_RECYCLE, 'pool_pre_ping': True}
+            parametros.update(opciones)
+            engine = create_engine(url or get_connection_string(tipo, ambiente), **parametros)
+            _ENGINES[tipo] = engine
+        return engine
+
+
+def get_engine_stats() -> Dict[str, Dict[str, Any]]:
+    """Estado del pool de cada engine registrado."""
+    stats = {}
+    for tipo, engine in list(_ENGINES.items()):
+        pool = engine.pool
+        stats[tipo] = {'estado': pool.status()}
+        for nombre in ('size', 'checkedin', 'checkedout', 'overflow'):
+            if hasattr(pool, nombre):
+                stats[tipo][nombre] = getattr(pool, nombre)()
+    return stats
+
+
+def dispose_engines(cerrar: bool = True) -> None:
+    """
+    Descarta los pools de todos los engines registrados
+
+    Args:
+        cerrar: Cerrar las conexiones. En el hijo de un fork debe ser False: los
+            sockets son compartidos con el padre y cerrarlos le rompería las suyas.
+    """
+    for engine in list(_ENGINES.values()):
+        engine.dispose(close=cerrar)
+
+
+if hasattr(os, 'register_at_fork'):
+    # Workers de gunicorn: cada hijo abre conexiones propias en su primer uso
+    os.register_at_fork(after_in_child=lambda: dispose_engines(cerrar=False))
+
+
 def test_conexiones(ambiente: str = 'local') -> bool:
     """
     Prueba las conexiones a las bases de datos
@@ -134,32 +399,18 @@ def test_conexiones(ambiente: str = 'local') -> bool:
     Returns:
         True si ambas conexiones funcionan
     """
-    import mysql.connector
-    
     config = get_config(ambiente)
     
     try:
         # Probar conexión origen
         print(f" Probando conexión origen ({config['host_origen']}:{config['port_origen']})...")
-        conn_origen = mysql.connector.connect(
-            host=config['host_origen'],
-            port=config['port_origen'],
-            user=config['user_origen'],
-            password=config['password_origen'],
-            database=config['database_origen']
-        )
+        conn_origen = get_pooled_connection('origen', ambiente)
         conn_origen.close()
         print("   Conexión origen exitosa")
         
         # Probar conexión destino
         print(f" Probando conexión destino ({config['host_destino']}:{config['port_destino']})...")
-        conn_destino = mysql.connector.connect(
-            host=config['host_destino'],
-            port=config['port_destino'],
-            user=config['user_destino'],
-            password=config['password_destino'],
-            database=config['database_destino']
-        )
+        conn_destino = get_pooled_connection('destino', ambiente)
         conn_destino.close()
         print("   Conexión destino exitosa")
         
@@ -0,0 +1,150 @@
+"""Carga por lotes (upsert multi-fila) para tablas del DataWarehouse.
+
+En lugar de SELECT + UPDATE/INSERT por cada fila, las filas transformadas se
+agrupan en lotes y cada lote se aplica con un único
+``INSERT ... VALUES (...),(...) ON DUPLICATE KEY UPDATE``.
+
+Requiere un índice UNIQUE sobre la clave de negocio de la tabla destino
+(ver ``asegurar_clave_unica``).
+
+Detección de cambios: cada fila cargada guarda en ``hash_fila`` un digest de
+16 bytes de sus columnas de negocio. Antes de cada lote se leen en bloque los
+hashes de las claves del lote y solo se envían las filas nuevas o cuyo hash
+cambió; las idénticas no se reescriben (ni páginas InnoDB ni binlog).
+"""
+import os
+import logging
+import hashlib
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Sequence, Set
+
+logger = logging.getLogger("etl.carga_lotes")
+
+TAM_LOTE = int(os.getenv("ETL_TAM_LOTE", "1000"))
+COLUMNA_HASH = 'hash_fila'
+
+_tablas_con_hash: Set[str] = set()
+
+
+def asegurar_clave_unica(cursor: Any, tabla: str, columna: str) -> None:
+    """Crea el índice UNIQUE ``uq_<tabla>_<columna>`` si la tabla aún no tiene uno sobre ``columna``."""
+    cursor.execute(f"SHOW INDEX FROM {tabla} WHERE Non_unique = 0 AND Column_name = %s", (columna,))
+    if cursor.fetchall():
+        return
+    nombre = f"uq_{tabla.lower()}_{columna}"
+    logger.info("Creando índice único %s en %s(%s)", nombre, tabla, columna)
+    cursor.execute(f"ALTER TABLE {tabla} ADD UNIQUE KEY {nombre} ({columna})")
+
+
+def asegurar_columna(cursor: Any, tabla: str, columna: str, definicion: str) -> None:
+    """Agrega ``columna`` a ``tabla`` con ``definicion`` si aún no existe (DDL: commit implícito)."""
+    cursor.execute(f"SHOW COLUMNS FROM {tabla} LIKE %s", (columna,))
+    if not cursor.fetchall():
+        logger.info("Agregando columna %s a %s", columna, tabla)
+        cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}")
+
+
+def asegurar_columna_hash(cursor: Any, tabla: str) -> None:
+    """Agrega ``hash_fila BINARY(16)`` a ``tabla`` si aún no la tiene (se verifica una vez por proceso)."""
+    if tabla in _tablas_con_hash:
+        return
+    asegurar_columna(cursor, tabla, COLUMNA_HASH, "BINARY(16) NULL")
+    _tablas_con_hash.add(tabla)
+
+
+def _canonico(valor: Any) -> str:
+    if valor is None:
+        return "\x00"
+    if isinstance(valor, bool):
+        return "1" if valor else "0"
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, float):
+        return repr(valor)
+    return str(valor)
+
+
+def hash_fila(fila: Sequence[Any]) -> bytes:
+    """Digest determinista (16 bytes) de los valores de ``fila``."""
+    return hashlib.blake2b("\x1f".join(map(_canonico, fila)).encode("utf-8"), digest_size=16).digest()
+
+
+def _lotes(filas: Iterable[Sequence[Any]], tam: int) -> Iterable[List[Sequence[Any]]]:
+    lote: List[Sequence[Any]] = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tam:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def upsert_lotes(cursor: Any, tabla: str, columnas: Sequence[str], filas: Iterable[Sequence[Any]],
+                 clave: str, tam_lote: int = TAM_LOTE) -> Dict[str, int]:
+    """Aplica ``filas`` sobre ``tabla`` con un upsert multi-fila por lote.
+
+    ``clave`` es la columna de negocio (con índice UNIQUE) y debe estar en ``columnas``.
+    Antes de cada upsert se leen los hashes de las claves del lote (un solo
+    ``SELECT ... IN``); las filas cuyo hash no cambió se omiten y el resto se
+    envía con su nuevo ``hash_fila``. No hace commit: lo decide el llamador.
+
+    Returns:
+        Dict con 'insertados', 'actualizados', 'sin_cambios' y 'lotes'.
+    """
+    asegurar_columna_hash(cursor, tabla)
+    idx_clave = list(columnas).index(clave)
+    cols_sql = ",".join(list(columnas) + [COLUMNA_HASH])
+    fila_sql = "(" + ",".join(["%s"] * (len(columnas) + 1)) + ")"
+    update_sql = ",".join(f"{c}=VALUES({c})" for c in list(columnas) + [COLUMNA_HASH] if c != clave)
+    resumen = {'insertados': 0, 'actualizados': 0, 'sin_cambios': 0, 'lotes': 0}
+
+    for lote in _lotes(filas, tam_lote):
+        claves = [f[idx_clave] for f in lote]
+        cursor.execute(
+            f"SELECT {clave}, {COLUMNA_HASH} FROM {tabla} WHERE {clave} IN ({','.join(['%s'] * len(claves))})",
+            claves
+        )
+        existentes = {k: bytes(h) if h is not None else None for k, h in cursor.fetchall()}
+
+        params: List[Any] = []
+        enviadas = 0
+        for f in lote:
+            h = hash_fila(f)
+            k = f[idx_clave]
+            if k in existentes:
+                if existentes[k] == h:
+                    resumen['sin_cambios'] += 1
+                    continue
+                resumen['actualizados'] += 1
+            else:
+                resumen['insertados'] += 1
+            existentes[k] = h
+            params.extend(f)
+            params.append(h)
+            enviadas += 1
+        if enviadas:
+            cursor.execute(
+                f"INSERT INTO {tabla} ({cols_sql}) VALUES {','.join([fila_sql] * enviadas)} "
+                f"ON DUPLICATE KEY UPDATE {update_sql}",
+                params
+            )
+        resumen['lotes'] += 1
+
+    return resumen
+
+
+def insertar_lotes(cursor: Any, tabla: str, columnas: Sequence[str], filas: Iterable[Sequence[Any]],
+                   tam_lote: int = TAM_LOTE) -> Dict[str, int]:
+    """INSERT multi-fila por lote, sin clave de negocio (tablas recién vaciadas). No hace commit."""
+    cols_sql = ",".join(columnas)
+    fila_sql = "(" + ",".join(["%s"] * len(columnas)) + ")"
+    resumen = {'insertados': 0, 'actualizados': 0, 'sin_cambios': 0, 'lotes': 0}
+    for lote in _lotes(filas, tam_lote):
+        params: List[Any] = []
+        for f in lote:
+            params.extend(f)
+        cursor.execute(f"INSERT INTO {tabla} ({cols_sql}) VALUES {','.join([fila_sql] * len(lote))}", params)
+        resumen['insertados'] += len(lote)
+        resumen['lotes'] += 1
+    return resumen
@@ -0,0 +1,125 @@
+"""Carga masiva con ``LOAD DATA LOCAL INFILE`` para lotes grandes.
+
+Las filas transformadas se escriben a un TSV temporal, se ingieren con
+``LOAD DATA LOCAL INFILE`` en una tabla temporal de staging (``LIKE`` la tabla
+destino) y se fusionan con un único ``INSERT ... SELECT``. Para cientos de
+miles de filas es mucho más rápido que enviar los valores como parámetros.
+Con clave de negocio, cada fila lleva su ``hash_fila`` y las que no cambiaron
+se descartan del staging antes de fusionar.
+
+``cargar_filas`` elige el camino automáticamente: por encima de
+``ETL_UMBRAL_MASIVO`` filas usa la carga masiva y por debajo el upsert
+multi-fila de ``carga_lotes``. ``ETL_UMBRAL_MASIVO=0`` la desactiva.
+
+Requisitos: la conexión debe abrirse con ``allow_local_infile=True`` y el
+servidor tener ``local_infile=ON``. Si no es así se registra un aviso y se
+usa el camino por lotes.
+"""
+import os
+import logging
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence
+
+try:
+    from carga_lotes import COLUMNA_HASH, TAM_LOTE, asegurar_columna_hash, hash_fila, insertar_lotes, upsert_lotes
+except ImportError:  # importado como src.etl.carga_masiva (scripts de la raíz)
+    from src.etl.carga_lotes import (COLUMNA_HASH, TAM_LOTE, asegurar_columna_hash, hash_fila,
+                                     insertar_lotes, upsert_lotes)
+
+logger = logging.getLogger("etl.carga_masiva")
+
+UMBRAL_MASIVO = int(os.getenv("ETL_UMBRAL_MASIVO", "5000"))
+
+# Errores de MySQL que indican que LOCAL INFILE no está permitido
+_ERRORES_LOCAL_INFILE = {1148, 2068, 3948}
+_masivo_disponible = True
+
+
+def _campo_tsv(valor: Any) -> str:
+    if valor is None:
+        return "\\N"
+    if isinstance(valor, bool):
+        return "1" if valor else "0"
+    if isinstance(valor, datetime):
+        valor = valor.strftime("%Y-%m-%d %H:%M:%S")
+    return (str(valor).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def cargar_masivo(cursor: Any, tabla: str, columnas: Sequence[str], filas: Sequence[Sequence[Any]],
+                  clave: Optional[str] = None) -> Dict[str, Any]:
+    """TSV temporal -> staging -> ``tabla``. Con ``clave`` fusiona como upsert. No hace commit."""
+    staging = f"stg_{tabla.lower()}"
+    columnas = list(columnas)
+    cols_sql = ",".join(columnas)
+    carga_sql = cols_sql
+    if clave:
+        asegurar_columna_hash(cursor, tabla)
+        carga_sql += ",@hash"
+    fd, ruta = tempfile.mkstemp(prefix=f"{staging}_", suffix=".tsv")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as archivo:
+            for fila in filas:
+                archivo.write("\t".join(_campo_tsv(v) for v in fila))
+                if clave:
+                    archivo.write("\t" + hash_fila(fila).hex())
+                archivo.write("\n")
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging}")
+        cursor.execute(f"CREATE TEMPORARY TABLE {staging} LIKE {tabla}")
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {staging} CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+            f"({carga_sql})" + (f" SET {COLUMNA_HASH} = UNHEX(@hash)" if clave else ""),
+            (ruta,)
+        )
+        sin_cambios = actualizados = 0
+        if clave:
+            # Las filas idénticas a las del destino no se fusionan
+            cursor.execute(f"DELETE s FROM {staging} s JOIN {tabla} t ON t.{clave} = s.{clave} "
+                           f"AND t.{COLUMNA_HASH} = s.{COLUMNA_HASH}")
+            sin_cambios = cursor.rowcount
+            cursor.execute(f"SELECT COUNT(*) FROM {staging} s JOIN {tabla} t ON t.{clave} = s.{clave}")
+            actualizados = int(cursor.fetchall()[0][0])
+            cols_hash = columnas + [COLUMNA_HASH]
+            update_sql = ",".join(f"{c}=VALUES({c})" for c in cols_hash if c != clave)
+            cursor.execute(f"INSERT INTO {tabla} ({','.join(cols_hash)}) SELECT {','.join(cols_hash)} FROM {staging} "
+                           f"ON DUPLICATE KEY UPDATE {update_sql}")
+        else:
+            cursor.execute(f"INSERT INTO {tabla} ({cols_sql}) SELECT {cols_sql} FROM {staging}")
+        cursor.execute(f"SELECT COUNT(*) FROM {staging}")
+        cargados = int(cursor.fetchall()[0][0])
+        cursor.execute(f"DROP TEMPORARY TABLE {staging}")
+    finally:
+        os.unlink(ruta)
+    return {'insertados': cargados - actualizados, 'actualizados': actualizados, 'sin_cambios': sin_cambios,
+            'lotes': 1, 'metodo': 'load_data'}
+
+
+def cargar_filas(cursor: Any, tabla: str, columnas: Sequence[str], filas: Sequence[Sequence[Any]],
+                 clave: Optional[str] = None, umbral: int = UMBRAL_MASIVO,
+                 tam_lote: int = TAM_LOTE) -> Dict[str, Any]:
+    """Carga ``filas`` en ``tabla`` por el camino más rápido disponible. No hace commit.
+
+    Args:
+        clave: Columna con índice UNIQUE para upsert; None para INSERT simple.
+        umbral: Filas a partir de las cuales se usa LOAD DATA (<= 0 lo desactiva).
+
+    Returns:
+        Dict con 'insertados', 'actualizados', 'sin_cambios', 'lotes' y 'metodo'.
+    """
+    global _masivo_disponible
+    if _masivo_disponible and umbral > 0 and len(filas) >= umbral:
+        try:
+            return cargar_masivo(cursor, tabla, columnas, filas, clave)
+        except Exception as e:
+            if getattr(e, 'errno', None) not in _ERRORES_LOCAL_INFILE:
+                raise
+            _masivo_disponible = False
+            logger.warning("LOAD DATA LOCAL INFILE no disponible (%s); se usa carga por lotes", e)
+    if clave:
+        resumen = upsert_lotes(cursor, tabla, columnas, filas, clave=clave, tam_lote=tam_lote)
+    else:
+        resumen = insertar_lotes(cursor, tabla, columnas, filas, tam_lote=tam_lote)
+    resumen['metodo'] = 'lotes'
+    return resumen
@@ -0,0 +1,122 @@
+"""Resolución en memoria de claves de DimTiempo.
+
+DimTiempo es pequeña (un registro por día), así que se carga completa una sola
+vez al inicio de la carga en un dict ``fecha -> id_tiempo``. Las fechas que
+faltan se crean en bloque con la clave determinista YYYYMMDD (la misma que usan
+los procedimientos almacenados) y, a partir de ahí, resolver una clave no
+requiere ningún viaje a la base de datos.
+
+Uso típico::
+
+    tiempo = ResolutorTiempo(conn_dw)
+    tiempo.cargar()
+    tiempo.asegurar(fechas_de_los_hechos)
+    id_fin = tiempo.id_tiempo(proyecto['fecha_fin_real'])
+
+Es seguro compartir un resolutor entre hilos: ``asegurar`` se serializa y
+escribe siempre por la conexión del resolutor. Con ``confirmar=True`` hace
+commit de las fechas nuevas de inmediato, de modo que las etapas que cargan
+hechos en otras conexiones no quedan esperando bloqueos sobre DimTiempo.
+"""
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("etl.dim_tiempo")
+
+TAM_BLOQUE = 1000
+
+
+def clave_tiempo(fecha: date) -> int:
+    """Clave surrogate determinista YYYYMMDD."""
+    return fecha.year * 10000 + fecha.month * 100 + fecha.day
+
+
+def _como_fecha(valor: Any) -> Optional[date]:
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return None
+
+
+class ResolutorTiempo:
+    """Índice ``fecha -> id_tiempo`` de DimTiempo compartido por todos los loaders."""
+
+    def __init__(self, conexion: Any, tabla: str = 'DimTiempo', confirmar: bool = False):
+        self.conexion = conexion
+        self.tabla = tabla
+        self.confirmar = confirmar
+        self._ids: Dict[date, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def cargar(self) -> int:
+        """Lee DimTiempo completa (una consulta). Devuelve el número de fechas indexadas."""
+        cur = self.conexion.cursor()
+        try:
+            cur.execute(f"SELECT fecha, id_tiempo FROM {self.tabla}")
+            self._ids = {}
+            for fecha, id_tiempo in cur.fetchall():
+                f = _como_fecha(fecha)
+                if f is not None:
+                    self._ids[f] = id_tiempo
+        finally:
+            cur.close()
+        logger.debug("DimTiempo cargada en memoria: %s fechas", len(self._ids))
+        return len(self._ids)
+
+    def asegurar(self, fechas: Iterable[Any]) -> int:
+        """Crea en bloque las fechas que no existan todavía.
+
+        Solo hace commit si el resolutor se creó con ``confirmar=True``.
+
+        Returns:
+            Número de fechas nuevas.
+        """
+        fechas = {f for f in map(_como_fecha, fechas) if f is not None}
+        with self._lock:
+            return self._asegurar(sorted(f for f in fechas if f not in self._ids))
+
+    def _asegurar(self, faltantes: List[date]) -> int:
+        if not faltantes:
+            return 0
+        cur = self.conexion.cursor()
+        try:
+            for i in range(0, len(faltantes), TAM_BLOQUE):
+                bloque = faltantes[i:i + TAM_BLOQUE]
+                params: List[Any] = []
+                for f in bloque:
+                    params.extend((clave_tiempo(f), f, f.year, f.month, (f.month - 1) // 3 + 1))
+                cur.execute(
+                    f"INSERT IGNORE INTO {self.tabla} (id_tiempo, fecha, anio, mes, trimestre) VALUES "
+                    + ",".join(["(%s,%s,%s,%s,%s)"] * len(bloque)),
+                    params
+                )
+                # Releer el bloque: si otra carga creó la fecha antes, se respeta su clave
+                cur.execute(
+                    f"SELECT fecha, id_tiempo FROM {self.tabla} WHERE fecha IN ({','.join(['%s'] * len(bloque))})",
+                    bloque
+                )
+                for fecha, id_tiempo in cur.fetchall():
+                    self._ids[_como_fecha(fecha)] = id_tiempo
+            if self.confirmar:
+                self.conexion.commit()
+        finally:
+            cur.close()
+        return len(faltantes)
+
+    def asegurar_rango(self, desde: Any, hasta: Any) -> int:
+        """Asegura todos los días entre ``desde`` y ``hasta`` (inclusive)."""
+        inicio, fin = _como_fecha(desde), _como_fecha(hasta)
+        if inicio is None or fin is None:
+            return 0
+        return self.asegurar(inicio + timedelta(days=i) for i in range((fin - inicio).days + 1))
+
+    def id_tiempo(self, fecha: Any) -> Optional[int]:
+        """Clave de ``fecha`` sin acceso a BD (None si la fecha es nula o no existe)."""
+        f = _como_fecha(fecha)
+        return self._ids.get(f) if f is not None else None
@@ -5,17 +5,58 @@ Características añadidas:
  - Logging con nivel controlado por ETL_LOG_LEVEL (DEBUG, INFO, WARNING, ERROR)
  - Modo ETL_DRY_RUN (no aplica commits) para validación.
  - No imprime valores individuales de filas (solo métricas agregadas).
+ - HechoProyecto se carga por lotes con upsert multi-fila (tamaño ETL_TAM_LOTE)
+   y reporta insertados/actualizados exactos.
+ - Dimensiones y hechos guardan un hash de sus columnas de negocio (hash_fila):
+   las filas sin cambios no se reescriben y se reportan como 'sin_cambios'.
+ - Claves de DimTiempo resueltas en memoria (ResolutorTiempo), sin consultas por fila.
+ - Extracción por rangos de clave primaria (páginas de ETL_TAM_BLOQUE filas),
+   con memoria constante sin importar el número de filas. Cada página confirma
+   junto con su punto de control (PuntoControlETL): una corrida interrumpida se
+   reanuda desde ahí con la misma ventana, y una página que falla por un error
+   transitorio se reintenta con espera exponencial (ETL_REINTENTOS).
+ - Cargas grandes (>= ETL_UMBRAL_MASIVO filas) por LOAD DATA LOCAL INFILE a una
+   tabla de staging y fusión en destino (carga_masiva.py).
+ - Extracción incremental por marcas de agua (tabla MarcaAguaETL en el DW):
+   solo se leen filas cambiadas desde la última corrida exitosa y las marcas
+   avanzan solo cuando toda la carga confirmó. ETL_CDC_COMPLETO=1 fuerza
+   una extracción completa.
+ - Etapas como grafo de dependencias: las dimensiones se cargan en paralelo
+   (ETL_PARALELISMO hilos, conexiones de un pool) y cada hecho arranca cuando
+   sus dimensiones confirmaron. Se registra la duración de cada etapa.
+ - Cada carga confirmada incrementa VersionDatosDW (version_datos.py), con la
+   que el dashboard invalida su caché de respuestas.
+ - Modo --cambios: consume en micro-lotes el RegistroCambios que llenan los
+   triggers del origen (registro_cambios.sql), incluidos los borrados.
 """
-import os, sys, logging
+import os, sys, time, logging
 from pathlib import Path
-from datetime import datetime, date
+from datetime import datetime
 from typing import Any
 import mysql.connector
+from mysql.connector import pooling
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 SRC_ROOT = SCRIPT_DIR.parent
 if str(SRC_ROOT) not in sys.path:
     sys.path.insert(0, str(SRC_ROOT))
+if str(SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPT_DIR))
+
+from carga_lotes import asegurar_clave_unica, asegurar_columna, asegurar_columna_hash  # noqa: E402
+from carga_masiva import UMBRAL_MASIVO, cargar_filas  # noqa: E402
+from dim_tiempo import ResolutorTiempo  # noqa: E402
+from extraccion import sql_extraccion_proyectos  # noqa: E402
+from grafo_etapas import Etapa, ejecutar_grafo  # noqa: E402
+from marca_agua import MarcasAgua  # noqa: E402
+from puntos_control import PuntosControl, cargar_por_rangos  # noqa: E402
+from registro_cambios import PunteroConsumo, leer_lote, purgar  # noqa: E402
+from version_datos import asegurar_tabla_version, incrementar_version  # noqa: E402
+
+try:
+    from src.config.config_conexion import configure_pool  # type: ignore
+except Exception:
+    configure_pool = None  # sin el módulo de configuración: pools de mysql.connector directos
 
 try:
     from src.config.config_conexion import get_config  # type: ignore
@@ -38,6 +79,8 @@ except Exception as e:
     print(f" Config por defecto ({e})")
     CONFIG_ORIGEN = {'user':'root','password':'','database':'gestionproyectos_hist','unix_socket':'/Applications/XAMPP/xamppfiles/var/mysql/mysql.sock'}
     CONFIG_DESTINO = {'user':'root','password':'','database':'dw_proyectos_hist','unix_socket':'/Applications/XAMPP/xamppfiles/var/mysql/mysql.sock'}
+if UMBRAL_MASIVO > 0:
+    CONFIG_DESTINO['allow_local_infile'] = True  # carga masiva (LOAD DATA LOCAL INFILE)
 
 LOG_LEVEL = os.getenv("ETL_LOG_LEVEL", "INFO").upper()
 DRY_RUN = os.getenv("ETL_DRY_RUN", "0") in {"1", "true", "True"}
@@ -46,137 +89,417 @@ logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO),
                     datefmt='%H:%M:%S')
 logger = logging.getLogger("etl.incremental")
 
+PARALELISMO = int(os.getenv("ETL_PARALELISMO", "4"))
+TAM_BLOQUE = int(os.getenv("ETL_TAM_BLOQUE", "20000"))
+TAM_LOTE_CAMBIOS = int(os.getenv("ETL_CAMBIOS_LOTE", "5000"))
+INTERVALO_CAMBIOS = float(os.getenv("ETL_CAMBIOS_INTERVALO", "2"))
+PURGAR_CAMBIOS = os.getenv("ETL_CAMBIOS_PURGAR", "1") in {"1", "true", "True"}
+
+COLUMNAS_HECHO_PROYECTO = (
+    'id_proyecto', 'id_cliente', 'id_empleado_gerente', 'id_equipo', 'id_tiempo_fin_real', 'presupuesto', 'costo_real',
+    'variacion_costos', 'cumplimiento_presupuesto', 'duracion_planificada', 'duracion_real',
+    'variacion_cronograma', 'cumplimiento_tiempo', 'tareas_total', 'tareas_completadas', 'tareas_canceladas',
+    'horas_estimadas_total', 'horas_reales_total', 'variacion_horas', 'cambios_equipo_proy'
+)
+
+COLUMNAS_HECHO_TAREA = (
+    'id_tarea', 'id_proyecto', 'id_empleado', 'id_tiempo_inicio_plan', 'id_tiempo_fin_plan',
+    'id_tiempo_inicio_real', 'id_tiempo_fin_real', 'duracion_planificada', 'duracion_real',
+    'variacion_cronograma', 'cumplimiento_tiempo', 'horas_plan', 'horas_reales', 'variacion_horas',
+    'eficiencia_horas', 'costo_estimado', 'costo_real', 'variacion_costo', 'progreso_porcentaje'
+)
+
+# Igual que la recarga completa del dashboard: columna e índice juntos
+COLUMNA_ID_EQUIPO = "INT NULL AFTER id_empleado_gerente, ADD KEY idx_id_equipo (id_equipo)"
+
+# tabla origen -> (dimensión DW, clave, SELECT origen (1ª columna = clave), columnas DW)
+DIMENSIONES_CAMBIOS = {
+    'Cliente': ('DimCliente', 'id_cliente', "SELECT id_cliente,nombre,sector FROM Cliente WHERE 1=1",
+                ('id_cliente', 'nombre', 'sector')),
+    'Empleado': ('DimEmpleado', 'id_empleado', "SELECT id_empleado,nombre,puesto FROM Empleado WHERE 1=1",
+                 ('id_empleado', 'nombre', 'puesto')),
+    'Equipo': ('DimEquipo', 'id_equipo', "SELECT id_equipo,nombre_equipo,descripcion,activo FROM Equipo WHERE 1=1",
+               ('id_equipo', 'nombre_equipo', 'descripcion', 'activo')),
+    'Proyecto': ('DimProyecto', 'id_proyecto',
+                 "SELECT id_proyecto,nombre,fecha_inicio,fecha_fin_plan,presupuesto,id_estado FROM Proyecto WHERE id_estado IN (3,4)",
+                 ('id_proyecto', 'nombre_proyecto', 'fecha_inicio_plan', 'fecha_fin_plan', 'presupuesto', 'id_estado')),
+}
+
+# Tablas cargadas por upsert con detección de cambios (columna hash_fila)
+TABLAS_CON_HASH = ('DimCliente', 'DimEmpleado', 'DimEquipo', 'DimProyecto', 'HechoProyecto', 'HechoTarea')
+
+def _marcadores(valores) -> str:
+    return ",".join(["%s"] * len(valores))
+
+def _transformar_proyecto(row, tiempo: ResolutorTiempo):
+    """Fila de sql_extraccion_proyectos -> fila de HechoProyecto (None si no tiene fecha_fin_real)."""
+    (id_proy,id_cli,id_ger,id_equipo,f_ini,f_fin_plan,f_fin_real,presu,c_real,dur_plan,dur_real,tot,comp,canc,hrs_plan,hrs_real) = row
+    dur_plan_val = int(dur_plan or 0)
+    dur_real_val = int(dur_real or 0)
+    id_ti_real = tiempo.id_tiempo(f_fin_real)
+    if not id_ti_real:
+        return None
+    variacion = dur_real_val - dur_plan_val
+    cumplimiento_tiempo = 1 if variacion <= 0 else 0
+    presupuesto = float(presu or 0); costo_real = float(c_real or 0)
+    var_cost = costo_real - presupuesto
+    cumplimiento_pres = 1 if var_cost <= 0 else 0
+    tareas_total = int(tot or 0); tareas_completadas = int(comp or 0); tareas_canceladas = int(canc or 0)
+    horas_plan_total = int(hrs_plan or 0); horas_reales_total = int(hrs_real or 0)
+    var_horas = horas_reales_total - horas_plan_total
+    cambios_equipo = 0  # No tenemos esta info en origen
+    return (id_proy,id_cli,id_ger,id_equipo,id_ti_real,presupuesto,costo_real,var_cost,cumplimiento_pres,dur_plan_val,dur_real_val,variacion,cumplimiento_tiempo,tareas_total,tareas_completadas,tareas_canceladas,horas_plan_total,horas_reales_total,var_horas,cambios_equipo)
+
+def _dias(desde, hasta):
+    return (hasta - desde).days if desde and hasta else None
+
+def _transformar_tarea(row, tiempo: ResolutorTiempo) -> tuple:
+    (id_tarea,id_proy,id_emp,f_ini_plan,f_fin_plan,f_ini_real,f_fin_real,hrs_plan,hrs_real,c_est,c_real,progreso) = row
+    dur_plan = _dias(f_ini_plan, f_fin_plan); dur_real = _dias(f_ini_real, f_fin_real)
+    variacion = (dur_real - dur_plan) if dur_plan is not None and dur_real is not None else 0
+    cumplimiento = 1 if f_fin_real and f_fin_plan and f_fin_real <= f_fin_plan else 0
+    horas_plan = int(hrs_plan or 0); horas_reales = int(hrs_real or 0)
+    # Igual que sp_ejecutar_etl_completo: plan/real*100, acotado a DECIMAL(5,2)
+    eficiencia = min(round(horas_plan / horas_reales * 100, 2), 999.99) if horas_reales > 0 else 0
+    costo_est = float(c_est or 0); costo_real = float(c_real or 0)
+    return (id_tarea, id_proy, id_emp,
+            tiempo.id_tiempo(f_ini_plan), tiempo.id_tiempo(f_fin_plan),
+            tiempo.id_tiempo(f_ini_real), tiempo.id_tiempo(f_fin_real),
+            dur_plan or 0, dur_real or 0, variacion, cumplimiento,
+            horas_plan, horas_reales, horas_reales - horas_plan, eficiencia,
+            costo_est, costo_real, costo_real - costo_est, float(progreso or 0))
+
+def _cargar_hecho_tarea(co, cd, tiempo: ResolutorTiempo, filtro: str = '1=1', params: tuple = (),
+                        confirmar: bool = True, puntos: PuntosControl = None) -> dict:
+    """Carga HechoTarea por rangos de ``id_tarea`` con upsert por página.
+
+    Solo hay una página (ETL_TAM_BLOQUE filas) en memoria a la vez, así que el
+    consumo es el mismo con 10k o 10M tareas. Cada página se carga con
+    ``cargar_filas`` (LOAD DATA si supera el umbral) y se confirma junto con su
+    punto de control. ``filtro``/``params`` restringen las tareas (condición
+    sobre ``t`` y ``p``). Con ``confirmar=False`` no hace commit (lo hace el llamador).
+    """
+    d = cd.cursor()
+    asegurar_clave_unica(d, 'HechoTarea', 'id_tarea')
+    d.close()
+
+    def procesar(_o, d, filas):
+        fechas = tiempo.asegurar(f for r in filas for f in r[3:7])
+        carga = cargar_filas(d, 'HechoTarea', COLUMNAS_HECHO_TAREA, [_transformar_tarea(r, tiempo) for r in filas],
+                             clave='id_tarea')
+        return {'insertados': carga['insertados'], 'actualizados': carga['actualizados'],
+                'sin_cambios': carga['sin_cambios'], 'lotes': carga['lotes'], 'fechas_nuevas': fechas}
+
+    sql = """SELECT t.id_tarea,t.id_proyecto,t.id_empleado,t.fecha_inicio_plan,t.fecha_fin_plan,t.fecha_inicio_real,t.fecha_fin_real,
+             t.horas_plan,t.horas_reales,t.costo_estimado,t.costo_real,t.progreso_porcentaje
+             FROM Tarea t JOIN Proyecto p ON p.id_proyecto=t.id_proyecto
+             WHERE p.id_estado IN (3,4) AND ({filtro}) AND t.id_tarea > %s
+             ORDER BY t.id_tarea LIMIT %s""".format(filtro=filtro)
+    return cargar_por_rangos(co, cd, 'HechoTarea', sql, params, procesar, TAM_BLOQUE,
+                             puntos=puntos, confirmar=confirmar and not DRY_RUN)
+
+def _cargar_dimension(co, cd, tabla_dw: str, clave: str, columnas, sql: str, params, puntos: PuntosControl = None) -> dict:
+    """Extrae con ``sql`` por rangos de ``clave`` y aplica sobre ``tabla_dw`` solo las filas nuevas o cambiadas (hash_fila)."""
+    def procesar(_o, d, filas):
+        carga = cargar_filas(d, tabla_dw, columnas, filas, clave=clave)
+        return {'insertados': carga['insertados'], 'actualizados': carga['actualizados'],
+                'sin_cambios': carga['sin_cambios']}
+    return cargar_por_rangos(co, cd, tabla_dw, f"{sql} AND {clave} > %s ORDER BY {clave} LIMIT %s", params,
+                             procesar, TAM_BLOQUE, puntos=puntos, confirmar=not DRY_RUN)
+
+def _etapa_dim_cliente(co, cd, filtro, params, puntos) -> dict:
+    return _cargar_dimension(co, cd, 'DimCliente', 'id_cliente', ('id_cliente', 'nombre', 'sector'),
+                             f"SELECT id_cliente, nombre, sector FROM Cliente WHERE {filtro}", params, puntos)
+
+def _etapa_dim_empleado(co, cd, filtro, params, puntos) -> dict:
+    return _cargar_dimension(co, cd, 'DimEmpleado', 'id_empleado', ('id_empleado', 'nombre', 'puesto'),
+                             f"SELECT id_empleado,nombre,puesto FROM Empleado WHERE {filtro}", params, puntos)
+
+def _etapa_dim_proyecto(co, cd, filtro, params, puntos) -> dict:
+    """DimProyecto (estado finalizado/cancelado). Lleva ``id_estado`` para que el dashboard no consulte origen."""
+    return _cargar_dimension(co, cd, 'DimProyecto', 'id_proyecto',
+                             ('id_proyecto', 'nombre_proyecto', 'fecha_inicio_plan', 'fecha_fin_plan', 'presupuesto', 'id_estado'),
+                             f"SELECT id_proyecto,nombre,fecha_inicio,fecha_fin_plan,presupuesto,id_estado FROM Proyecto p WHERE id_estado IN (3,4) AND {filtro}",
+                             params, puntos)
+
+def _etapa_dim_tiempo(co, _cd, tiempo: ResolutorTiempo, filtro, params) -> dict:
+    """DimTiempo - índice en memoria; las fechas faltantes se crean en bloque (por la conexión del resolutor)."""
+    o = co.cursor()
+    tiempo.cargar()
+    o.execute(f"""SELECT DISTINCT fecha_inicio FROM Proyecto p WHERE fecha_inicio IS NOT NULL AND {filtro}
+              UNION SELECT DISTINCT fecha_fin_plan FROM Proyecto p WHERE fecha_fin_plan IS NOT NULL AND {filtro}
+              UNION SELECT DISTINCT fecha_fin_real FROM Proyecto p WHERE fecha_fin_real IS NOT NULL AND {filtro}""",
+              params * 3)
+    fechas_raw = o.fetchall()
+    o.close()
+    nuevas_fechas = tiempo.asegurar(f for (f,) in fechas_raw)
+    return {'fechas_total': len(fechas_raw), 'nuevas': nuevas_fechas}
+
+def _etapa_hecho_proyecto(co, cd, tiempo: ResolutorTiempo, ids_afectados, puntos) -> dict:
+    """HechoProyecto - proyectos finalizados/cancelados (todos o solo los afectados), por rangos de id_proyecto."""
+    d = cd.cursor()
+    asegurar_clave_unica(d, 'HechoProyecto', 'id_proyecto')
+    d.close()
+    if ids_afectados is not None and not ids_afectados:
+        return {'procesados': 0, 'insertados': 0, 'actualizados': 0, 'sin_cambios': 0, 'omitidos_sin_fecha': 0}
+
+    def procesar(o, d, filas):
+        o.execute(sql_extraccion_proyectos(estados_proyecto=(3, 4), estado_tarea_completada=3, estado_tarea_cancelada=4,
+                                           ids_proyecto=[r[0] for r in filas]))
+        extraidas = o.fetchall()
+        # Fechas de los proyectos de esta página: los que entran por cambios en sus tareas
+        # (o con fechas fuera de la ventana de DimTiempo) no quedan omitidos
+        fechas = tiempo.asegurar(f for r in extraidas for f in r[4:7])
+        hechos_hp = []; omitidos_hp = 0
+        for row in extraidas:
+            hecho = _transformar_proyecto(row, tiempo)
+            if hecho is None:
+                omitidos_hp += 1
+                continue  # Skip si no hay fecha_fin_real
+            hechos_hp.append(hecho)
+        carga_hp = cargar_filas(d, 'HechoProyecto', COLUMNAS_HECHO_PROYECTO, hechos_hp, clave='id_proyecto')
+        return {'insertados': carga_hp['insertados'], 'actualizados': carga_hp['actualizados'],
+                'sin_cambios': carga_hp['sin_cambios'], 'omitidos_sin_fecha': omitidos_hp, 'lotes': carga_hp['lotes'],
+                'fechas_nuevas': fechas}
+
+    filtro, params = '1=1', ()
+    if ids_afectados is not None:
+        filtro, params = f"p.id_proyecto IN ({_marcadores(ids_afectados)})", tuple(ids_afectados)
+    sql = f"""SELECT p.id_proyecto FROM Proyecto p WHERE p.id_estado IN (3,4) AND {filtro}
+              AND p.id_proyecto > %s ORDER BY p.id_proyecto LIMIT %s"""
+    return cargar_por_rangos(co, cd, 'HechoProyecto', sql, params, procesar, TAM_BLOQUE,
+                             puntos=puntos, confirmar=not DRY_RUN)
+
+def _pool(nombre: str, config: dict, tamano: int):
+    """Pool con nombre compartido (config_conexion) o, si no está disponible, uno de mysql.connector."""
+    if configure_pool is not None:
+        return configure_pool(nombre, config, tamano=tamano)
+    return pooling.MySQLConnectionPool(pool_name=nombre, pool_size=min(tamano, 32), **config)
+
+def _con_conexiones(pool_origen, pool_destino, funcion, *args):
+    """Envuelve ``funcion(co, cd, *args)`` para que tome y devuelva conexiones del pool."""
+    def etapa():
+        co = pool_origen.get_connection(); cd = pool_destino.get_connection()
+        try:
+            return funcion(co, cd, *args)
+        finally:
+            co.close(); cd.close()  # en un pool, close() devuelve la conexión
+    return etapa
+
 def ejecutar_etl_incremental() -> bool:
-    logger.info("Inicio ETL incremental (dry-run=%s, log-level=%s)", DRY_RUN, LOG_LEVEL)
+    logger.info("Inicio ETL incremental (dry-run=%s, log-level=%s, paralelismo=%s)", DRY_RUN, LOG_LEVEL, PARALELISMO)
     inicio_total = datetime.now()
     try:
-        co = mysql.connector.connect(**CONFIG_ORIGEN)
-        cd = mysql.connector.connect(**CONFIG_DESTINO)
-        o: Any = co.cursor(); d: Any = cd.cursor()  # type: ignore
-        resumen = {}
-
-        # DimCliente
-        o.execute("SELECT id_cliente, nombre, sector FROM Cliente")
-        clientes = o.fetchall(); nuevos_clientes = 0
-        for (id_cli, nombre, sector) in clientes:
-            d.execute(
-                """INSERT INTO DimCliente (id_cliente,nombre,sector)
-                VALUES (%s,%s,%s)
-                ON DUPLICATE KEY UPDATE nombre=VALUES(nombre),sector=VALUES(sector)""",
-                (id_cli, nombre, sector)
-            )
-            if d.rowcount == 1:  # Inserción nueva (heurística)
-                nuevos_clientes += 1
-        if not DRY_RUN: cd.commit()
-        resumen['DimCliente'] = {'procesados': len(clientes), 'nuevos_aprox': nuevos_clientes}
-
-        # DimEmpleado
-        o.execute("SELECT id_empleado,nombre,puesto FROM Empleado")
-        empleados = o.fetchall(); nuevos_empleados = 0
-        for (id_emp, nombre_emp, puesto) in empleados:
-            d.execute(
-                """INSERT INTO DimEmpleado (id_empleado,nombre,puesto)
-                VALUES (%s,%s,%s)
-                ON DUPLICATE KEY UPDATE nombre=VALUES(nombre),puesto=VALUES(puesto)""",
-                (id_emp, nombre_emp, puesto)
-            )
-            if d.rowcount == 1:
-                nuevos_empleados += 1
-        if not DRY_RUN: cd.commit()
-        resumen['DimEmpleado'] = {'procesados': len(empleados), 'nuevos_aprox': nuevos_empleados}
-
-        # DimProyecto (estado finalizado/cancelado)
-        o.execute("SELECT id_proyecto,nombre,fecha_inicio,fecha_fin_plan,presupuesto FROM Proyecto WHERE id_estado IN (3,4)")
-        proyectos = o.fetchall(); nuevos_proyectos = 0
-        for (id_proy_dim, nombre_proy, fecha_inicio, fecha_fin_plan, presupuesto) in proyectos:
-            d.execute(
-                """INSERT INTO DimProyecto (id_proyecto,nombre_proyecto,fecha_inicio_plan,fecha_fin_plan,presupuesto)
-                VALUES (%s,%s,%s,%s,%s)
-                ON DUPLICATE KEY UPDATE nombre_proyecto=VALUES(nombre_proyecto),fecha_inicio_plan=VALUES(fecha_inicio_plan),fecha_fin_plan=VALUES(fecha_fin_plan),presupuesto=VALUES(presupuesto)""",
-                (id_proy_dim, nombre_proy, fecha_inicio, fecha_fin_plan, presupuesto)
-            )
-            if d.rowcount == 1:
-                nuevos_proyectos += 1
-        if not DRY_RUN: cd.commit()
-        resumen['DimProyecto'] = {'procesados': len(proyectos), 'nuevos_aprox': nuevos_proyectos}
-
-        # DimTiempo
-        o.execute("""SELECT DISTINCT fecha_inicio FROM Proyecto WHERE fecha_inicio IS NOT NULL
-                  UNION SELECT DISTINCT fecha_fin_plan FROM Proyecto WHERE fecha_fin_plan IS NOT NULL
-                  UNION SELECT DISTINCT fecha_fin_real FROM Proyecto WHERE fecha_fin_real IS NOT NULL""")
-        fechas_raw = o.fetchall(); nuevas_fechas = 0
-        for (fecha_raw,) in fechas_raw:
-            if isinstance(fecha_raw, datetime):
-                fecha_val = fecha_raw.date()
-            elif isinstance(fecha_raw, date):
-                fecha_val = fecha_raw
-            else:
-                continue
-            d.execute("INSERT IGNORE INTO DimTiempo (id_tiempo,fecha,anio,mes,trimestre) VALUES (%s,%s,%s,%s,%s)",
-                      (fecha_val, fecha_val, fecha_val.year, fecha_val.month, (fecha_val.month-1)//3+1))
-            if d.rowcount > 0:
-                nuevas_fechas += 1
-        if not DRY_RUN: cd.commit()
-        resumen['DimTiempo'] = {'fechas_total': len(fechas_raw), 'nuevas': nuevas_fechas}
-
-        # HechoProyecto - procesar todos los proyectos finalizados/cancelados
-        o.execute("""SELECT p.id_proyecto,p.id_cliente,p.id_empleado_gerente,p.fecha_inicio,p.fecha_fin_plan,p.fecha_fin_real,p.presupuesto,p.costo_real,
-                    DATEDIFF(p.fecha_fin_plan,p.fecha_inicio),DATEDIFF(COALESCE(p.fecha_fin_real,CURDATE()),p.fecha_inicio),
-                    (SELECT COUNT(*) FROM Tarea t WHERE t.id_proyecto=p.id_proyecto),
-                    (SELECT COUNT(*) FROM Tarea t WHERE t.id_proyecto=p.id_proyecto AND t.id_estado=3),
-                    (SELECT COUNT(*) FROM Tarea t WHERE t.id_proyecto=p.id_proyecto AND t.id_estado=4),
-                    (SELECT COALESCE(SUM(horas_plan),0) FROM Tarea t WHERE t.id_proyecto=p.id_proyecto),
-                    (SELECT COALESCE(SUM(horas_reales),0) FROM Tarea t WHERE t.id_proyecto=p.id_proyecto)
-                    FROM Proyecto p WHERE p.id_estado IN (3,4)""")
-        hp_cnt = 0
-        for row in o.fetchall():
-            hp_cnt += 1
-            (id_proy,id_cli,id_ger,f_ini,f_fin_plan,f_fin_real,presu,c_real,dur_plan,dur_real,tot,comp,canc,hrs_plan,hrs_real) = row
-            dur_plan_val = int(dur_plan or 0)
-            dur_real_val = int(dur_real or 0)
-            def id_ti(fecha):
-                if not fecha: return None
-                d.execute("SELECT id_tiempo FROM DimTiempo WHERE fecha=%s", (fecha,))
-                r = d.fetchone(); return r[0] if r else None
-            id_ti_real = id_ti(f_fin_real)
-            if not id_ti_real:
-                continue  # Skip si no hay fecha_fin_real
-            variacion = dur_real_val - dur_plan_val
-            cumplimiento_tiempo = 1 if variacion <= 0 else 0
-            presupuesto = float(presu or 0); costo_real = float(c_real or 0)
-            var_cost = costo_real - presupuesto
-            cumplimiento_pres = 1 if var_cost <= 0 else 0
-            tareas_total = int(tot or 0); tareas_completadas = int(comp or 0); tareas_canceladas = int(canc or 0)
-            horas_plan_total = int(hrs_plan or 0); horas_reales_total = int(hrs_real or 0)
-            var_horas = horas_reales_total - horas_plan_total
-            cambios_equipo = 0  # No tenemos esta info en origen
-            
-            d.execute("SELECT id_hecho_proyecto FROM HechoProyecto WHERE id_proyecto=%s", (id_proy,))
-            existe = d.fetchone()
-            if existe:
-                d.execute("""UPDATE HechoProyecto SET id_cliente=%s,id_empleado_gerente=%s,id_tiempo_fin_real=%s,presupuesto=%s,costo_real=%s,variacion_costos=%s,cumplimiento_presupuesto=%s,duracion_planificada=%s,duracion_real=%s,variacion_cronograma=%s,cumplimiento_tiempo=%s,tareas_total=%s,tareas_completadas=%s,tareas_canceladas=%s,horas_estimadas_total=%s,horas_reales_total=%s,variacion_horas=%s,cambios_equipo_proy=%s WHERE id_proyecto=%s""",
-                          (id_cli,id_ger,id_ti_real,presupuesto,costo_real,var_cost,cumplimiento_pres,dur_plan_val,dur_real_val,variacion,cumplimiento_tiempo,tareas_total,tareas_completadas,tareas_canceladas,horas_plan_total,horas_reales_total,var_horas,cambios_equipo,id_proy))
-            else:
-                d.execute("""INSERT INTO HechoProyecto (id_proyecto,id_cliente,id_empleado_gerente,id_tiempo_fin_real,presupuesto,costo_real,variacion_costos,cumplimiento_presupuesto,duracion_planificada,duracion_real,variacion_cronograma,cumplimiento_tiempo,tareas_total,tareas_completadas,tareas_canceladas,horas_estimadas_total,horas_reales_total,variacion_horas,cambios_equipo_proy) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)""",
-                          (id_proy,id_cli,id_ger,id_ti_real,presupuesto,costo_real,var_cost,cumplimiento_pres,dur_plan_val,dur_real_val,variacion,cumplimiento_tiempo,tareas_total,tareas_completadas,tareas_canceladas,horas_plan_total,horas_reales_total,var_horas,cambios_equipo))
+        # Etapas concurrentes + conexión principal + conexión propia de DimTiempo
+        pool_o = _pool('etl_origen', CONFIG_ORIGEN, PARALELISMO + 1)
+        pool_d = _pool('etl_destino', CONFIG_DESTINO, PARALELISMO + 2)
+        co = pool_o.get_connection(); cd = pool_d.get_connection()
+        o: Any = co.cursor()  # type: ignore
+        # Si la corrida anterior se interrumpió, se reanuda con su mismo límite de ventana
+        puntos = PuntosControl(cd)
+        reanudada = puntos.cargar()
+        marcas = MarcasAgua(co, cd)
+        marcas.cargar(limite=puntos.limite)
+        puntos.limite = marcas.limite
+        f_cli, p_cli = marcas.filtro('Cliente')
+        f_emp, p_emp = marcas.filtro('Empleado')
+        f_proy, p_proy = marcas.filtro('Proyecto', 'p')
+        f_tar, p_tar = marcas.filtro('Tarea', 't')
+
+        # Proyectos afectados: cambiados ellos mismos o alguna de sus tareas (None = todos)
+        ids_afectados = None
+        if f_proy != '1=1' and f_tar != '1=1':
+            o.execute(f"""SELECT p.id_proyecto FROM Proyecto p WHERE {f_proy}
+                      UNION SELECT DISTINCT t.id_proyecto FROM Tarea t WHERE {f_tar} AND t.id_proyecto IS NOT NULL""",
+                      p_proy + p_tar)
+            ids_afectados = [r[0] for r in o.fetchall()]
+        o.close()
+
+        # Columnas hash_fila/id_estado y tabla de versión antes de lanzar etapas (el DDL hace commit implícito)
+        d: Any = cd.cursor()  # type: ignore
+        for tabla in TABLAS_CON_HASH:
+            asegurar_columna_hash(d, tabla)
+        asegurar_columna(d, 'DimProyecto', 'id_estado', 'INT NULL')
+        asegurar_columna(d, 'HechoProyecto', 'id_equipo', COLUMNA_ID_EQUIPO)
+        asegurar_tabla_version(d)
+        d.close()
+
+        # DimTiempo escribe por su propia conexión (serializada en el resolutor) para
+        # que los hechos concurrentes no se bloqueen entre sí al crear fechas
+        cd_tiempo = pool_d.get_connection()
+        tiempo = ResolutorTiempo(cd_tiempo, confirmar=not DRY_RUN)
+
+        # Dimensiones en paralelo; cada hecho arranca cuando sus dimensiones confirmaron
+        # (la tarea entra en HechoTarea si cambió ella o su proyecto, p.ej. al pasar a finalizado)
+        resumen, tiempos = ejecutar_grafo([
+            Etapa('DimCliente', _con_conexiones(pool_o, pool_d, _etapa_dim_cliente, f_cli, p_cli, puntos)),
+            Etapa('DimEmpleado', _con_conexiones(pool_o, pool_d, _etapa_dim_empleado, f_emp, p_emp, puntos)),
+            Etapa('DimProyecto', _con_conexiones(pool_o, pool_d, _etapa_dim_proyecto, f_proy, p_proy, puntos)),
+            Etapa('DimTiempo', _con_conexiones(pool_o, pool_d, _etapa_dim_tiempo, tiempo, f_proy, p_proy)),
+            Etapa('HechoProyecto', _con_conexiones(pool_o, pool_d, _etapa_hecho_proyecto, tiempo, ids_afectados, puntos),
+                  depende=('DimCliente', 'DimEmpleado', 'DimProyecto', 'DimTiempo')),
+            Etapa('HechoTarea', _con_conexiones(pool_o, pool_d, _cargar_hecho_tarea, tiempo, f"({f_tar}) OR ({f_proy})",
+                                                p_tar + p_proy, True, puntos),
+                  depende=('DimEmpleado', 'DimProyecto', 'DimTiempo')),
+        ], max_hilos=PARALELISMO)
+        cd_tiempo.close()
+
+        marcas.registrar('Cliente', resumen['DimCliente']['procesados'])
+        marcas.registrar('Empleado', resumen['DimEmpleado']['procesados'])
+        marcas.registrar('Proyecto', resumen['DimProyecto']['procesados'])
+        marcas.registrar('Tarea', resumen['HechoTarea']['procesados'])
+
+        # Las marcas avanzan solo después de que todas las etapas confirmaron; en la
+        # misma transacción se descartan los puntos de control de la corrida y se
+        # incrementa la versión de datos (invalida la caché del dashboard)
+        marcas.guardar()
+        d = cd.cursor()
+        puntos.limpiar(d)
+        incrementar_version(d)
+        d.close()
         if not DRY_RUN: cd.commit()
-        resumen['HechoProyecto'] = {'procesados': hp_cnt}
+        resumen['MarcaAgua'] = {'limite': str(marcas.limite), 'reanudada': reanudada,
+                                'proyectos_afectados': 'todos' if ids_afectados is None else len(ids_afectados)}
 
-        # HechoTarea - omitido por ahora, requiere refactorización completa
-        # TODO: Implementar HechoTarea correctamente cuando se definan las columnas reales
-        resumen['HechoTarea'] = {'procesados': 0, 'nota': 'Omitido - requiere refactorización'}
-        
-        o.close(); d.close(); co.close(); cd.close()
+        co.close(); cd.close()
         dur = (datetime.now() - inicio_total).total_seconds()
-        logger.info("ETL incremental completado en %.2fs", dur)
+        logger.info("ETL incremental completado en %.2fs (suma de etapas %.2fs)", dur, sum(tiempos.values()))
         for k,v in resumen.items():
             logger.info("Resumen %s: %s", k, v)
         if DRY_RUN:
             logger.warning("Modo DRY-RUN: no se aplicaron commits en destino")
         return True
     except Exception as e:
-        logger.error("Fallo ETL incremental: %s", e, exc_info=LOG_LEVEL=='DEBUG')
+        logger.error("Fallo ETL incremental: %s (la próxima corrida se reanuda desde los puntos de control)", e, exc_info=LOG_LEVEL=='DEBUG')
+        return False
+
+def _sincronizar(o, d, tabla_dw: str, clave: str, sql: str, columnas, ids) -> dict:
+    """Upsert de las filas vigentes de ``ids`` y borrado en DW de las que ya no califican en origen."""
+    ids = sorted(ids)
+    if not ids:
+        return {'insertados': 0, 'actualizados': 0, 'sin_cambios': 0, 'borrados': 0}
+    o.execute(f"{sql} AND {clave} IN ({_marcadores(ids)})", ids)
+    filas = o.fetchall()
+    carga = cargar_filas(d, tabla_dw, columnas, filas, clave=clave)
+    vigentes = {f[0] for f in filas}
+    ausentes = [i for i in ids if i not in vigentes]
+    borrados = 0
+    if ausentes:
+        d.execute(f"DELETE FROM {tabla_dw} WHERE {clave} IN ({_marcadores(ausentes)})", ausentes)
+        borrados = d.rowcount
+    return {'insertados': carga['insertados'], 'actualizados': carga['actualizados'],
+            'sin_cambios': carga['sin_cambios'], 'borrados': borrados}
+
+def _aplicar_cambios(co, cd, tiempo: ResolutorTiempo, lote) -> dict:
+    """Propaga un micro-lote de RegistroCambios a dimensiones y hechos. No hace commit."""
+    o = co.cursor(); d = cd.cursor()
+    resumen = {}
+    for tabla, (tabla_dw, clave, sql, columnas) in DIMENSIONES_CAMBIOS.items():
+        if lote.ids(tabla):
+            resumen[tabla_dw] = _sincronizar(o, d, tabla_dw, clave, sql, columnas, lote.ids(tabla))
+
+    # Proyectos cuyo hecho hay que recalcular: cambiados, o con tareas/asignaciones cambiadas
+    proyectos = lote.ids('Proyecto') | lote.padres.get('Tarea', set())
+    tareas_teh = sorted(lote.padres.get('TareaEquipoHist', set()))
+    if tareas_teh:
+        o.execute(f"SELECT DISTINCT id_proyecto FROM Tarea WHERE id_tarea IN ({_marcadores(tareas_teh)}) AND id_proyecto IS NOT NULL", tareas_teh)
+        proyectos |= {r[0] for r in o.fetchall()}
+    if proyectos:
+        o.execute(sql_extraccion_proyectos(estados_proyecto=(3, 4), estado_tarea_completada=3, estado_tarea_cancelada=4,
+                                           ids_proyecto=sorted(proyectos)))
+        filas_hp = o.fetchall()
+        tiempo.asegurar(f for r in filas_hp for f in r[4:7])
+        hechos_hp = [h for h in (_transformar_proyecto(r, tiempo) for r in filas_hp) if h is not None]
+        carga = cargar_filas(d, 'HechoProyecto', COLUMNAS_HECHO_PROYECTO, hechos_hp, clave='id_proyecto')
+        ausentes = sorted(proyectos - {h[0] for h in hechos_hp})
+        carga['borrados'] = 0
+        if ausentes:
+            d.execute(f"DELETE FROM HechoProyecto WHERE id_proyecto IN ({_marcadores(ausentes)})", ausentes)
+            carga['borrados'] = d.rowcount
+        resumen['HechoProyecto'] = carga
+
+    # Tareas: cambiadas ellas mismas o cuyo proyecto cambió (p.ej. de estado)
+    tareas = sorted(lote.ids('Tarea')); proyectos_cambiados = sorted(lote.ids('Proyecto'))
+    condiciones = []; params = []
+    if tareas:
+        condiciones.append(f"{{a}}id_tarea IN ({_marcadores(tareas)})"); params += tareas
+    if proyectos_cambiados:
+        condiciones.append(f"{{a}}id_proyecto IN ({_marcadores(proyectos_cambiados)})"); params += proyectos_cambiados
+    if condiciones:
+        filtro = " OR ".join(condiciones)
+        o.execute(f"""SELECT t.id_tarea FROM Tarea t JOIN Proyecto p ON p.id_proyecto=t.id_proyecto
+                  WHERE p.id_estado IN (3,4) AND ({filtro.format(a='t.')})""", params)
+        vigentes = {r[0] for r in o.fetchall()}
+        d.execute(f"SELECT id_tarea FROM HechoTarea WHERE {filtro.format(a='')}", params)
+        sobrantes = [r[0] for r in d.fetchall() if r[0] not in vigentes]
+        carga = _cargar_hecho_tarea(co, cd, tiempo, filtro.format(a='t.'), tuple(params), confirmar=False)
+        carga['borrados'] = 0
+        if sobrantes:
+            d.execute(f"DELETE FROM HechoTarea WHERE id_tarea IN ({_marcadores(sobrantes)})", sobrantes)
+            carga['borrados'] = d.rowcount
+        resumen['HechoTarea'] = carga
+    o.close(); d.close()
+    return resumen
+
+def ejecutar_consumo_cambios(continuo: bool = False) -> bool:
+    """Drena RegistroCambios en micro-lotes (ETL_CAMBIOS_LOTE entradas).
+
+    Cada micro-lote y el avance del puntero se confirman juntos en el DW. Con
+    ``continuo`` sigue esperando cambios nuevos cada ETL_CAMBIOS_INTERVALO segundos.
+    """
+    logger.info("Inicio consumo de cambios (continuo=%s, dry-run=%s)", continuo, DRY_RUN)
+    try:
+        # Conexiones propias y de larga vida (no del pool): el consumidor las mantiene toda la sesión
+        co = mysql.connector.connect(**CONFIG_ORIGEN)
+        cd = mysql.connector.connect(**CONFIG_DESTINO)
+        co.autocommit = True  # cada lectura ve los cambios recién confirmados en origen
+        tiempo = ResolutorTiempo(cd); tiempo.cargar()
+        puntero = PunteroConsumo(cd); puntero.cargar()
+        d = cd.cursor()
+        for tabla in TABLAS_CON_HASH:
+            asegurar_columna_hash(d, tabla)
+        asegurar_columna(d, 'DimProyecto', 'id_estado', 'INT NULL')
+        asegurar_columna(d, 'HechoProyecto', 'id_equipo', COLUMNA_ID_EQUIPO)
+        asegurar_tabla_version(d)
+        d.close()
+        if not DRY_RUN: cd.commit()
+        while True:
+            lote = leer_lote(co, puntero.ultimo_id, TAM_LOTE_CAMBIOS, rezagados=PURGAR_CAMBIOS)
+            if lote:
+                inicio = time.perf_counter()
+                resumen = _aplicar_cambios(co, cd, tiempo, lote)
+                puntero.avanzar(lote.ultimo_id)
+                d = cd.cursor(); incrementar_version(d); d.close()
+                if DRY_RUN:
+                    cd.rollback()
+                    logger.warning("Modo DRY-RUN: micro-lote hasta id_cambio=%s no aplicado: %s", lote.ultimo_id, resumen)
+                    break
+                cd.commit()
+                if PURGAR_CAMBIOS:
+                    purgar(co, lote.ids_cambio)
+                logger.info("Micro-lote hasta id_cambio=%s (%s entradas) en %.2fs: %s",
+                            lote.ultimo_id, lote.entradas, time.perf_counter() - inicio, resumen)
+                if lote.entradas >= TAM_LOTE_CAMBIOS and not lote.hueco:
+                    continue  # hay más pendiente: sin espera
+            if not continuo:
+                break
+            time.sleep(INTERVALO_CAMBIOS)
+        co.close(); cd.close()
+        return True
+    except KeyboardInterrupt:
+        logger.info("Consumo de cambios detenido")
+        return True
+    except Exception as e:
+        logger.error("Fallo consumo de cambios: %s", e, exc_info=LOG_LEVEL=='DEBUG')
         return False
 
 if __name__ == '__main__':
-    ejecutar_etl_incremental()
+    import argparse
+    parser = argparse.ArgumentParser(description="ETL incremental origen -> DataWarehouse")
+    parser.add_argument('--cambios', action='store_true', help="Consumir RegistroCambios en micro-lotes")
+    parser.add_argument('--continuo', action='store_true', help="Con --cambios: seguir esperando cambios nuevos")
+    args = parser.parse_args()
+    if args.cambios:
+        ejecutar_consumo_cambios(continuo=args.continuo)
+    else:
+        ejecutar_etl_incremental()
@@ -0,0 +1,89 @@
+"""Etapa de extracción compartida para HechoProyecto.
+
+Agrega ``Tarea`` y ``TareaEquipoHist`` una sola vez con ``GROUP BY id_proyecto``
+y une el resultado a ``Proyecto``, en lugar de subconsultas correlacionadas
+por proyecto. La usan tanto el ETL incremental (conexión a la BD origen) como
+el endpoint ``/ejecutar-etl`` (INSERT ... SELECT entre esquemas).
+
+Columnas devueltas (en este orden):
+    id_proyecto, id_cliente, id_empleado_gerente, id_equipo_principal,
+    fecha_inicio, fecha_fin_plan, fecha_fin_real, presupuesto, costo_real,
+    duracion_planificada, duracion_real, tareas_total, tareas_completadas,
+    tareas_canceladas, horas_plan_total, horas_reales_total
+"""
+from typing import Iterable, Optional, Sequence
+
+COLUMNAS_EXTRACCION_PROYECTO = (
+    'id_proyecto', 'id_cliente', 'id_empleado_gerente', 'id_equipo_principal',
+    'fecha_inicio', 'fecha_fin_plan', 'fecha_fin_real', 'presupuesto', 'costo_real',
+    'duracion_planificada', 'duracion_real', 'tareas_total', 'tareas_completadas',
+    'tareas_canceladas', 'horas_plan_total', 'horas_reales_total'
+)
+
+
+def sql_extraccion_proyectos(estados_proyecto: Sequence[int] = (3, 4),
+                             estado_tarea_completada: int = 3,
+                             estado_tarea_cancelada: int = 4,
+                             esquema: Optional[str] = None,
+                             ids_proyecto: Optional[Iterable[int]] = None) -> str:
+    """Construye el SELECT de extracción de proyectos con sus agregados de tareas.
+
+    Args:
+        estados_proyecto: id_estado de Proyecto a extraer (finalizados/cancelados).
+        estado_tarea_completada: id_estado que cuenta como tarea completada.
+        estado_tarea_cancelada: id_estado que cuenta como tarea cancelada.
+        esquema: Prefijo de esquema origen (p.ej. 'gestionproyectos_hist') cuando
+            la consulta se ejecuta desde otra base de datos.
+        ids_proyecto: Si se indica, restringe la extracción (y los agregados de
+            tareas) a esos proyectos; lo usa la carga incremental por marcas.
+
+    Returns:
+        SQL sin parámetros (los valores son enteros validados aquí).
+    """
+    pre = f"{esquema}." if esquema else ""
+    estados = ",".join(str(int(e)) for e in estados_proyecto)
+    completada = int(estado_tarea_completada)
+    cancelada = int(estado_tarea_cancelada)
+    filtro_ta = filtro_eq = filtro_p = ""
+    if ids_proyecto is not None:
+        ids = ",".join(str(int(i)) for i in ids_proyecto) or "NULL"
+        filtro_ta = f"WHERE id_proyecto IN ({ids})"
+        filtro_eq = f"WHERE t.id_proyecto IN ({ids})"
+        filtro_p = f"AND p.id_proyecto IN ({ids})"
+    return f"""
+        SELECT p.id_proyecto, p.id_cliente, p.id_empleado_gerente, eq.id_equipo AS id_equipo_principal,
+               p.fecha_inicio, p.fecha_fin_plan, p.fecha_fin_real, p.presupuesto, p.costo_real,
+               DATEDIFF(p.fecha_fin_plan, p.fecha_inicio) AS duracion_planificada,
+               DATEDIFF(COALESCE(p.fecha_fin_real, CURDATE()), p.fecha_inicio) AS duracion_real,
+               COALESCE(ta.tareas_total, 0) AS tareas_total,
+               COALESCE(ta.tareas_completadas, 0) AS tareas_completadas,
+               COALESCE(ta.tareas_canceladas, 0) AS tareas_canceladas,
+               COALESCE(ta.horas_plan_total, 0) AS horas_plan_total,
+               COALESCE(ta.horas_reales_total, 0) AS horas_reales_total
+        FROM {pre}Proyecto p
+        LEFT JOIN (
+            SELECT id_proyecto,
+                   COUNT(*) AS tareas_total,
+                   SUM(id_estado = {completada}) AS tareas_completadas,
+                   SUM(id_estado = {cancelada}) AS tareas_canceladas,
+                   SUM(horas_plan) AS horas_plan_total,
+                   SUM(horas_reales) AS horas_reales_total
+            FROM {pre}Tarea
+            {filtro_ta}
+            GROUP BY id_proyecto
+        ) ta ON ta.id_proyecto = p.id_proyecto
+        LEFT JOIN (
+            SELECT id_proyecto, id_equipo
+            FROM (
+                SELECT t.id_proyecto, teh.id_equipo,
+                       ROW_NUMBER() OVER (PARTITION BY t.id_proyecto
+                                          ORDER BY COUNT(*) DESC, MAX(teh.fecha_asignacion) DESC) AS rn
+                FROM {pre}TareaEquipoHist teh
+                JOIN {pre}Tarea t ON t.id_tarea = teh.id_tarea
+                {filtro_eq}
+                GROUP BY t.id_proyecto, teh.id_equipo
+            ) ranking
+            WHERE rn = 1
+        ) eq ON eq.id_proyecto = p.id_proyecto
+        WHERE p.id_estado IN ({estados}) {filtro_p}
+    """
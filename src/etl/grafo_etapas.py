@@ -0,0 +1,73 @@
+"""Ejecución de etapas del ETL como grafo de dependencias.
+
+Cada etapa declara de qué etapas depende; las que no tienen dependencias
+pendientes se lanzan en paralelo en un ``ThreadPoolExecutor`` y una etapa solo
+arranca cuando todas sus dependencias terminaron (y confirmaron) sin error.
+Si una etapa falla, no se lanzan más y la excepción se propaga al llamador.
+
+Uso típico::
+
+    resultados, tiempos = ejecutar_grafo([
+        Etapa('DimCliente', cargar_clientes),
+        Etapa('DimTiempo', cargar_tiempo),
+        Etapa('HechoProyecto', cargar_hechos, depende=('DimCliente', 'DimTiempo')),
+    ], max_hilos=4)
+"""
+import time
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Sequence, Tuple
+
+logger = logging.getLogger("etl.grafo_etapas")
+
+
+class Etapa:
+    """Unidad de trabajo del grafo: ``funcion()`` se invoca sin argumentos."""
+
+    def __init__(self, nombre: str, funcion: Callable[[], Any], depende: Sequence[str] = ()):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.depende = tuple(depende)
+
+
+def _medir(etapa: Etapa) -> Tuple[Any, float]:
+    inicio = time.perf_counter()
+    resultado = etapa.funcion()
+    return resultado, time.perf_counter() - inicio
+
+
+def ejecutar_grafo(etapas: Iterable[Etapa], max_hilos: int = 4) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """Ejecuta ``etapas`` respetando sus dependencias.
+
+    Returns:
+        (resultados, tiempos): resultado de cada etapa y sus segundos de ejecución.
+    """
+    pendientes = {e.nombre: e for e in etapas}
+    desconocidas = {d for e in pendientes.values() for d in e.depende} - set(pendientes)
+    if desconocidas:
+        raise ValueError(f"Dependencias inexistentes: {sorted(desconocidas)}")
+
+    resultados: Dict[str, Any] = {}
+    tiempos: Dict[str, float] = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_hilos), thread_name_prefix="etl") as ejecutor:
+        en_curso = {}
+        while pendientes or en_curso:
+            for nombre, etapa in list(pendientes.items()):
+                if all(d in resultados for d in etapa.depende):
+                    logger.debug("Lanzando etapa %s", nombre)
+                    en_curso[ejecutor.submit(_medir, etapa)] = nombre
+                    del pendientes[nombre]
+            if not en_curso:
+                raise ValueError(f"Dependencias cíclicas entre: {sorted(pendientes)}")
+            terminadas, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for futuro in terminadas:
+                nombre = en_curso.pop(futuro)
+                try:
+                    resultados[nombre], tiempos[nombre] = futuro.result()
+                except Exception:
+                    logger.error("Etapa %s falló; se cancelan las pendientes", nombre)
+                    for f in en_curso:
+                        f.cancel()
+                    raise
+                logger.info("Etapa %s completada en %.2fs", nombre, tiempos[nombre])
+    return resultados, tiempos
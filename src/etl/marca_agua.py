@@ -0,0 +1,136 @@
+"""Marcas de agua (high-water marks) para la extracción incremental.
+
+El DW guarda, por cada tabla origen, la marca temporal hasta la que ya se
+extrajo (tabla ``MarcaAguaETL``). Cada corrida:
+
+1. Toma ``NOW()`` del servidor origen como límite superior de la ventana.
+2. Extrae solo las filas con ``columna_marca`` en ``(marca - solape, limite]``.
+3. Escribe las nuevas marcas solo cuando todas las etapas de la carga ya
+   confirmaron (``guardar`` no hace commit; lo hace el llamador).
+
+Si la corrida falla antes de ese punto la marca no avanza y la siguiente
+corrida vuelve a procesar la misma ventana; como todas las cargas son upserts,
+reprocesar es inocuo. El solape (``ETL_CDC_SOLAPE_SEG``) cubre transacciones del
+origen que confirman filas con un timestamp anterior al límite ya leído.
+
+``ETL_CDC_COMPLETO=1`` ignora las marcas y fuerza una extracción completa.
+"""
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("etl.marca_agua")
+
+TABLA_MARCAS = 'MarcaAguaETL'
+SOLAPE = timedelta(seconds=int(os.getenv("ETL_CDC_SOLAPE_SEG", "300")))
+COMPLETO = os.getenv("ETL_CDC_COMPLETO", "0") in {"1", "true", "True"}
+
+# Orden de preferencia: solo fecha_actualizacion detecta modificaciones; las
+# columnas de creación/registro solo detectan altas.
+COLUMNAS_CANDIDATAS = ('fecha_actualizacion', 'fecha_creacion', 'fecha_registro')
+
+
+def columna_marca(cursor: Any, tabla: str) -> Optional[str]:
+    """Columna temporal de ``tabla`` (BD origen actual) usable como marca, o None."""
+    cursor.execute(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name IN (%s,%s,%s)",
+        (tabla,) + COLUMNAS_CANDIDATAS
+    )
+    disponibles = {r[0].lower() for r in cursor.fetchall()}
+    for c in COLUMNAS_CANDIDATAS:
+        if c in disponibles:
+            if c != 'fecha_actualizacion':
+                logger.warning("%s sin fecha_actualizacion: solo se detectarán altas (%s)", tabla, c)
+            return c
+    logger.warning("%s sin columna temporal: se extrae completa en cada corrida", tabla)
+    return None
+
+
+class MarcasAgua:
+    """Marcas por tabla origen, leídas y escritas en la conexión destino."""
+
+    def __init__(self, conexion_origen: Any, conexion_destino: Any):
+        self.origen = conexion_origen
+        self.destino = conexion_destino
+        self.limite: Optional[datetime] = None
+        self._marcas: Dict[str, datetime] = {}
+        self._columnas: Dict[str, Optional[str]] = {}
+        self._filas: Dict[str, int] = {}
+
+    def cargar(self, limite: Optional[datetime] = None) -> None:
+        """Crea la tabla de marcas si falta, lee las marcas y fija el límite de la ventana.
+
+        ``limite`` reutiliza el de una corrida interrumpida (puntos de control)
+        en lugar de tomar ``NOW()`` del origen, para reanudar la misma ventana.
+        """
+        d = self.destino.cursor()
+        try:
+            d.execute(f"""CREATE TABLE IF NOT EXISTS {TABLA_MARCAS} (
+                tabla_origen        VARCHAR(64) PRIMARY KEY,
+                columna_marca       VARCHAR(64),
+                marca               DATETIME NOT NULL,
+                filas_ultima_carga  INT DEFAULT 0,
+                fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB""")
+            d.execute(f"SELECT tabla_origen, marca FROM {TABLA_MARCAS}")
+            self._marcas = {t: m for t, m in d.fetchall()}
+        finally:
+            d.close()
+        if limite is not None:
+            self.limite = limite
+            return
+        o = self.origen.cursor()
+        try:
+            o.execute("SELECT NOW()")
+            self.limite = o.fetchone()[0]
+        finally:
+            o.close()
+
+    def columna(self, tabla: str) -> Optional[str]:
+        if tabla not in self._columnas:
+            o = self.origen.cursor()
+            try:
+                self._columnas[tabla] = columna_marca(o, tabla)
+            finally:
+                o.close()
+        return self._columnas[tabla]
+
+    def ventana(self, tabla: str) -> Tuple[Optional[datetime], datetime]:
+        """``(desde, hasta)`` para ``tabla``; ``desde`` es None si hay que extraer todo."""
+        marca = None if COMPLETO else self._marcas.get(tabla)
+        return (marca - SOLAPE if marca else None), self.limite
+
+    def filtro(self, tabla: str, alias: str = '') -> Tuple[str, tuple]:
+        """Condición SQL (sin WHERE/AND) y parámetros de los cambios de ``tabla``.
+
+        Devuelve ``('1=1', ())`` cuando la extracción debe ser completa.
+        """
+        columna = self.columna(tabla)
+        desde, hasta = self.ventana(tabla)
+        if columna is None or desde is None:
+            return '1=1', ()
+        ref = f"{alias}.{columna}" if alias else columna
+        return f"{ref} > %s AND {ref} <= %s", (desde, hasta)
+
+    def registrar(self, tabla: str, filas: int) -> None:
+        """Anota que ``tabla`` se procesó hasta el límite de esta corrida."""
+        self._filas[tabla] = self._filas.get(tabla, 0) + filas
+
+    def guardar(self) -> None:
+        """Escribe las marcas registradas. No hace commit: lo hace el llamador al cerrar la carga."""
+        if not self._filas:
+            return
+        d = self.destino.cursor()
+        try:
+            for tabla, filas in self._filas.items():
+                d.execute(
+                    f"""INSERT INTO {TABLA_MARCAS} (tabla_origen, columna_marca, marca, filas_ultima_carga)
+                    VALUES (%s,%s,%s,%s)
+                    ON DUPLICATE KEY UPDATE columna_marca=VALUES(columna_marca), marca=VALUES(marca),
+                    filas_ultima_carga=VALUES(filas_ultima_carga)""",
+                    (tabla, self._columnas.get(tabla), self.limite, filas)
+                )
+        finally:
+            d.close()
@@ -0,0 +1,159 @@
+"""Extracción por rangos de clave primaria con puntos de control reanudables.
+
+Cada etapa recorre su tabla origen en páginas ``pk > ultima_clave ORDER BY pk
+LIMIT n``. Tras cargar cada página, la última clave se guarda en
+``PuntoControlETL`` (DW) en la misma transacción que los datos de la página.
+Si la corrida se cae, la siguiente retoma cada etapa desde su último punto de
+control, con el mismo límite de ventana de marcas de agua, en lugar de
+empezar de cero. Las etapas que ya terminaron no se repiten.
+
+Una página que falla por un error transitorio (conexión perdida, deadlock,
+espera de bloqueo) se reintenta con espera exponencial (``ETL_REINTENTOS``,
+``ETL_ESPERA_BASE``) tras reconectar; solo si se agotan los reintentos se
+aborta la corrida.
+"""
+import os
+import time
+import random
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Sequence
+
+logger = logging.getLogger("etl.puntos_control")
+
+TABLA_PUNTOS = 'PuntoControlETL'
+REINTENTOS = int(os.getenv("ETL_REINTENTOS", "3"))
+ESPERA_BASE = float(os.getenv("ETL_ESPERA_BASE", "1"))
+
+# Bloqueo (1205), deadlock (1213), servidor desconectado/conexión perdida (2006, 2013, 2055)
+ERRORES_TRANSITORIOS = {1205, 1213, 2006, 2013, 2055}
+
+
+def reintentar(funcion: Callable[[], Any], conexiones: Sequence[Any] = (),
+               intentos: int = REINTENTOS, espera: float = ESPERA_BASE) -> Any:
+    """Ejecuta ``funcion`` reintentando errores transitorios con espera exponencial."""
+    for intento in range(intentos + 1):
+        try:
+            return funcion()
+        except Exception as e:
+            if intento >= intentos or getattr(e, 'errno', None) not in ERRORES_TRANSITORIOS:
+                raise
+            pausa = espera * (2 ** intento) + random.uniform(0, espera)
+            logger.warning("Error transitorio (%s); reintento %s/%s en %.1fs", e, intento + 1, intentos, pausa)
+            time.sleep(pausa)
+            for conexion in conexiones:
+                try:
+                    conexion.ping(reconnect=True, attempts=3, delay=1)
+                except Exception as e_ping:
+                    logger.warning("No se pudo reconectar: %s", e_ping)
+
+
+class PuntosControl:
+    """Puntos de control por etapa de la corrida en curso (tabla ``PuntoControlETL``)."""
+
+    def __init__(self, conexion_destino: Any):
+        self.conexion = conexion_destino
+        self.limite: Optional[datetime] = None
+        self._etapas: Dict[str, Dict[str, Any]] = {}
+
+    def cargar(self) -> bool:
+        """Lee los puntos pendientes. Devuelve True si hay una corrida interrumpida que reanudar."""
+        cur = self.conexion.cursor()
+        try:
+            cur.execute(f"""CREATE TABLE IF NOT EXISTS {TABLA_PUNTOS} (
+                etapa               VARCHAR(64) PRIMARY KEY,
+                limite              DATETIME NULL,
+                ultima_clave        BIGINT NOT NULL DEFAULT 0,
+                filas               INT NOT NULL DEFAULT 0,
+                completada          TINYINT(1) NOT NULL DEFAULT 0,
+                fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB""")
+            cur.execute(f"SELECT etapa, limite, ultima_clave, filas, completada FROM {TABLA_PUNTOS}")
+            self._etapas = {}
+            for etapa, limite, ultima, filas, completada in cur.fetchall():
+                self._etapas[etapa] = {'ultima_clave': int(ultima), 'filas': int(filas), 'completada': bool(completada)}
+                self.limite = self.limite or limite
+        finally:
+            cur.close()
+        if self._etapas:
+            logger.info("Reanudando corrida interrumpida (límite %s): %s", self.limite, self._etapas)
+        return bool(self._etapas)
+
+    def estado(self, etapa: str) -> Dict[str, Any]:
+        return self._etapas.get(etapa, {'ultima_clave': 0, 'filas': 0, 'completada': False})
+
+    def registrar(self, cursor: Any, etapa: str, ultima_clave: int, filas: int, completada: bool = False) -> None:
+        """Guarda el punto de control de ``etapa``. No hace commit: va con los datos de la página."""
+        cursor.execute(
+            f"""INSERT INTO {TABLA_PUNTOS} (etapa, limite, ultima_clave, filas, completada) VALUES (%s,%s,%s,%s,%s)
+            ON DUPLICATE KEY UPDATE limite=VALUES(limite), ultima_clave=VALUES(ultima_clave),
+            filas=VALUES(filas), completada=VALUES(completada)""",
+            (etapa, self.limite, ultima_clave, filas, int(completada))
+        )
+
+    def limpiar(self, cursor: Any) -> None:
+        """Borra los puntos de la corrida (al terminar bien). No hace commit."""
+        cursor.execute(f"DELETE FROM {TABLA_PUNTOS}")
+        self._etapas = {}
+
+
+def cargar_por_rangos(co: Any, cd: Any, etapa: str, sql_pagina: str, params: Sequence[Any],
+                      procesar: Callable[[Any, Any, list], Dict[str, Any]], tam: int,
+                      puntos: Optional[PuntosControl] = None, confirmar: bool = True) -> Dict[str, Any]:
+    """Recorre ``sql_pagina`` por rangos de clave y aplica ``procesar`` a cada página.
+
+    Args:
+        sql_pagina: SELECT cuya primera columna es la clave, terminado en
+            ``... > %s ORDER BY <clave> LIMIT %s`` (se agregan ``desde`` y ``tam``).
+        procesar: ``procesar(cursor_origen, cursor_destino, filas) -> dict`` de
+            contadores; no debe hacer commit.
+        puntos: Puntos de control; None para no reanudar ni registrar (micro-lotes).
+        confirmar: Cada página es su propia transacción y se reintenta si falla.
+            Con False no hay commit, rollback ni reintentos: la transacción es
+            del llamador (micro-lotes, dry-run).
+
+    Returns:
+        Suma de los contadores de ``procesar`` más 'procesados' y 'paginas'.
+    """
+    previo = puntos.estado(etapa) if puntos else {'ultima_clave': 0, 'filas': 0, 'completada': False}
+    if previo['completada']:
+        logger.info("Etapa %s ya completada en la corrida interrumpida; se omite", etapa)
+        return {'procesados': previo['filas'], 'reanudada': True, 'omitida': True}
+    desde, procesados = previo['ultima_clave'], previo['filas']
+    resumen: Dict[str, Any] = {'procesados': procesados, 'paginas': 0}
+    if desde:
+        resumen['reanudada_desde'] = desde
+
+    def pagina():
+        o = co.cursor(); d = cd.cursor()
+        try:
+            o.execute(sql_pagina, tuple(params) + (desde, tam))
+            filas = o.fetchall()
+            carga = procesar(o, d, filas) if filas else {}
+            if puntos:
+                ultima = filas[-1][0] if filas else desde
+                puntos.registrar(d, etapa, ultima, procesados + len(filas), completada=not filas)
+            if confirmar:
+                cd.commit()
+            return filas, carga
+        except Exception:
+            if confirmar:
+                try:
+                    cd.rollback()
+                except Exception:
+                    pass
+            raise
+        finally:
+            o.close(); d.close()
+
+    while True:
+        filas, carga = reintentar(pagina, conexiones=(co, cd)) if confirmar else pagina()
+        if not filas:
+            break
+        desde = filas[-1][0]; procesados += len(filas)
+        resumen['procesados'] = procesados; resumen['paginas'] += 1
+        for k, v in carga.items():
+            if isinstance(v, (int, float)) and not isinstance(v, bool):
+                resumen[k] = resumen.get(k, 0) + v
+        logger.debug("%s: %s filas (clave <= %s)", etapa, procesados, desde)
+    return resumen
@@ -0,0 +1,144 @@
+"""Recarga completa blue/green del DataWarehouse.
+
+En vez de vaciar las tablas vivas (TRUNCATE/DELETE) y recargarlas, la recarga
+se construye en tablas sombra ``<Tabla>_next`` (creadas ``LIKE`` la tabla viva,
+con sus mismos índices) y al final se publican con un único ``RENAME TABLE``,
+que MySQL aplica de forma atómica para todas las tablas. Los lectores ven el
+DW anterior completo hasta el instante del cambio y el nuevo completo después.
+
+Las tablas reemplazadas quedan como ``<Tabla>_prev`` para revertir al instante
+con ``revertir_publicacion`` (que es su propia inversa: volver a llamarla
+restablece la última recarga).
+
+Las vistas se resuelven por nombre en cada consulta, así que siguen apuntando
+a las tablas publicadas sin tener que recrearlas. Las claves foráneas no: en
+InnoDB ``RENAME TABLE`` se lleva las referencias con la tabla y ``CREATE TABLE
+... LIKE`` no copia ninguna. Por eso:
+
+- DimTiempo no se intercambia. Solo acumula fechas, así que se carga en la
+  tabla viva, y HechoOKR (BSC) puede seguir referenciándola.
+- ``preparar_tablas_nuevas`` replica en cada sombra las claves foráneas de la
+  tabla viva, apuntando a la sombra del padre si también se intercambia. Tras
+  el RENAME quedan entre tablas vivas.
+- Ninguna tabla fuera del intercambio puede referenciar a una de dentro: tras
+  el RENAME quedaría apuntando a ``*_prev``. ``preparar_tablas_nuevas`` lo
+  rechaza antes de empezar.
+- Los DROP de sombras y ``*_prev`` van con ``FOREIGN_KEY_CHECKS=0`` en la
+  sesión: entre ellas pueden referenciarse en cualquier orden.
+"""
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+logger = logging.getLogger("etl.recarga_completa")
+
+SUFIJO_NUEVA = '_next'
+SUFIJO_ANTERIOR = '_prev'
+
+TABLAS_DW = ('DimCliente', 'DimEmpleado', 'DimEquipo', 'DimProyecto', 'HechoProyecto', 'HechoTarea')
+
+
+@contextmanager
+def _sin_revisar_claves(cursor: Any) -> Iterator[None]:
+    """``FOREIGN_KEY_CHECKS=0`` en la sesión mientras dura el bloque (luego se restablece)."""
+    cursor.execute("SET @fk_previo = @@FOREIGN_KEY_CHECKS, FOREIGN_KEY_CHECKS = 0")
+    try:
+        yield
+    finally:
+        cursor.execute("SET FOREIGN_KEY_CHECKS = @fk_previo")
+
+
+def claves_foraneas(cursor: Any, tablas: Sequence[str]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """Claves foráneas que salen de ``tablas`` o llegan a ellas.
+
+    Returns:
+        (tabla, constraint) -> {'columnas', 'tabla_ref', 'columnas_ref', 'al_borrar', 'al_actualizar'}
+    """
+    marcas = ','.join(['%s'] * len(tablas))
+    cursor.execute(
+        "SELECT k.TABLE_NAME, k.CONSTRAINT_NAME, k.COLUMN_NAME, k.REFERENCED_TABLE_NAME, "
+        "k.REFERENCED_COLUMN_NAME, r.DELETE_RULE, r.UPDATE_RULE "
+        "FROM information_schema.KEY_COLUMN_USAGE k "
+        "JOIN information_schema.REFERENTIAL_CONSTRAINTS r "
+        "ON r.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME "
+        "AND r.TABLE_NAME = k.TABLE_NAME "
+        "WHERE k.TABLE_SCHEMA = DATABASE() AND k.REFERENCED_TABLE_NAME IS NOT NULL "
+        f"AND (k.TABLE_NAME IN ({marcas}) OR k.REFERENCED_TABLE_NAME IN ({marcas})) "
+        "ORDER BY k.TABLE_NAME, k.CONSTRAINT_NAME, k.ORDINAL_POSITION",
+        tuple(tablas) * 2
+    )
+    claves: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for tabla, nombre, columna, tabla_ref, columna_ref, al_borrar, al_actualizar in cursor.fetchall():
+        clave = claves.setdefault((tabla, nombre), {'columnas': [], 'tabla_ref': tabla_ref, 'columnas_ref': [],
+                                                    'al_borrar': al_borrar, 'al_actualizar': al_actualizar})
+        clave['columnas'].append(columna)
+        clave['columnas_ref'].append(columna_ref)
+    return claves
+
+
+def preparar_tablas_nuevas(cursor: Any, tablas: Sequence[str] = TABLAS_DW, copiar: Iterable[str] = ()) -> None:
+    """Crea ``<tabla>_next`` vacías con la estructura y las claves foráneas de las vivas.
+
+    ``copiar`` lista tablas cuyo contenido actual se arrastra a la sombra.
+    """
+    claves = claves_foraneas(cursor, tablas)
+    externas = [f"{tabla}.{nombre} -> {c['tabla_ref']}" for (tabla, nombre), c in claves.items() if tabla not in tablas]
+    if externas:
+        raise RuntimeError("Claves foráneas hacia tablas de la recarga desde fuera de ella: " + ", ".join(externas))
+    copiar = set(copiar)
+    with _sin_revisar_claves(cursor):
+        cursor.execute("DROP TABLE IF EXISTS " + ", ".join(t + SUFIJO_NUEVA for t in tablas))
+    for tabla in tablas:
+        nueva = tabla + SUFIJO_NUEVA
+        cursor.execute(f"CREATE TABLE {nueva} LIKE {tabla}")
+        if tabla in copiar:
+            cursor.execute(f"INSERT INTO {nueva} SELECT * FROM {tabla}")
+    nuevas: List[str] = []
+    for (tabla, _), c in claves.items():
+        # Sin nombre: MySQL genera <tabla>_next_ibfk_N y lo renombra con la tabla
+        ref = c['tabla_ref'] + SUFIJO_NUEVA if c['tabla_ref'] in tablas else c['tabla_ref']
+        cursor.execute(
+            f"ALTER TABLE {tabla}{SUFIJO_NUEVA} ADD FOREIGN KEY ({','.join(c['columnas'])}) "
+            f"REFERENCES {ref} ({','.join(c['columnas_ref'])}) "
+            f"ON DELETE {c['al_borrar']} ON UPDATE {c['al_actualizar']}"
+        )
+        nuevas.append(f"{tabla}->{c['tabla_ref']}")
+    logger.info("Tablas sombra preparadas: %s (claves foráneas: %s)", ", ".join(tablas), ", ".join(nuevas) or "ninguna")
+
+
+def publicar_tablas_nuevas(cursor: Any, tablas: Sequence[str] = TABLAS_DW) -> None:
+    """Intercambia vivas y sombras en un solo ``RENAME TABLE`` (atómico).
+
+    Las vivas pasan a ``<tabla>_prev`` (se descarta la copia anterior).
+    """
+    with _sin_revisar_claves(cursor):
+        cursor.execute("DROP TABLE IF EXISTS " + ", ".join(t + SUFIJO_ANTERIOR for t in tablas))
+    pares = []
+    for tabla in tablas:
+        pares.append(f"{tabla} TO {tabla}{SUFIJO_ANTERIOR}")
+        pares.append(f"{tabla}{SUFIJO_NUEVA} TO {tabla}")
+    cursor.execute("RENAME TABLE " + ", ".join(pares))
+    logger.info("Recarga publicada (anteriores en *%s)", SUFIJO_ANTERIOR)
+
+
+def puede_revertir(cursor: Any, tablas: Sequence[str] = TABLAS_DW) -> bool:
+    """True si existen todas las ``<tabla>_prev``."""
+    nombres = [t + SUFIJO_ANTERIOR for t in tablas]
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = DATABASE() "
+        f"AND table_name IN ({','.join(['%s'] * len(nombres))})",
+        nombres
+    )
+    return int(cursor.fetchall()[0][0]) == len(nombres)
+
+
+def revertir_publicacion(cursor: Any, tablas: Sequence[str] = TABLAS_DW) -> None:
+    """Intercambia ``<tabla>`` y ``<tabla>_prev`` en un solo ``RENAME TABLE``."""
+    if not puede_revertir(cursor, tablas):
+        raise RuntimeError("No hay recarga anterior (*_prev) para revertir")
+    pares = []
+    for tabla in tablas:
+        tmp = f"{tabla}_swap"
+        pares += [f"{tabla} TO {tmp}", f"{tabla}{SUFIJO_ANTERIOR} TO {tabla}", f"{tmp} TO {tabla}{SUFIJO_ANTERIOR}"]
+    cursor.execute("RENAME TABLE " + ", ".join(pares))
+    logger.info("Recarga revertida")
@@ -0,0 +1,155 @@
+"""Lectura del registro de cambios del origen (tabla ``RegistroCambios``).
+
+Los triggers de ``01_GestionProyectos/scripts/registro_cambios.sql`` anotan
+cada INSERT/UPDATE/DELETE como ``(tabla, id_registro, id_padre, operacion)``.
+Este módulo lee esas entradas en micro-lotes ordenados por ``id_cambio`` y las
+compacta por registro: solo importa la última operación de cada fila.
+
+El puntero de consumo (último ``id_cambio`` aplicado) vive en el DW, en la
+tabla ``ConsumoCambiosETL``, y se escribe en la misma transacción que los datos
+del micro-lote, así que un fallo simplemente vuelve a entregar el lote.
+
+``id_cambio`` se asigna al insertar, no al confirmar: una transacción larga
+puede confirmar una entrada con id menor que otras ya visibles. Por eso la
+lectura se detiene en el primer hueco de ids mientras la entrada siguiente sea
+más reciente que ``ETL_CAMBIOS_ESPERA_HUECO_SEG`` (pasado ese tiempo el hueco
+se toma por un rollback). Y como solo se purgan los ids efectivamente
+aplicados, una entrada que igual llegue tarde queda en la tabla por debajo del
+puntero y se recoge como rezagada en el lote siguiente.
+"""
+import os
+import logging
+from typing import Any, Dict, List, Set
+
+logger = logging.getLogger("etl.registro_cambios")
+
+TABLA_REGISTRO = 'RegistroCambios'
+TABLA_CONSUMO = 'ConsumoCambiosETL'
+ESPERA_HUECO_SEG = float(os.getenv('ETL_CAMBIOS_ESPERA_HUECO_SEG', '10'))
+TAM_PURGA = 1000
+
+
+class LoteCambios:
+    """Cambios compactados de un micro-lote."""
+
+    def __init__(self, desde_id: int = 0):
+        self.ultimo_id = desde_id
+        self.entradas = 0
+        self.ids_cambio: List[int] = []          # entradas leídas (las que se pueden purgar)
+        self.hueco = False                       # la lectura se detuvo en un id aún no visible
+        self.vivos: Dict[str, Set[int]] = {}      # tabla -> ids insertados/actualizados
+        self.borrados: Dict[str, Set[int]] = {}   # tabla -> ids cuya última operación fue D
+        self.padres: Dict[str, Set[int]] = {}     # tabla -> ids padre (id_proyecto / id_tarea)
+
+    def __bool__(self) -> bool:
+        return self.entradas > 0
+
+    def ids(self, tabla: str) -> Set[int]:
+        """Todos los ids tocados de ``tabla`` (vivos y borrados)."""
+        return self.vivos.get(tabla, set()) | self.borrados.get(tabla, set())
+
+    def agregar(self, id_cambio: int, tabla: str, id_registro: int, id_padre: Any, operacion: str) -> None:
+        self.ultimo_id = max(self.ultimo_id, id_cambio)
+        self.entradas += 1
+        self.ids_cambio.append(id_cambio)
+        if operacion == 'D':
+            self.vivos.get(tabla, set()).discard(id_registro)
+            self.borrados.setdefault(tabla, set()).add(id_registro)
+        else:
+            self.borrados.get(tabla, set()).discard(id_registro)
+            self.vivos.setdefault(tabla, set()).add(id_registro)
+        if id_padre is not None:
+            self.padres.setdefault(tabla, set()).add(id_padre)
+
+
+def leer_lote(conexion_origen: Any, desde_id: int, limite: int, rezagados: bool = False,
+              espera_hueco: float = ESPERA_HUECO_SEG) -> LoteCambios:
+    """Lee hasta ``limite`` entradas con ``id_cambio > desde_id``, sin saltar huecos recientes.
+
+    Con ``rezagados`` (solo si se purga lo aplicado) incluye además las
+    entradas con ``id_cambio <= desde_id`` que siguen en la tabla: llegaron
+    después de que el puntero las pasara. No mueven el puntero.
+    """
+    lote = LoteCambios(desde_id)
+    cur = conexion_origen.cursor()
+    try:
+        if rezagados:
+            cur.execute(
+                f"SELECT id_cambio, tabla, id_registro, id_padre, operacion FROM {TABLA_REGISTRO} "
+                "WHERE id_cambio <= %s ORDER BY id_cambio LIMIT %s",
+                (desde_id, limite)
+            )
+            for fila in cur.fetchall():
+                lote.agregar(*fila)
+            if lote.entradas:
+                logger.warning("%s entradas rezagadas por debajo de id_cambio=%s", lote.entradas, desde_id)
+        cur.execute(
+            f"SELECT id_cambio, tabla, id_registro, id_padre, operacion, "
+            "fecha_hora <= NOW(3) - INTERVAL %s SECOND AS asentada FROM {TABLA_REGISTRO} "
+            "WHERE id_cambio > %s ORDER BY id_cambio LIMIT %s",
+            (espera_hueco, desde_id, max(0, limite - lote.entradas))
+        )
+        esperado = desde_id + 1
+        for id_cambio, tabla, id_registro, id_padre, operacion, asentada in cur.fetchall():
+            if id_cambio != esperado and not asentada:
+                # Los ids que faltan pueden ser de una transacción aún sin confirmar
+                lote.hueco = True
+                break
+            lote.agregar(id_cambio, tabla, id_registro, id_padre, operacion)
+            esperado = id_cambio + 1
+    finally:
+        cur.close()
+    return lote
+
+
+def purgar(conexion_origen: Any, ids_cambio: List[int]) -> int:
+    """Borra del origen exactamente las entradas aplicadas (``ids_cambio``) y confirma."""
+    borradas = 0
+    cur = conexion_origen.cursor()
+    try:
+        for i in range(0, len(ids_cambio), TAM_PURGA):
+            tramo = ids_cambio[i:i + TAM_PURGA]
+            cur.execute(f"DELETE FROM {TABLA_REGISTRO} WHERE id_cambio IN ({','.join(['%s'] * len(tramo))})",
+                        tuple(tramo))
+            borradas += cur.rowcount
+    finally:
+        cur.close()
+    conexion_origen.commit()
+    return borradas
+
+
+class PunteroConsumo:
+    """Último ``id_cambio`` aplicado por un consumidor, guardado en el DW."""
+
+    def __init__(self, conexion_destino: Any, consumidor: str = 'etl_incremental'):
+        self.conexion = conexion_destino
+        self.consumidor = consumidor
+        self.ultimo_id = 0
+
+    def cargar(self) -> int:
+        cur = self.conexion.cursor()
+        try:
+            cur.execute(f"""CREATE TABLE IF NOT EXISTS {TABLA_CONSUMO} (
+                consumidor          VARCHAR(64) PRIMARY KEY,
+                ultimo_id_cambio    BIGINT NOT NULL DEFAULT 0,
+                fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB""")
+            cur.execute(f"SELECT ultimo_id_cambio FROM {TABLA_CONSUMO} WHERE consumidor = %s", (self.consumidor,))
+            fila = cur.fetchone()
+            self.ultimo_id = int(fila[0]) if fila else 0
+        finally:
+            cur.close()
+        return self.ultimo_id
+
+    def avanzar(self, id_cambio: int) -> None:
+        """Registra ``id_cambio`` como aplicado. No hace commit: va con los datos del lote."""
+        cur = self.conexion.cursor()
+        try:
+            cur.execute(
+                f"""INSERT INTO {TABLA_CONSUMO} (consumidor, ultimo_id_cambio) VALUES (%s,%s)
+                ON DUPLICATE KEY UPDATE ultimo_id_cambio=VALUES(ultimo_id_cambio)""",
+                (self.consumidor, id_cambio)
+            )
+        finally:
+            cur.close()
+        self.ultimo_id = id_cambio
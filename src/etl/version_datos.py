@@ -0,0 +1,37 @@
+"""Versión de los datos del DataWarehouse (tabla ``VersionDatosDW``).
+
+Un contador que toda carga incrementa en la misma transacción con la que
+confirma sus datos (ETL incremental, consumo de cambios, recarga completa de
+``/ejecutar-etl``). Los lectores, como la caché de respuestas del dashboard,
+etiquetan lo que calculan con la versión leída y lo descartan en cuanto cambia.
+"""
+from typing import Any
+
+TABLA_VERSION = 'VersionDatosDW'
+
+
+def asegurar_tabla_version(cursor: Any) -> None:
+    """Crea la tabla si falta. Es DDL (commit implícito): llamar antes de la transacción de carga."""
+    cursor.execute(f"""CREATE TABLE IF NOT EXISTS {TABLA_VERSION} (
+        id                  TINYINT PRIMARY KEY,
+        version             BIGINT NOT NULL DEFAULT 0,
+        fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB""")
+
+
+def incrementar_version(cursor: Any) -> None:
+    """Incrementa la versión de los datos. No hace commit: va con la carga."""
+    cursor.execute(f"INSERT INTO {TABLA_VERSION} (id, version) VALUES (1, 1) "
+                   "ON DUPLICATE KEY UPDATE version = version + 1")
+
+
+def leer_version(cursor: Any) -> int:
+    """Versión actual (0 si nunca se registró una carga o la tabla no existe)."""
+    try:
+        cursor.execute(f"SELECT version FROM {TABLA_VERSION} WHERE id = 1")
+    except Exception as e:
+        if getattr(e, 'errno', None) == 1146:  # tabla inexistente
+            return 0
+        raise
+    fila = cursor.fetchone()
+    return int(fila[0]) if fila else 0
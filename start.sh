@@ -15,6 +15,8 @@ fi
 # Configurar variables de entorno
 export FLASK_ENV=${FLASK_ENV:-production}
 export PORT=${PORT:-5001}
+# Hilos por worker; config_conexion dimensiona los pools de MySQL (DB_POOL_TAMANO) con este valor
+export GUNICORN_THREADS=${GUNICORN_THREADS:-24}
 
 echo "🔧 Variables de entorno:"
 echo "   FLASK_ENV: $FLASK_ENV"
@@ -41,7 +43,9 @@ if [ "$FLASK_ENV" = "production" ]; then
     echo "🌐 Iniciando en 0.0.0.0:$PORT"
     
     # Usar python -m para asegurar que encuentra gunicorn
-    exec python3 -m gunicorn --bind 0.0.0.0:$PORT --workers 2 --timeout 120 --access-logfile - --error-logfile - app:app
+    # gthread: cada conexión SSE (/eventos) ocupa un hilo, no el worker entero.
+    # Los hilos deben superar EVENTOS_MAX_CLIENTES (16) para dejar lugar a los requests normales.
+    exec python3 -m gunicorn --bind 0.0.0.0:$PORT --workers 2 --worker-class gthread --threads $GUNICORN_THREADS --timeout 120 --access-logfile - --error-logfile - app:app
 else
     echo "🔧 Modo desarrollo: usando Flask dev server"
     exec python3 app.py
@@ -0,0 +1,13 @@
+"""
+Rutas de importación para las pruebas: los módulos del dashboard y del ETL se
+importan como en producción (desde su propio directorio).
+"""
+
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for ruta in (RAIZ, os.path.join(RAIZ, 'src', 'etl'), os.path.join(RAIZ, '03_Dashboard', 'backend')):
+    if ruta not in sys.path:
+        sys.path.insert(0, ruta)
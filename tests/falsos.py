@@ -0,0 +1,48 @@
+"""Conexiones y cursores DB-API mínimos para probar la lógica del ETL sin MySQL"""
+
+
+class CursorGuionado:
+    """Devuelve en orden los resultados de ``guion`` a cada ``fetchall``/``fetchone``.
+
+    ``guion`` puede ser una lista de resultados o una función ``(sql, params) -> filas``.
+    """
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.filas = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=()):
+        self.conexion.ejecutadas.append((sql, tuple(params)))
+        guion = self.conexion.guion
+        self.filas = guion(sql, tuple(params)) if callable(guion) else (guion.pop(0) if guion else [])
+        self.rowcount = len(self.filas) if sql.lstrip().upper().startswith('SELECT') else len(params)
+
+    def fetchall(self):
+        return list(self.filas)
+
+    def fetchone(self):
+        return self.filas[0] if self.filas else None
+
+    def close(self):
+        pass
+
+
+class ConexionGuionada:
+    def __init__(self, guion=None):
+        self.guion = [] if guion is None else guion
+        self.ejecutadas = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, *args, **kwargs):
+        return CursorGuionado(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def ping(self, **kwargs):
+        pass
@@ -0,0 +1,132 @@
+"""Pruebas de la caché LRU/TTL por versión y del cálculo único (una_vez)"""
+
+import threading
+
+import pytest
+
+import cache_respuestas
+from cache_respuestas import CacheRespuestas
+
+
+def test_lru_desaloja_la_menos_usada():
+    cache = CacheRespuestas(max_entradas=2, ttl_seg=60)
+    cache.guardar('a', 1, 'A')
+    cache.guardar('b', 1, 'B')
+    assert cache.obtener('a', 1) == 'A'  # 'a' pasa a ser la más reciente
+    cache.guardar('c', 1, 'C')
+    assert cache.obtener('b', 1) is None
+    assert cache.obtener('a', 1) == 'A'
+    assert cache.estadisticas()['evictions'] == 1
+
+
+def test_ttl_expira(monkeypatch):
+    ahora = [1000.0]
+    monkeypatch.setattr(cache_respuestas.time, 'monotonic', lambda: ahora[0])
+    cache = CacheRespuestas(max_entradas=4, ttl_seg=10)
+    cache.guardar('a', 1, 'A')
+    ahora[0] += 9.9
+    assert cache.obtener('a', 1) == 'A'
+    ahora[0] += 0.2
+    assert cache.obtener('a', 1) is None
+    assert cache.estadisticas()['expiradas'] == 1
+
+
+def test_otra_version_invalida_la_entrada():
+    cache = CacheRespuestas(max_entradas=4, ttl_seg=60)
+    cache.guardar('a', 1, 'A')
+    assert cache.obtener('a', 2) is None
+    assert cache.obtener('a', 1) is None  # se descartó, no convive con la nueva
+    stats = cache.estadisticas()
+    assert stats['invalidadas'] == 1 and stats['entradas'] == 0
+
+
+def test_invalidar_conserva_la_version_vigente():
+    cache = CacheRespuestas(max_entradas=4, ttl_seg=60)
+    cache.guardar('a', 1, 'A')
+    cache.guardar('b', 2, 'B')
+    assert cache.invalidar(2) == 1
+    assert cache.obtener('b', 2) == 'B'
+    assert cache.invalidar() == 1
+    assert cache.estadisticas()['entradas'] == 0
+
+
+def test_inactiva_sin_ttl_o_sin_entradas():
+    assert not CacheRespuestas(max_entradas=0, ttl_seg=60).activa
+    assert not CacheRespuestas(max_entradas=4, ttl_seg=0).activa
+    assert CacheRespuestas(max_entradas=4, ttl_seg=60).activa
+
+
+def _concurrentes(n, cache, clave, version, funcion):
+    resultados, errores = [], []
+
+    def hilo():
+        try:
+            resultados.append(cache.una_vez(clave, version, funcion))
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=hilo) for _ in range(n)]
+    for h in hilos:
+        h.start()
+    return hilos, resultados, errores
+
+
+def _esperar_en_vuelo(cache, esperados):
+    for _ in range(500):
+        if cache.estadisticas()['coalesced'] >= esperados:
+            return
+        threading.Event().wait(0.01)
+    pytest.fail('los hilos no llegaron a esperar el cálculo en curso')
+
+
+def test_una_vez_calcula_una_sola_vez_entre_hilos():
+    cache = CacheRespuestas(max_entradas=4, ttl_seg=60, coalescer=True)
+    liberar = threading.Event()
+    llamadas = []
+
+    def calcular():
+        llamadas.append(1)
+        liberar.wait(5)
+        return 'valor'
+
+    hilos, resultados, errores = _concurrentes(6, cache, 'k', 1, calcular)
+    _esperar_en_vuelo(cache, 5)
+    liberar.set()
+    for h in hilos:
+        h.join(5)
+    assert len(llamadas) == 1
+    assert resultados == ['valor'] * 6 and errores == []
+    stats = cache.estadisticas()
+    assert stats['coalesced'] == 5 and stats['en_vuelo'] == 0
+
+
+def test_una_vez_reparte_la_excepcion_y_no_la_memoriza():
+    cache = CacheRespuestas(max_entradas=4, ttl_seg=60, coalescer=True)
+    liberar = threading.Event()
+
+    def falla():
+        liberar.wait(5)
+        raise ValueError('sin DW')
+
+    hilos, resultados, errores = _concurrentes(3, cache, 'k', 1, falla)
+    _esperar_en_vuelo(cache, 2)
+    liberar.set()
+    for h in hilos:
+        h.join(5)
+    assert resultados == [] and len(errores) == 3
+    assert all(isinstance(e, ValueError) for e in errores)
+    assert cache.una_vez('k', 1, lambda: 'reintento') == 'reintento'
+
+
+def test_una_vez_no_agrupa_versiones_distintas():
+    cache = CacheRespuestas(max_entradas=4, ttl_seg=60, coalescer=True)
+    assert cache.una_vez('k', 1, lambda: 'v1') == 'v1'
+    assert cache.una_vez('k', 2, lambda: 'v2') == 'v2'
+
+
+def test_una_vez_sin_coalescer_calcula_siempre():
+    cache = CacheRespuestas(max_entradas=4, ttl_seg=60, coalescer=False)
+    llamadas = []
+    cache.una_vez('k', 1, lambda: llamadas.append(1))
+    cache.una_vez('k', 1, lambda: llamadas.append(1))
+    assert len(llamadas) == 2 and cache.estadisticas()['coalesced'] == 0
@@ -0,0 +1,58 @@
+"""Pruebas del digest por fila y del upsert por lotes"""
+
+from datetime import date
+from decimal import Decimal
+
+import carga_lotes
+from carga_lotes import hash_fila, insertar_lotes, upsert_lotes
+from falsos import ConexionGuionada
+
+
+def test_hash_fila_determinista_y_sensible_a_valores():
+    fila = (1, 'Proyecto', Decimal('10.50'), date(2024, 1, 2), None, True)
+    assert hash_fila(fila) == hash_fila(list(fila))
+    assert len(hash_fila(fila)) == 16
+    assert hash_fila((1, None)) != hash_fila((1, ''))
+    assert hash_fila((1, 'a', 'b')) != hash_fila((1, 'ab', ''))
+    assert hash_fila((1, 2.5)) != hash_fila((1, 2.50001))
+
+
+def _destino(existentes):
+    """Destino con ``existentes`` (clave -> hash) que responde al SELECT de hashes."""
+    def guion(sql, params):
+        if sql.startswith('SHOW COLUMNS'):
+            return [('hash_fila',)]
+        if sql.startswith('SELECT'):
+            return [(k, existentes[k]) for k in params if k in existentes]
+        return []
+    return ConexionGuionada(guion)
+
+
+def test_upsert_lotes_omite_filas_sin_cambios_y_trocea():
+    carga_lotes._tablas_con_hash.discard('T')
+    filas = [(1, 'a'), (2, 'b'), (3, 'c'), (4, 'd'), (5, 'e')]
+    destino = _destino({1: hash_fila((1, 'a')), 2: hash_fila((2, 'viejo'))})
+    resumen = upsert_lotes(destino.cursor(), 'T', ['id', 'nombre'], filas, 'id', tam_lote=2)
+    assert resumen == {'insertados': 3, 'actualizados': 1, 'sin_cambios': 1, 'lotes': 3}
+    inserts = [(sql, params) for sql, params in destino.ejecutadas if sql.startswith('INSERT')]
+    assert len(inserts) == 3
+    sql, params = inserts[0]  # lote [1, 2]: solo viaja la fila 2
+    assert 'ON DUPLICATE KEY UPDATE nombre=VALUES(nombre),hash_fila=VALUES(hash_fila)' in sql
+    assert params == (2, 'b', hash_fila((2, 'b')))
+
+
+def test_upsert_lotes_sin_cambios_no_escribe():
+    carga_lotes._tablas_con_hash.discard('T')
+    filas = [(1, 'a')]
+    destino = _destino({1: hash_fila((1, 'a'))})
+    resumen = upsert_lotes(destino.cursor(), 'T', ['id', 'nombre'], filas, 'id')
+    assert resumen['sin_cambios'] == 1
+    assert not any(sql.startswith('INSERT') for sql, _ in destino.ejecutadas)
+
+
+def test_insertar_lotes_multi_fila():
+    destino = ConexionGuionada()
+    resumen = insertar_lotes(destino.cursor(), 'T', ['a', 'b'], [(1, 2), (3, 4), (5, 6)], tam_lote=2)
+    assert resumen['insertados'] == 3 and resumen['lotes'] == 2
+    (sql, params), _ = destino.ejecutadas
+    assert sql == 'INSERT INTO T (a,b) VALUES (%s,%s),(%s,%s)' and params == (1, 2, 3, 4)
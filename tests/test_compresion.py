@@ -0,0 +1,101 @@
+"""Pruebas del formato columnar y de la compresión negociada"""
+
+import gzip
+import zlib
+
+import pytest
+
+from compresion import comprimir_respuesta, filas_en_columnas
+
+
+class RespuestaFalsa:
+    """Lo que ``comprimir_respuesta`` usa de una respuesta de werkzeug."""
+
+    def __init__(self, cuerpo, status=200, mimetype='application/json', etag='v1'):
+        self.datos = cuerpo
+        self.status_code = status
+        self.mimetype = mimetype
+        self.direct_passthrough = False
+        self.is_streamed = False
+        self.headers = {}
+        self.vary = set()
+        self.etag = (etag, False) if etag else (None, None)
+
+    def get_data(self):
+        return self.datos
+
+    def set_data(self, datos):
+        self.datos = datos
+
+    def get_etag(self):
+        return self.etag
+
+    def set_etag(self, etag, weak=False):
+        self.etag = (etag, weak)
+
+
+class Aceptadas:
+    """``Accept-Encoding`` ya interpretado: codificación -> calidad."""
+
+    def __init__(self, calidades):
+        self.calidades = calidades
+
+    def best_match(self, ofrecidas):
+        candidatas = [c for c in ofrecidas if self.calidades.get(c, 0) > 0]
+        return max(candidatas, key=lambda c: self.calidades[c], default=None)
+
+
+CUERPO = b'{"x":"' + b'a' * 4000 + b'"}'
+
+
+def test_filas_en_columnas():
+    filas = [{'a': 1, 'b': 'x'}, {'a': 2, 'b': 'y'}]
+    assert filas_en_columnas(filas) == {'columnas': ['a', 'b'], 'valores': [[1, 2], ['x', 'y']]}
+
+
+def test_filas_en_columnas_vacias_y_columnas_explicitas():
+    assert filas_en_columnas([]) == {'columnas': [], 'valores': []}
+    assert filas_en_columnas([{'a': 1}], ['a', 'falta']) == {'columnas': ['a', 'falta'], 'valores': [[1], [None]]}
+
+
+def test_gzip_preferido_y_etag_propio():
+    respuesta = RespuestaFalsa(CUERPO)
+    comprimir_respuesta(respuesta, Aceptadas({'gzip': 1, 'deflate': 1}), nivel=6, minimo=1024)
+    assert respuesta.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(respuesta.get_data()) == CUERPO
+    assert respuesta.get_etag() == ('v1-gzip', False)
+    assert 'Accept-Encoding' in respuesta.vary
+
+
+def test_deflate_es_formato_zlib():
+    respuesta = RespuestaFalsa(CUERPO)
+    comprimir_respuesta(respuesta, Aceptadas({'gzip': 0.5, 'deflate': 1}), nivel=6, minimo=1024)
+    assert respuesta.headers['Content-Encoding'] == 'deflate'
+    assert zlib.decompress(respuesta.get_data()) == CUERPO
+
+
+def test_etag_debil_no_cambia():
+    respuesta = RespuestaFalsa(CUERPO)
+    respuesta.set_etag('v1', weak=True)
+    comprimir_respuesta(respuesta, Aceptadas({'gzip': 1}), nivel=6, minimo=1024)
+    assert respuesta.get_etag() == ('v1', True)
+
+
+@pytest.mark.parametrize('calidades, minimo, status, mimetype', [
+    ({'identity': 1}, 1024, 200, 'application/json'),   # el cliente no acepta compresión
+    ({'gzip': 1}, 10 ** 6, 200, 'application/json'),     # cuerpo por debajo del umbral
+    ({'gzip': 1}, 1024, 500, 'application/json'),        # solo se comprimen respuestas 200
+    ({'gzip': 1}, 1024, 200, 'image/png'),               # tipo no comprimible
+])
+def test_sin_compresion(calidades, minimo, status, mimetype):
+    respuesta = RespuestaFalsa(CUERPO, status=status, mimetype=mimetype)
+    comprimir_respuesta(respuesta, Aceptadas(calidades), nivel=6, minimo=minimo)
+    assert 'Content-Encoding' not in respuesta.headers
+    assert respuesta.get_data() == CUERPO
+    assert respuesta.get_etag() == ('v1', False)
+
+
+def test_nivel_cero_desactiva():
+    respuesta = RespuestaFalsa(CUERPO)
+    comprimir_respuesta(respuesta, Aceptadas({'gzip': 1}), nivel=0, minimo=0)
+    assert respuesta.get_data() == CUERPO and not respuesta.vary
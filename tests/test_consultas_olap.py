@@ -0,0 +1,30 @@
+"""Pruebas del constructor de consultas de /olap/kpis-v2"""
+
+from consultas_olap import construir_consulta
+
+
+def test_filtros_como_parametros_ligados():
+    sql, params = construir_consulta('total', cliente_id=7, equipo_id=3, anio=2024)
+    assert sql.endswith('WHERE id_cliente = %s AND id_equipo = %s AND anio = %s')
+    assert params == (7, 3, 2024)
+
+
+def test_sin_filtros_no_hay_where():
+    sql, params = construir_consulta('por_cliente')
+    assert 'WHERE' not in sql and params == ()
+    assert sql.endswith('GROUP BY cliente ORDER BY total_proyectos DESC')
+
+
+def test_filtros_no_admitidos_o_vacios_se_ignoran():
+    sql, params = construir_consulta('por_tiempo', cliente_id=7, anio=None)
+    assert sql == 'SELECT * FROM vw_olap_por_anio ORDER BY anio DESC' and params == ()
+
+
+def test_nivel_desconocido_es_detallado():
+    assert construir_consulta('otro', anio=2023) == construir_consulta('detallado', anio=2023)
+
+
+def test_mismo_texto_para_la_misma_combinacion():
+    sql_a, _ = construir_consulta('detallado', cliente_id=1)
+    sql_b, _ = construir_consulta('detallado', cliente_id=2)
+    assert sql_a is sql_b
@@ -0,0 +1,46 @@
+"""Pruebas de la serialización JSON de filas de cursor"""
+
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import json_rapido
+
+FILA = {
+    'presupuesto': Decimal('1500.25'),
+    'fecha': date(2024, 3, 1),
+    'actualizado': datetime(2024, 3, 1, 8, 30),
+    'duracion': timedelta(hours=2, minutes=5),
+    'hash_fila': b'\x01\xff',
+    'nombre': 'Migración',
+    'nulo': None,
+}
+ESPERADO = {
+    'presupuesto': 1500.25,
+    'fecha': '2024-03-01',
+    'actualizado': '2024-03-01T08:30:00',
+    'duracion': '2:05:00',
+    'hash_fila': '01ff',
+    'nombre': 'Migración',
+    'nulo': None,
+}
+
+
+def test_tipos_del_cursor():
+    assert json.loads(json_rapido.dumps([FILA])) == [ESPERADO]
+    assert json_rapido.loads(json_rapido.dumps_bytes(FILA)) == ESPERADO
+
+
+def test_motor_json_equivalente(monkeypatch):
+    con_motor = json_rapido.dumps(FILA, ordenar=True)
+    monkeypatch.setattr(json_rapido, 'orjson', None)
+    sin_motor = json_rapido.dumps(FILA, ordenar=True)
+    assert json.loads(sin_motor) == json.loads(con_motor)
+    assert 'Migración' in sin_motor and ', ' not in sin_motor
+
+
+def test_tipo_desconocido():
+    with pytest.raises(TypeError):
+        json_rapido.dumps({'x': object()})
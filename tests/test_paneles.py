@@ -0,0 +1,18 @@
+"""Pruebas de los paneles del dashboard sobre una conexión guionada"""
+
+from falsos import ConexionGuionada
+from paneles import panel_filtros_disponibles
+
+
+def test_filtros_disponibles_incluye_equipos_con_proyectos():
+    def guion(sql, params):
+        if 'FROM DimEquipo' in sql:
+            assert 'hp.id_equipo' in sql
+            return [{'id_equipo': 3, 'nombre_equipo': 'Backend', 'total_proyectos': 4}]
+        if 'FROM DimCliente' in sql:
+            return [{'id_cliente': 1, 'nombre_cliente': 'ACME', 'sector': 'Retail', 'total_proyectos': 2}]
+        return [{'anio': 2024, 'total_proyectos': 4}]
+
+    filtros = panel_filtros_disponibles(ConexionGuionada(guion))['filtros']
+    assert filtros['equipos'] == [{'id_equipo': 3, 'nombre_equipo': 'Backend', 'total_proyectos': 4}]
+    assert filtros['clientes'][0]['id_cliente'] == 1 and filtros['anios'][0]['anio'] == 2024
@@ -0,0 +1,170 @@
+"""Pruebas de paralelo.py con un pool de conexiones simulado (sin MySQL)"""
+
+import threading
+
+import pytest
+
+import paralelo
+
+
+class CursorFalso:
+    def __init__(self, conn):
+        self.conn = conn
+        self.filas = []
+
+    def execute(self, sql, params=()):
+        if 'FALLA' in sql:
+            raise RuntimeError('consulta fallida')
+        self.filas = [{'sql': sql.strip(), 'params': params, 'conexion': self.conn.id}]
+
+    def fetchall(self):
+        return self.filas
+
+    def close(self):
+        pass
+
+
+class ConexionFalsa:
+    def __init__(self, pool, id_conexion):
+        self.pool = pool
+        self.id = id_conexion
+
+    def cursor(self, dictionary=False):
+        return CursorFalso(self)
+
+    def close(self):
+        self.pool.devolver(self)
+
+
+class PoolFalso:
+    """Pool acotado que, como PoolConexiones, espera hasta ``espera_seg`` y falla."""
+
+    def __init__(self, tamano, espera_seg=5.0):
+        self.libres = threading.Semaphore(tamano)
+        self.espera_seg = espera_seg
+        self.lock = threading.Lock()
+        self.en_uso = 0
+        self.max_en_uso = 0
+        self.entregadas = 0
+
+    def conectar(self):
+        if not self.libres.acquire(timeout=self.espera_seg):
+            raise RuntimeError('pool agotado')
+        with self.lock:
+            self.en_uso += 1
+            self.entregadas += 1
+            self.max_en_uso = max(self.max_en_uso, self.en_uso)
+            return ConexionFalsa(self, self.entregadas)
+
+    def devolver(self, conn):
+        with self.lock:
+            self.en_uso -= 1
+        self.libres.release()
+
+
+def test_consultas_en_paralelo_conserva_orden_y_usa_conexion_del_llamador():
+    pool = PoolFalso(paralelo.CONSULTAS_HILOS)
+    conn = pool.conectar()
+    filas = paralelo.consultas_en_paralelo(conn, {
+        'b': 'SELECT 2',
+        'a': ('SELECT %s', (1,)),
+        'c': 'SELECT 3'
+    }, pool.conectar)
+    assert list(filas) == ['b', 'a', 'c']
+    assert filas['b'][0]['conexion'] == conn.id
+    assert filas['a'][0]['params'] == (1,)
+    conn.close()
+    assert pool.en_uso == 0
+
+
+def test_consultas_en_paralelo_sin_abrir_conexion_corre_en_linea():
+    pool = PoolFalso(1)
+    conn = pool.conectar()
+    filas = paralelo.consultas_en_paralelo(conn, {'a': 'SELECT 1', 'b': 'SELECT 2'})
+    assert {f[0]['conexion'] for f in filas.values()} == {conn.id}
+
+
+def test_consultas_en_paralelo_propaga_el_error():
+    pool = PoolFalso(paralelo.CONSULTAS_HILOS)
+    conn = pool.conectar()
+    with pytest.raises(RuntimeError, match='consulta fallida'):
+        paralelo.consultas_en_paralelo(conn, {'a': 'SELECT 1', 'b': 'SELECT FALLA'}, pool.conectar)
+    conn.close()
+    assert pool.en_uso == 0
+
+
+def test_en_paralelo_separa_errores_de_resultados():
+    def falla():
+        raise ValueError('no')
+
+    resultados, errores, tiempos = paralelo.en_paralelo({'ok': lambda: 1, 'mal': falla})
+    assert resultados == {'ok': 1}
+    assert errores == {'mal': 'no'}
+    assert set(tiempos) == {'ok'}
+
+
+def test_ejecutar_en_paralelo_reusa_la_conexion_del_llamador():
+    pool_requests = PoolFalso(1)
+    pool_consultas = PoolFalso(paralelo.CONSULTAS_HILOS)
+    conn = pool_requests.conectar()
+    paneles, errores, _ = paralelo.ejecutar_en_paralelo(
+        {f'panel{i}': (lambda c: c) for i in range(paralelo.CONSULTAS_HILOS + 1)},
+        pool_consultas.conectar, conn)
+    assert errores == {}
+    assert paneles['panel0'] is conn
+    assert pool_requests.en_uso == 1  # la del llamador no se cierra
+    assert pool_consultas.en_uso == 0
+    assert pool_consultas.max_en_uso <= paralelo.CONSULTAS_HILOS
+
+
+def _requests_concurrentes(n, pool_requests, abrir_conexion):
+    """``n`` requests que toman a la vez una conexión de ``pool_requests`` y, sin
+    soltarla, reparten consultas y paneles con ``abrir_conexion``."""
+    todos_con_conexion = threading.Barrier(n)
+    errores = []
+
+    def request():
+        conn = pool_requests.conectar()
+        try:
+            todos_con_conexion.wait()
+            filas = paralelo.consultas_en_paralelo(conn, {
+                'uno': 'SELECT 1', 'dos': 'SELECT 2', 'tres': 'SELECT 3'
+            }, abrir_conexion)
+            assert len(filas) == 3
+            _, fallidos, _ = paralelo.ejecutar_en_paralelo(
+                {f'panel{i}': (lambda c: paralelo.consultar(c, 'SELECT 1')) for i in range(5)},
+                abrir_conexion)
+            if fallidos:
+                raise RuntimeError(fallidos)
+        except Exception as e:
+            errores.append(e)
+        finally:
+            conn.close()
+
+    hilos = [threading.Thread(target=request) for _ in range(n)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(timeout=30)
+    assert not any(hilo.is_alive() for hilo in hilos)
+    return errores
+
+
+def test_n_requests_con_pool_de_n_no_se_bloquean():
+    n = 8
+    pool_requests = PoolFalso(n)
+    pool_consultas = PoolFalso(paralelo.CONSULTAS_HILOS)
+    errores = _requests_concurrentes(n, pool_requests, pool_consultas.conectar)
+    assert errores == []
+    assert pool_requests.en_uso == pool_consultas.en_uso == 0
+    assert pool_consultas.max_en_uso <= paralelo.CONSULTAS_HILOS
+
+
+@pytest.mark.skipif(paralelo.CONSULTAS_HILOS <= 1, reason='sin hilos de consultas todo corre en línea')
+def test_pool_compartido_con_los_requests_se_agota():
+    # Lo que evita el pool propio: los hilos esperan conexiones que los
+    # requests no sueltan hasta que esos hilos terminan
+    n = 4
+    pool_requests = PoolFalso(n, espera_seg=0.2)
+    errores = _requests_concurrentes(n, pool_requests, pool_requests.conectar)
+    assert errores and all('pool agotado' in str(e) for e in errores)
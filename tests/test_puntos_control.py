@@ -0,0 +1,76 @@
+"""Pruebas de la extracción por rangos de clave con puntos de control"""
+
+import pytest
+
+import puntos_control
+from falsos import ConexionGuionada
+from puntos_control import PuntosControl, cargar_por_rangos, reintentar
+
+SQL = "SELECT id, nombre FROM Proyecto WHERE id > %s ORDER BY id LIMIT %s"
+
+
+def _origen(filas):
+    """Origen que pagina ``filas`` por clave como lo haría MySQL."""
+    def guion(sql, params):
+        desde, tam = params[-2:]
+        return [f for f in filas if f[0] > desde][:tam]
+    return ConexionGuionada(guion)
+
+
+def _procesar(o, d, filas):
+    return {'cargados': len(filas), 'no_numerico': 'x'}
+
+
+def test_recorre_por_paginas_y_registra_cada_clave():
+    puntos = PuntosControl(ConexionGuionada())
+    destino = ConexionGuionada()
+    resumen = cargar_por_rangos(_origen([(i, f'p{i}') for i in range(1, 6)]), destino, 'proyectos',
+                                SQL, (), _procesar, tam=2, puntos=puntos)
+    assert resumen == {'procesados': 5, 'paginas': 3, 'cargados': 5}
+    registros = [params for sql, params in destino.ejecutadas if 'PuntoControlETL' in sql]
+    assert [(p[2], p[3], p[4]) for p in registros] == [(2, 2, 0), (4, 4, 0), (5, 5, 0), (5, 5, 1)]
+    assert destino.commits == 4  # una transacción por página (y la de cierre)
+
+
+def test_reanuda_desde_el_ultimo_punto():
+    puntos = PuntosControl(ConexionGuionada())
+    puntos._etapas['proyectos'] = {'ultima_clave': 3, 'filas': 3, 'completada': False}
+    origen = _origen([(i, f'p{i}') for i in range(1, 6)])
+    resumen = cargar_por_rangos(origen, ConexionGuionada(), 'proyectos', SQL, (), _procesar, tam=10, puntos=puntos)
+    assert resumen['reanudada_desde'] == 3 and resumen['procesados'] == 5 and resumen['cargados'] == 2
+    assert origen.ejecutadas[0][1] == (3, 10)
+
+
+def test_etapa_completada_no_se_repite():
+    puntos = PuntosControl(ConexionGuionada())
+    puntos._etapas['proyectos'] = {'ultima_clave': 9, 'filas': 9, 'completada': True}
+    origen = _origen([(1, 'p1')])
+    resumen = cargar_por_rangos(origen, ConexionGuionada(), 'proyectos', SQL, (), _procesar, tam=10, puntos=puntos)
+    assert resumen['omitida'] and origen.ejecutadas == []
+
+
+def test_sin_confirmar_no_hay_commit():
+    destino = ConexionGuionada()
+    cargar_por_rangos(_origen([(1, 'p1')]), destino, 'micro', SQL, (), _procesar, tam=10, confirmar=False)
+    assert destino.commits == 0
+
+
+class ErrorMySQL(Exception):
+    def __init__(self, errno):
+        super().__init__(f'error {errno}')
+        self.errno = errno
+
+
+def test_reintentar_solo_errores_transitorios(monkeypatch):
+    monkeypatch.setattr(puntos_control.time, 'sleep', lambda s: None)
+    intentos = []
+
+    def deadlock_una_vez():
+        intentos.append(1)
+        if len(intentos) == 1:
+            raise ErrorMySQL(1213)
+        return 'ok'
+
+    assert reintentar(deadlock_una_vez, intentos=2, espera=0) == 'ok' and len(intentos) == 2
+    with pytest.raises(ErrorMySQL):
+        reintentar(lambda: (_ for _ in ()).throw(ErrorMySQL(1062)), intentos=2, espera=0)
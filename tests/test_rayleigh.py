@@ -0,0 +1,36 @@
+"""Pruebas de la calibración de Rayleigh con datos del DW"""
+
+from src.config import config_conexion
+
+import rayleigh
+from falsos import ConexionGuionada
+
+
+class ConexionQueFalla(ConexionGuionada):
+    def __init__(self):
+        super().__init__(lambda sql, params: (_ for _ in ()).throw(RuntimeError('tabla inexistente')))
+        self.cerrada = False
+
+    def close(self):
+        self.cerrada = True
+
+
+class PoolFalso:
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def get_connection(self):
+        return self.conexion
+
+
+def test_conexion_propia_vuelve_al_pool_si_la_consulta_falla(monkeypatch):
+    conexion = ConexionQueFalla()
+    monkeypatch.setitem(config_conexion._POOLS, 'destino', PoolFalso(conexion))
+    assert rayleigh.obtener_datos_proyectos_reales() == {'tiene_datos': False}
+    assert conexion.cerrada
+
+
+def test_conexion_del_llamador_no_se_cierra():
+    conexion = ConexionQueFalla()
+    assert rayleigh.obtener_datos_proyectos_reales(conexion) == {'tiene_datos': False}
+    assert not conexion.cerrada
@@ -0,0 +1,149 @@
+"""Pruebas del intercambio blue/green con claves foráneas entre las tablas del DW"""
+
+import re
+
+import pytest
+
+from recarga_completa import (TABLAS_DW, preparar_tablas_nuevas, publicar_tablas_nuevas,
+                              revertir_publicacion)
+
+
+class ErrorMySQL(Exception):
+    pass
+
+
+class EsquemaFalso:
+    """Lo que importa de InnoDB para el intercambio: ``RENAME TABLE`` se lleva las
+    referencias entrantes y renombra las claves ``<tabla>_ibfk_N``, ``CREATE
+    TABLE ... LIKE`` no copia claves foráneas, no se borra un padre referenciado
+    con ``FOREIGN_KEY_CHECKS=1`` y los nombres de constraint son únicos."""
+
+    def __init__(self, tablas):
+        self.tablas = {t: {} for t in tablas}  # tabla -> {constraint: (columna, tabla_ref)}
+        self.revisar = 1
+        self.previo = None
+
+    def agregar_clave(self, tabla, nombre, columna, tabla_ref):
+        if any(nombre in claves for claves in self.tablas.values()):
+            raise ErrorMySQL(f"constraint duplicada {nombre}")
+        if tabla_ref not in self.tablas:
+            raise ErrorMySQL(f"no existe {tabla_ref}")
+        self.tablas[tabla][nombre] = (columna, tabla_ref)
+
+    def referencias(self, tabla):
+        return {(hija, nombre) for hija, claves in self.tablas.items()
+                for nombre, (_, ref) in claves.items() if ref == tabla}
+
+    def cursor(self):
+        return CursorEsquema(self)
+
+
+class CursorEsquema:
+    def __init__(self, esquema):
+        self.esquema = esquema
+        self.filas = []
+
+    def execute(self, sql, params=()):
+        e = self.esquema
+        self.filas = []
+        if sql.startswith('SET @fk_previo'):
+            e.previo, e.revisar = e.revisar, 0
+        elif sql == 'SET FOREIGN_KEY_CHECKS = @fk_previo':
+            e.revisar = e.previo
+        elif 'KEY_COLUMN_USAGE' in sql:
+            tablas = set(params)
+            self.filas = [(hija, nombre, col, ref, 'id', 'SET NULL', 'RESTRICT')
+                          for hija, claves in sorted(e.tablas.items())
+                          for nombre, (col, ref) in sorted(claves.items()) if hija in tablas or ref in tablas]
+        elif 'information_schema.tables' in sql:
+            self.filas = [(sum(1 for t in params if t in e.tablas),)]
+        elif sql.startswith('DROP TABLE IF EXISTS '):
+            borrar = [t for t in sql[len('DROP TABLE IF EXISTS '):].split(', ') if t in e.tablas]
+            for t in borrar:
+                if e.revisar and any(hija not in borrar for hija, _ in e.referencias(t)):
+                    raise ErrorMySQL(f"Cannot drop table '{t}' referenced by a foreign key constraint")
+            for t in borrar:
+                del e.tablas[t]
+        elif sql.startswith('CREATE TABLE'):
+            nueva, _ = re.match(r'CREATE TABLE (\w+) LIKE (\w+)', sql).groups()
+            if nueva in e.tablas:
+                raise ErrorMySQL(f"ya existe {nueva}")
+            e.tablas[nueva] = {}
+        elif sql.startswith('ALTER TABLE'):
+            tabla, col, ref = re.match(r'ALTER TABLE (\w+) ADD FOREIGN KEY \((\w+)\) REFERENCES (\w+)', sql).groups()
+            e.agregar_clave(tabla, f"{tabla}_ibfk_{len(e.tablas[tabla]) + 1}", col, ref)
+        elif sql.startswith('RENAME TABLE'):
+            for origen, destino in re.findall(r'(\w+) TO (\w+)', sql):
+                if destino in e.tablas or origen not in e.tablas:
+                    raise ErrorMySQL(f"RENAME {origen} TO {destino}")
+                claves = e.tablas.pop(origen)
+                e.tablas[destino] = {(destino + n[len(origen):] if n.startswith(origen + '_ibfk_') else n): c
+                                     for n, c in claves.items()}
+                for hija, claves in e.tablas.items():
+                    for nombre, (col, ref) in list(claves.items()):
+                        if ref == origen:
+                            claves[nombre] = (col, destino)
+        elif not sql.startswith('INSERT'):
+            raise AssertionError(f"sentencia no esperada: {sql}")
+
+    def fetchall(self):
+        return self.filas
+
+
+def _dw():
+    esquema = EsquemaFalso(TABLAS_DW + ('DimTiempo', 'DimKR', 'HechoOKR'))
+    # crear_datawarehouse.sql (claves opcionales activadas) y crear_bsc.sql
+    esquema.agregar_clave('HechoProyecto', 'fk_hp_proyecto', 'id_proyecto', 'DimProyecto')
+    esquema.agregar_clave('HechoProyecto', 'fk_hp_cliente', 'id_cliente', 'DimCliente')
+    esquema.agregar_clave('HechoProyecto', 'fk_hp_tiempo_fin_real', 'id_tiempo_fin_real', 'DimTiempo')
+    esquema.agregar_clave('HechoTarea', 'fk_ht_equipo', 'id_equipo', 'DimEquipo')
+    esquema.agregar_clave('HechoOKR', 'hechookr_ibfk_1', 'id_kr', 'DimKR')
+    esquema.agregar_clave('HechoOKR', 'hechookr_ibfk_2', 'id_tiempo', 'DimTiempo')
+    return esquema
+
+
+def _recargar(esquema):
+    cursor = esquema.cursor()
+    preparar_tablas_nuevas(cursor)
+    publicar_tablas_nuevas(cursor)
+
+
+def _referencias_vivas(esquema, tabla):
+    return sorted((col, ref) for col, ref in esquema.tablas[tabla].values())
+
+
+def test_dos_recargas_seguidas_conservan_las_claves_foraneas():
+    esquema = _dw()
+    _recargar(esquema)
+    _recargar(esquema)
+    assert _referencias_vivas(esquema, 'HechoProyecto') == [
+        ('id_cliente', 'DimCliente'), ('id_proyecto', 'DimProyecto'), ('id_tiempo_fin_real', 'DimTiempo')]
+    assert _referencias_vivas(esquema, 'HechoTarea') == [('id_equipo', 'DimEquipo')]
+    assert _referencias_vivas(esquema, 'HechoOKR') == [('id_kr', 'DimKR'), ('id_tiempo', 'DimTiempo')]
+    assert 'DimTiempo_prev' not in esquema.tablas and esquema.revisar == 1
+    assert _referencias_vivas(esquema, 'HechoProyecto_prev')[0] == ('id_cliente', 'DimCliente_prev')
+
+
+def test_revertir_y_volver_a_recargar():
+    esquema = _dw()
+    _recargar(esquema)
+    _recargar(esquema)
+    revertir_publicacion(esquema.cursor())
+    assert ('id_cliente', 'DimCliente') in _referencias_vivas(esquema, 'HechoProyecto')
+    _recargar(esquema)
+    assert ('id_cliente', 'DimCliente') in _referencias_vivas(esquema, 'HechoProyecto')
+
+
+def test_sombras_de_una_recarga_fallida_se_descartan():
+    esquema = _dw()
+    preparar_tablas_nuevas(esquema.cursor())  # la recarga se cae antes de publicar
+    _recargar(esquema)
+    assert not any(t.endswith('_next') for t in esquema.tablas)
+
+
+def test_rechaza_referencias_desde_fuera_del_intercambio():
+    esquema = _dw()
+    esquema.tablas['Auditoria'] = {}
+    esquema.agregar_clave('Auditoria', 'fk_auditoria_proyecto', 'id_proyecto', 'DimProyecto')
+    with pytest.raises(RuntimeError, match='Auditoria'):
+        preparar_tablas_nuevas(esquema.cursor())
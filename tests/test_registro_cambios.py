@@ -0,0 +1,65 @@
+"""Pruebas de la lectura compactada del registro de cambios"""
+
+from falsos import ConexionGuionada
+from registro_cambios import TAM_PURGA, LoteCambios, leer_lote, purgar
+
+
+def test_lote_compacta_por_ultima_operacion():
+    lote = LoteCambios(10)
+    lote.agregar(11, 'Proyecto', 1, None, 'I')
+    lote.agregar(12, 'Proyecto', 1, None, 'D')
+    lote.agregar(13, 'Proyecto', 2, None, 'D')
+    lote.agregar(14, 'Proyecto', 2, None, 'U')
+    lote.agregar(15, 'Tarea', 7, 3, 'U')
+    assert lote.vivos == {'Proyecto': {2}, 'Tarea': {7}}
+    assert lote.borrados == {'Proyecto': {1}}
+    assert lote.padres == {'Tarea': {3}}
+    assert lote.ids('Proyecto') == {1, 2}
+    assert lote.ultimo_id == 15 and lote.ids_cambio == [11, 12, 13, 14, 15]
+
+
+def test_lote_vacio_conserva_el_puntero():
+    lote = LoteCambios(42)
+    assert not lote and lote.ultimo_id == 42
+
+
+def test_leer_lote_se_detiene_en_hueco_reciente():
+    conexion = ConexionGuionada([[
+        (11, 'Proyecto', 1, None, 'I', 1),
+        (12, 'Proyecto', 2, None, 'I', 0),
+        (14, 'Proyecto', 3, None, 'I', 0),  # falta 13 y 14 aún es reciente
+        (15, 'Proyecto', 4, None, 'I', 0),
+    ]])
+    lote = leer_lote(conexion, 10, 100)
+    assert lote.hueco
+    assert lote.ids_cambio == [11, 12] and lote.ultimo_id == 12
+
+
+def test_leer_lote_salta_hueco_asentado():
+    conexion = ConexionGuionada([[
+        (11, 'Proyecto', 1, None, 'I', 1),
+        (14, 'Proyecto', 3, None, 'U', 1),  # 12-13 fueron rollbacks hace rato
+    ]])
+    lote = leer_lote(conexion, 10, 100)
+    assert not lote.hueco and lote.ultimo_id == 14
+
+
+def test_leer_lote_recoge_rezagados_sin_mover_el_puntero():
+    conexion = ConexionGuionada([
+        [(8, 'Tarea', 5, 1, 'U')],
+        [(11, 'Proyecto', 1, None, 'I', 1)],
+    ])
+    lote = leer_lote(conexion, 10, 5, rezagados=True)
+    assert lote.ids_cambio == [8, 11] and lote.ultimo_id == 11
+    (_, params_rezagados), (_, params_nuevos) = conexion.ejecutadas
+    assert params_rezagados == (10, 5)
+    assert params_nuevos[1:] == (10, 4)  # el límite descuenta los rezagados
+
+
+def test_purgar_borra_solo_los_ids_aplicados_por_tramos():
+    conexion = ConexionGuionada()
+    ids = list(range(1, TAM_PURGA + 3))
+    assert purgar(conexion, ids) == len(ids)
+    assert [params for _, params in conexion.ejecutadas] == [tuple(ids[:TAM_PURGA]), tuple(ids[TAM_PURGA:])]
+    assert all(sql.startswith('DELETE') and 'IN (' in sql for sql, _ in conexion.ejecutadas)
+    assert conexion.commits == 1